@@ -15,6 +15,17 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _http_mode(record: str = None, replay: str = None):
+    """Context manager for recording or replaying a cycle's HTTP traffic."""
+    from contextlib import nullcontext
+    from src import fetch
+    if record:
+        return fetch.recording(record)
+    if replay:
+        return fetch.replaying(replay)
+    return nullcontext()
+
+
 @click.group()
 def cli():
     """BMW E9X M3 Parts Finder Agent."""
@@ -27,11 +38,34 @@ def cli():
     type=click.Path(exists=True),
     help="Path to config.yaml"
 )
-def search(config):
+@click.option(
+    "--record",
+    type=click.Path(dir_okay=False),
+    help="Write every HTTP request/response of the cycle to this .jsonl.gz archive"
+)
+@click.option(
+    "--replay",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Serve HTTP responses from a recorded archive instead of the network"
+)
+@click.option(
+    "--db",
+    "db_path",
+    type=click.Path(dir_okay=False),
+    help="Use this SQLite file instead of src/parts.db (handy for replays)"
+)
+def search(config, record, replay, db_path):
     """Run a single search cycle."""
+    if record and replay:
+        raise click.UsageError("--record and --replay are mutually exclusive")
     try:
-        agent = Agent(config_path=config)
-        agent.run_once()
+        if db_path:
+            from src import db
+            db.DB_PATH = Path(db_path)
+        agent = Agent(config_path=config, offline=bool(replay))
+        with _http_mode(record, replay):
+            agent.run_once()
+        agent.close()
         logger.info("Search cycle complete")
     except Exception as e:
         logger.error(f"Search failed: {e}", exc_info=True)
@@ -44,20 +78,427 @@ def search(config):
     type=click.Path(exists=True),
     help="Path to config.yaml"
 )
-def daemon(config):
+@click.option(
+    "--metrics-port",
+    type=int,
+    default=None,
+    help="Serve Prometheus metrics on this port (default: metrics_port in config, off if unset)"
+)
+@click.option(
+    "--queue",
+    is_flag=True,
+    help="Coordinate: queue searches for `main.py worker` processes instead of running them"
+)
+def daemon(config, metrics_port, queue):
     """Run continuously with scheduled searches."""
+    agent = None
     try:
         click.echo("Starting parts finder daemon...")
         click.echo("Press Ctrl+C to stop.")
         agent = Agent(config_path=config)
+        if queue:
+            from src.tasks import open_queue
+            agent.queue = open_queue(agent.config.get("tasks"))
+            click.echo(f"Coordinating workers via the {type(agent.queue).__name__}")
+        metrics_port = metrics_port or agent.config.get("metrics_port")
+        if metrics_port:
+            from src.metrics import serve_metrics
+            metrics_host = agent.config.get("metrics_host", "127.0.0.1")
+            try:
+                serve_metrics(host=metrics_host, port=metrics_port)
+                click.echo(f"Metrics at http://{metrics_host}:{metrics_port}/metrics")
+            except OSError as e:
+                logger.error(f"Metrics listener on {metrics_host}:{metrics_port} failed: {e}; "
+                             "running without it")
+        # Returns on SIGTERM/SIGINT once the running search has finished.
         agent.run_scheduled()
+        agent.close(timeout=10)
+        click.echo("\nDaemon stopped.")
     except KeyboardInterrupt:
+        if agent:
+            agent.close(timeout=10)
         click.echo("\nDaemon stopped.")
     except Exception as e:
         logger.error(f"Daemon error: {e}", exc_info=True)
         sys.exit(1)
 
 
+@cli.command()
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    help="Write results as JSON to this file"
+)
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Compare against a previous --output file; exits 1 on regressions"
+)
+@click.option(
+    "--threshold",
+    default=0.2,
+    type=float,
+    help="Slowdown ratio counted as a regression (default: 0.2 = 20%)"
+)
+@click.option(
+    "--only",
+    help="Run only benchmarks whose name contains this string"
+)
+@click.option(
+    "--items",
+    default=20000,
+    type=int,
+    help="Synthetic database size for the web benchmarks (default: 20000)"
+)
+@click.option(
+    "--quick",
+    is_flag=True,
+    help="Shorter timing rounds (noisier, for smoke runs)"
+)
+def bench(output, baseline, threshold, only, items, quick):
+    """Run the offline benchmark suite over the checked-in fixtures."""
+    import json
+    from src import bench as suite
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = suite.run(only=only, n_items=items, min_time=0.05 if quick else 0.2,
+                        repeat=3 if quick else 5, log=click.echo)
+    if output:
+        Path(output).write_text(json.dumps(results, indent=2))
+        click.echo(f"Results written to {output}")
+    if baseline:
+        rows = suite.compare(results, json.loads(Path(baseline).read_text()), threshold)
+        click.echo(f"\n{'benchmark':<48} {'baseline':>10} {'current':>10} {'ratio':>7}")
+        for row in rows:
+            flag = "  REGRESSION" if row["regressed"] else ""
+            click.echo(f"{row['name']:<48} {row['baseline_ms']:>10.4f} "
+                       f"{row['current_ms']:>10.4f} {row['ratio']:>7.2f}{flag}")
+        if any(row["regressed"] for row in rows):
+            sys.exit(1)
+
+
+@cli.command()
+@click.option(
+    "--config",
+    type=click.Path(exists=True),
+    help="Path to config.yaml"
+)
+@click.option(
+    "--replay",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Profile against a recorded archive (recommended; see search --record)"
+)
+@click.option(
+    "--db",
+    "db_path",
+    type=click.Path(dir_okay=False),
+    help="SQLite file to run against (default: a throwaway temp database)"
+)
+@click.option(
+    "--top",
+    default=25,
+    type=int,
+    help="Number of functions and allocation sites to print (default: 25)"
+)
+@click.option(
+    "--pstats",
+    "pstats_path",
+    type=click.Path(dir_okay=False),
+    help="Dump cProfile stats to this file (open with snakeviz or pstats)"
+)
+@click.option(
+    "--collapsed",
+    type=click.Path(dir_okay=False),
+    help="Write sampled collapsed stacks to this file (for flamegraph.pl/speedscope)"
+)
+@click.option(
+    "--sample-interval",
+    default=5.0,
+    type=float,
+    help="Stack sampling interval in milliseconds; 0 disables (default: 5)"
+)
+@click.option(
+    "--no-memory",
+    is_flag=True,
+    help="Skip tracemalloc (faster, timings closer to a normal run)"
+)
+def profile(config, replay, db_path, top, pstats_path, collapsed, sample_interval, no_memory):
+    """Profile one search cycle: hot functions, allocations and peak memory."""
+    import tempfile
+    from src import db, profiling
+
+    if collapsed and sample_interval <= 0:
+        raise click.UsageError("--collapsed needs --sample-interval > 0")
+    if not replay:
+        click.echo("Profiling against the live sites; pass --replay for repeatable numbers.")
+    scratch = None
+    if db_path:
+        db.DB_PATH = Path(db_path)
+    else:
+        scratch = tempfile.TemporaryDirectory(prefix="partsfinder-profile-")
+        db.DB_PATH = Path(scratch.name) / "parts.db"
+
+    try:
+        agent = Agent(config_path=config, offline=bool(replay))
+
+        def cycle():
+            with _http_mode(replay=replay):
+                agent.run_once()
+
+        result = profiling.profile_cycle(
+            cycle, memory=not no_memory, top=top,
+            sample_interval=sample_interval / 1000 if sample_interval > 0 else None)
+        agent.close(timeout=10)
+    finally:
+        if scratch is not None:
+            scratch.cleanup()
+
+    click.echo(profiling.format_report(result, top=top))
+    if pstats_path:
+        result.stats.dump_stats(pstats_path)
+        click.echo(f"cProfile stats written to {pstats_path}")
+    if collapsed:
+        Path(collapsed).write_text("\n".join(result.sampler.collapsed()) + "\n")
+        click.echo(f"Collapsed stacks written to {collapsed}")
+    if result.error is not None:
+        sys.exit(1)
+
+
+@cli.command()
+@click.option(
+    "--url",
+    help="Load-test a running dashboard at this URL (e.g. one started with web --production)"
+)
+@click.option(
+    "--db",
+    "db_path",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Without --url: serve this database in-process (see seed_db.py for a large one)"
+)
+@click.option(
+    "--concurrency",
+    default=8,
+    type=int,
+    help="Requests in flight (default: 8)"
+)
+@click.option(
+    "--duration",
+    default=30.0,
+    type=float,
+    help="Seconds to run (default: 30)"
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    help="Write results as JSON to this file"
+)
+def loadtest(url, db_path, concurrency, duration, output):
+    """Drive /, /category, /search and /api/items and report latency percentiles."""
+    import json
+    from src import db, loadtest as harness
+
+    logging.getLogger().setLevel(logging.WARNING)
+    server = None
+    if url:
+        categories = harness.fetch_categories(url)
+    else:
+        if db_path:
+            db.DB_PATH = Path(db_path)
+        db.init_db()
+        categories = db.get_categories()
+        server, url = harness.serve_in_process()
+        click.echo(f"Serving {db.DB_PATH} in-process at {url} (shares the GIL with the load workers)")
+    try:
+        targets = harness.build_targets(categories or [])
+        click.echo(f"Running {concurrency} workers for {duration:.0f}s...")
+        result = harness.run(url, targets, concurrency=concurrency, duration=duration)
+    finally:
+        if server is not None:
+            server.shutdown()
+    click.echo(harness.format_report(result))
+    if output:
+        Path(output).write_text(json.dumps(result, indent=2))
+        click.echo(f"Results written to {output}")
+
+
+@cli.command()
+@click.option(
+    "--db",
+    "db_path",
+    type=click.Path(exists=True, dir_okay=False),
+    help="SQLite file to update (default: src/parts.db)"
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Only report what would change"
+)
+def recategorize(db_path, dry_run):
+    """Re-label stored items with the current category rules."""
+    from src import db
+    from src.sources.forum import M3POST_SECTIONS
+
+    if db_path:
+        db.DB_PATH = Path(db_path)
+    db.init_db()
+    # Items from category-specific forum sections keep their section's category.
+    pinned = {("forum:m3post", s["label"]): s["category"]
+              for s in M3POST_SECTIONS if s["category"]}
+    changes = db.recategorize_items(pinned=pinned, dry_run=dry_run)
+    for (old, new), n in sorted(changes.items(), key=lambda kv: -kv[1]):
+        click.echo(f"{n:>8}  {old} -> {new}")
+    verb = "would change" if dry_run else "changed"
+    click.echo(f"{sum(changes.values())} items {verb}")
+
+
+@cli.command("backfill-prices")
+@click.option(
+    "--db",
+    "db_path",
+    type=click.Path(exists=True, dir_okay=False),
+    help="SQLite file to update (default: src/parts.db)"
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Only report how many items would gain a price"
+)
+def backfill_prices(db_path, dry_run):
+    """Extract prices from the titles of items stored without one."""
+    from src import db
+
+    if db_path:
+        db.DB_PATH = Path(db_path)
+    db.init_db()
+    filled = db.backfill_prices(dry_run=dry_run)
+    verb = "would gain" if dry_run else "gained"
+    click.echo(f"{filled} items {verb} a price")
+
+
+@cli.command()
+@click.option(
+    "--config",
+    type=click.Path(exists=True),
+    help="Path to config.yaml"
+)
+@click.option(
+    "--db",
+    "db_path",
+    type=click.Path(exists=True, dir_okay=False),
+    help="SQLite file to measure yield on (default: src/parts.db)"
+)
+@click.option(
+    "--days",
+    type=int,
+    default=30,
+    show_default=True,
+    help="Measure marginal yield on eBay items found in this many days"
+)
+def plan(config, db_path, days):
+    """Show the planned eBay queries, keyword yield and the adaptive poll schedule."""
+    import yaml
+    from src import db
+    from src.agent import CONFIG_PATH
+    from src.query_plan import group_keywords, marginal_yield, plan_queries, format_plan
+
+    with open(config or CONFIG_PATH) as f:
+        cfg = yaml.safe_load(f) or {}
+    keywords = cfg.get("parts") or []
+    queries = plan_queries(keywords, cfg.get("ebay", {}).get("terms_per_query", 5))
+    if db_path:
+        db.DB_PATH = Path(db_path)
+    db.init_db()
+    titles = db.get_item_titles("ebay", days=days)
+    report = marginal_yield(({"title": t} for t in titles), group_keywords(keywords))
+    click.echo(f"{len(keywords)} keywords -> {len(queries)} queries; "
+               f"yield over {len(titles)} eBay items from the last {days} days")
+    click.echo(format_plan(queries, report))
+    idle = [name for name, r in report.items() if not r["unique"]]
+    if idle:
+        click.echo(f"No unique listings (candidates to drop): {', '.join(idle)}")
+
+    from src.polling import PollScheduler
+    poller = PollScheduler()
+    poller.load()
+    if poller.states:
+        click.echo(f"\nAdaptive poll schedule ({len(poller.states)} searches):")
+        for r in poller.report():
+            every = f"{r['interval'] / 60:.0f} min" if r["interval"] else "-"
+            click.echo(f"  {r['source'] + ': ' + r['key']:<48} every {every:>9}  "
+                       f"{r['rate']:6.2f} new/h  {r['cost']:5.1f} req/poll  "
+                       f"{r['new_items']:>6} new in {r['polls']} polls")
+
+
+@cli.command()
+@click.option(
+    "--config",
+    type=click.Path(exists=True),
+    help="Path to config.yaml (same parts list as the coordinator's)"
+)
+@click.option(
+    "--name",
+    default=None,
+    help="Worker name recorded on its leases (default: host:pid)"
+)
+@click.option(
+    "--batch",
+    default=1,
+    type=int,
+    help="Tasks leased at a time (default: 1)"
+)
+def worker(config, name, batch):
+    """Run crawl tasks queued by `main.py daemon --queue`."""
+    from src.tasks import Worker, open_queue
+
+    agent = Agent(config_path=config)
+    cfg = agent.config.get("tasks") or {}
+    try:
+        crawler = Worker(open_queue(cfg), agent.run_task, name=name, batch=batch,
+                         idle_sleep=cfg.get("idle_sleep", 5))
+    except Exception as e:
+        logger.error(f"Cannot open task queue: {e}")
+        sys.exit(1)
+    click.echo(f"Worker {crawler.name} waiting for tasks. Press Ctrl+C to stop.")
+    # Returns on SIGTERM/SIGINT once the running task has finished.
+    crawler.install_signal_handlers()
+    crawler.run()
+    agent.parser.close()
+    click.echo("\nWorker stopped.")
+
+
+@cli.command()
+@click.option(
+    "--config",
+    type=click.Path(exists=True),
+    help="Path to config.yaml"
+)
+@click.option(
+    "--requeue-dead",
+    is_flag=True,
+    help="Retry every task in the dead-letter queue"
+)
+def tasks(config, requeue_dead):
+    """Show the crawl task queue and its dead-letter queue."""
+    import yaml
+    from src.agent import CONFIG_PATH
+    from src.tasks import open_queue
+
+    with open(config or CONFIG_PATH) as f:
+        cfg = yaml.safe_load(f) or {}
+    queue = open_queue(cfg.get("tasks"))
+    if requeue_dead:
+        click.echo(f"Requeued {queue.requeue_dead()} dead tasks")
+    stats = queue.stats()
+    click.echo("Tasks: " + (", ".join(f"{n} {state}" for state, n in sorted(stats.items()))
+                            or "none"))
+    dead = queue.dead()
+    if dead:
+        click.echo(f"\nDead letters ({stats.get('dead', len(dead))}):")
+        for task in dead:
+            click.echo(f"  {task['source'] + ': ' + task['key']:<48} p{task['page']:<3} "
+                       f"{task['attempts']} attempts  {task['last_error'] or ''}")
+
+
 @cli.command()
 @click.option(
     "--host",
@@ -70,13 +511,37 @@ def daemon(config):
     type=int,
     help="Port to listen on (default: 5000)"
 )
-def web(host, port):
+@click.option(
+    "--production",
+    is_flag=True,
+    help="Serve with a multi-worker WSGI server (Gunicorn) instead of the dev server"
+)
+@click.option(
+    "--workers",
+    default=2,
+    type=int,
+    help="Worker processes in production mode (default: 2)"
+)
+@click.option(
+    "--threads",
+    default=8,
+    type=int,
+    help="Threads per worker in production mode (default: 8)"
+)
+def web(host, port, production, workers, threads):
     """Launch the web dashboard."""
     try:
+        from src import db
         from src.web import app
+        if not production:
+            db.init_db()  # the production server does this in prepare_app
         click.echo(f"Starting web dashboard at http://{host}:{port}")
         click.echo("Press Ctrl+C to stop.")
-        app.run(debug=False, host=host, port=port)
+        if production:
+            from src.server import serve
+            serve(app, host=host, port=port, workers=workers, threads=threads)
+        else:
+            app.run(debug=False, host=host, port=port)
     except KeyboardInterrupt:
         click.echo("\nWeb server stopped.")
     except Exception as e:
@@ -102,11 +567,41 @@ def web(host, port):
     help="Port for web app (default: 5000)"
 )
 def all(config, host, port):
-    """Run agent daemon AND web server (requires tmux or similar)."""
-    click.echo("To run both daemon and web:")
-    click.echo(f"  Terminal 1: python main.py daemon --config {config or 'src/config.yaml'}")
-    click.echo(f"  Terminal 2: python main.py web --host {host} --port {port}")
-    click.echo("\nOr use a process manager like supervisord or systemd.")
+    """Run the agent daemon and the web dashboard in one process.
+
+    The dashboard is served from a background thread and the scheduler runs
+    in the main thread.  New items reach open dashboards as soon as a cycle
+    saves them, without the live feed polling the database.  Both threads
+    open connections through ``db.connect`` (WAL, with a busy timeout), so
+    the dashboard's reads do not wait on the scheduler's writes.
+    """
+    agent = None
+    server = None
+    try:
+        from src.events import bus
+        from src.server import prepare_app, serve_background
+        from src.web import app, feed
+
+        agent = Agent(config_path=config)
+        feed.attach(bus)
+        server = serve_background(prepare_app(app), host, port)
+        click.echo(f"Web dashboard at http://{host}:{port}")
+        click.echo("Press Ctrl+C to stop.")
+        # Returns on SIGTERM/SIGINT once the running search has finished.
+        agent.run_scheduled()
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"Error: {e}", exc_info=True)
+        sys.exit(1)
+    finally:
+        if server is not None:
+            feed.stop()
+            server.shutdown()
+            server.server_close()
+        if agent:
+            agent.close(timeout=10)
+    click.echo("\nStopped.")
 
 
 if __name__ == "__main__":
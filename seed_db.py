@@ -1,17 +1,40 @@
-from src.db import init_db, add_items
-
-init_db()
-
-test_items = [
-    {'source': 'ebay', 'title': 'BMW M3 E92 Meistershaft Exhaust System', 'price': '$1,299.99', 'url': 'https://example.com/1', 'keyword': 'Meistershaft exhaust', 'category': 'Exhaust/Drivetrain', 'image': None},
-    {'source': 'forum:e90post', 'title': 'OEM M3 Brake Pads Set - New Condition', 'price': '$89.50', 'url': 'https://example.com/2', 'keyword': 'M3 brakes', 'category': 'Brakes', 'image': None},
-    {'source': 'ebay', 'title': 'KW Suspension V3 Coilovers E9x M3', 'price': '$1,599.00', 'url': 'https://example.com/3', 'keyword': 'E9x suspension', 'category': 'Suspension', 'image': None},
-    {'source': 'forum:m3cutters', 'title': 'Carbon Fiber Spoiler - E92 M3', 'price': '$450.00', 'url': 'https://example.com/4', 'keyword': 'E9x parts', 'category': 'Exterior', 'image': None},
-    {'source': 'forum:bimmerpost', 'title': 'Lightweight Wheels 19" OEM Style', 'price': '$750.00', 'url': 'https://example.com/5', 'keyword': 'E9x suspension', 'category': 'Wheels', 'image': None},
-    {'source': 'ebay', 'title': 'E92 M3 Recaro Seats - Black Leather', 'price': '$1,200.00', 'url': 'https://example.com/6', 'keyword': 'interior', 'category': 'Interior', 'image': None},
-    {'source': 'forum:e90post', 'title': 'M3 E9x Front Bumper with Splitter', 'price': '$350.00', 'url': 'https://example.com/7', 'keyword': 'bumper', 'category': 'Exterior', 'image': None},
-    {'source': 'ebay', 'title': 'Brembo M4 Brake Rotors Set', 'price': '$299.99', 'url': 'https://example.com/8', 'keyword': 'brake rotor', 'category': 'Brakes', 'image': None},
-]
-
-count = add_items(test_items)
-print(f'Added {count} test items to database')
+"""Fill a database with synthetic items for testing the dashboard at scale.
+
+    python seed_db.py                           # 1M items into src/parts.db
+    python seed_db.py --items 5000000 --db /tmp/big.db
+"""
+
+import logging
+from pathlib import Path
+
+import click
+
+from src import db
+from src.synthetic import seed_database
+
+
+@click.command()
+@click.option("--items", default=1_000_000, type=int, help="Number of items to add (default: 1,000,000)")
+@click.option("--db", "db_path", type=click.Path(dir_okay=False),
+              help="SQLite file to fill (default: src/parts.db)")
+@click.option("--days", default=365, type=int, help="Spread found dates over this many days (default: 365)")
+@click.option("--archived", default=0.3, type=float, help="Rough share of archived items (default: 0.3)")
+@click.option("--seed", default=0, type=int, help="Random seed (default: 0)")
+def main(items, db_path, days, archived, seed):
+    """Add ITEMS realistic synthetic items to the database."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    path = Path(db_path) if db_path else db.DB_PATH
+    with click.progressbar(length=items, label=f"Seeding {path}") as bar:
+        last = [0]
+
+        def progress(done):
+            bar.update(done - last[0])
+            last[0] = done
+
+        count = seed_database(path, items, seed=seed, days=days, archived_share=archived,
+                              progress=progress)
+    click.echo(f"Added {count} items to {path}")
+
+
+if __name__ == "__main__":
+    main()
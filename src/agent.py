@@ -1,30 +1,74 @@
 """Main agent orchestrator."""
 
 import logging
+import re
 import yaml
 from pathlib import Path
-from typing import List, Dict
-import schedule
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Set, Tuple
+import functools
+import threading
 import time
 
-from src.sources import search_ebay, search_forums, search_facebook, scrape_m3post_sections
+from src.sources import (search_ebay, search_forums, search_facebook, scrape_m3post_page,
+                         scrape_m3post_sections)
+from src.sources.forum import M3POST_PAGES, M3POST_SECTIONS
 from src.cache import Cache
 from src.notifiers import SMSNotifier, StdoutNotifier
-from src import db
+from src.outbox import OutboxDispatcher
+from src.parsing import ParsePool
+from src.polling import PollScheduler
+from src.query_plan import Query, marginal_yield, plan_queries, tag_results
+from src.rules import RuleIndex, WatchRule
+from src.scheduler import Scheduler
+from src.tasks import Task, TaskKey, TaskQueue
+from src.thumbnails import ThumbnailCache
+from src import db, events, fetch, instrument, metrics
 
 logger = logging.getLogger(__name__)
 
 CONFIG_PATH = Path(__file__).parent / "config.yaml"
 
+# Poll unit of the M3Post section crawl (see src/polling.py).
+M3POST_UNIT = ("forum:m3post", "sections")
+
+# Daemon jobs (keys of the ``schedule`` config section) and the poll-unit
+# source each one searches.
+SOURCE_JOBS = {"m3post": "forum:m3post", "ebay": "ebay", "forums": "forums"}
+
 
 class Agent:
     """Main parts-finding agent that orchestrates searches and notifications."""
 
-    def __init__(self, config_path: str = None):
+    def __init__(self, config_path: str = None, offline: bool = False,
+                 queue: Optional[TaskQueue] = None):
         self.config_path = config_path or CONFIG_PATH
         self.config = self._load_config()
+        # Offline (replay) cycles must not text anyone or fetch images.
+        self.offline = offline
+        if offline:
+            self.config.setdefault("notifications", {})["sms_enabled"] = False
+            self.config["prefetch_thumbnails"] = False
         self.cache = Cache()
         self.notifiers = self._init_notifiers()
+        notify_cfg = self.config.get("notifications", {})
+        self.outbox = OutboxDispatcher(
+            {notifier.name: notifier for notifier in self.notifiers},
+            max_workers=notify_cfg.get("outbox_workers", 4),
+            max_attempts=notify_cfg.get("outbox_max_attempts", 8),
+            timeouts=notify_cfg.get("notifier_timeouts"),
+            concurrency=notify_cfg.get("notifier_concurrency"),
+        )
+        self.rules = self._init_rules()
+        self.parser = ParsePool.from_config(self.config.get("parsing"))
+        self.thumbnails = ThumbnailCache() if self.config.get("prefetch_thumbnails", True) else None
+        self.ebay_watermarks: Optional[Dict[str, str]] = None
+        # Replayed cycles must not teach the live poll schedule.
+        self.poller = None if offline else PollScheduler.from_config(self.config)
+        self._polled: Dict[Tuple[str, str], Tuple[List[Dict], Optional[int]]] = {}
+        self.scheduler: Optional[Scheduler] = None
+        # With a task queue the daemon coordinates workers instead of searching.
+        self.queue = queue
         self.headers = {
             "User-Agent": self.config.get("user_agent", "Mozilla/5.0")
         }
@@ -46,94 +90,389 @@ class Agent:
         cfg = self.config.get("notifications", {})
         
         if cfg.get("sms_enabled"):
-            notifiers.append(SMSNotifier())
+            notifiers.append(SMSNotifier(
+                digest=cfg.get("sms_digest", True),
+                hourly_budget=cfg.get("sms_hourly_budget"),
+                dashboard_url=cfg.get("dashboard_url"),
+            ))
         
         if cfg.get("stdout_enabled", True):
             notifiers.append(StdoutNotifier())
         
         return notifiers
 
-    def search_all_sources(self) -> List[Dict]:
-        """Search all configured sources."""
+    def _init_rules(self) -> RuleIndex:
+        """Compile watch rules; unmatched items go to every notifier by default."""
+        names = list(self.outbox.notifiers)
+        rules = []
+        for data in self.config.get("watch_rules") or []:
+            try:
+                rule = WatchRule.from_dict(data)
+            except re.error as e:
+                logger.error(f"Skipping watch rule {data.get('name')!r}: bad regex: {e}")
+                continue
+            unknown = [n for n in rule.notifiers if n not in names]
+            if unknown:
+                logger.warning(f"Watch rule {rule.name!r} uses disabled notifiers: {unknown}")
+            rules.append(rule)
+        default = self.config.get("default_notifiers")
+        index = RuleIndex(rules, names if default is None else default)
+        if rules:
+            logger.info(f"Compiled {len(rules)} watch rules")
+        return index
+
+    def route(self, item: Dict) -> List[str]:
+        """Notifiers that should hear about a saved item."""
+        names = self.rules.route(item, db.parse_price_value(item.get("price")))
+        return [name for name in names if name in self.outbox.notifiers]
+
+    def _ebay_queries(self, keywords: List[str]) -> List[Query]:
+        return plan_queries(keywords, self.config.get("ebay", {}).get("terms_per_query", 5))
+
+    @staticmethod
+    def _ebay_max_results(query: Query) -> int:
+        return min(200, 20 * len(query.groups))
+
+    def poll_units(self) -> List[Tuple[str, str]]:
+        """Every ``(source, key)`` search a full cycle runs, in order."""
+        keywords = self.config.get("parts") or []
+        return ([M3POST_UNIT]
+                + [("ebay", query.text) for query in self._ebay_queries(keywords)]
+                + [("forums", keyword) for keyword in keywords])
+
+    @contextmanager
+    def _polling(self, unit: Tuple[str, str]):
+        """Collect one poll unit's results and the HTTP requests it made."""
+        run = instrument.current_run()
+        before = run.http_requests() if run else 0
+        found: List[Dict] = []
+        try:
+            yield found
+        finally:
+            self._polled[unit] = (found, run.http_requests() - before if run else None)
+
+    def search_all_sources(self, due: Optional[Set[Tuple[str, str]]] = None) -> List[Dict]:
+        """Search all configured sources (only the ``due`` poll units, if given)."""
         results = []
         keywords = self.config.get("parts", [])
+        self._polled = {}
+        self.ebay_watermarks = None
 
         # --- M3Post: scrape all threads from configured forum sections ---
         # This runs once per cycle (not per keyword) and grabs everything,
         # skipping posts without a price.
-        try:
-            m3post_results = scrape_m3post_sections(headers=self.headers)
-            results.extend(m3post_results)
-            logger.info(f"M3Post sections: {len(m3post_results)} results")
-        except Exception as e:
-            logger.error(f"M3Post section scrape failed: {e}")
+        if due is None or M3POST_UNIT in due:
+            with self._polling(M3POST_UNIT) as polled:
+                try:
+                    with instrument.span("m3post"):
+                        m3post_results = scrape_m3post_sections(headers=self.headers,
+                                                                parser=self.parser)
+                    polled.extend(m3post_results)
+                    results.extend(m3post_results)
+                    logger.info(f"M3Post sections: {len(m3post_results)} results")
+                except Exception as e:
+                    logger.error(f"M3Post section scrape failed: {e}")
 
         if not keywords:
             logger.warning("No parts configured in config.yaml")
             return results
 
-        # --- Keyword-based searches (eBay, other forums, Facebook) ---
+        # --- eBay: planned queries (equivalent keywords merged, the rest
+        # combined into OR queries; results tagged with every keyword) ---
+        results.extend(self.search_ebay_planned(keywords, due=due))
+
+        # --- Keyword-based searches (other forums, Facebook) ---
         for keyword in keywords:
+            if due is not None and ("forums", keyword) not in due:
+                continue
             logger.info(f"Searching for: {keyword}")
 
-            # eBay
-            try:
-                ebay_results = search_ebay(keyword, headers=self.headers)
-                results.extend(ebay_results)
-                logger.info(f"  eBay: {len(ebay_results)} results")
-            except Exception as e:
-                logger.error(f"  eBay search failed: {e}")
-
-            # Other forums (e90post, m3cutters, bimmerpost — m3post handled above)
-            try:
-                forum_results = search_forums(keyword, headers=self.headers)
-                results.extend(forum_results)
-                logger.info(f"  Forums: {len(forum_results)} results")
-            except Exception as e:
-                logger.error(f"  Forum search failed: {e}")
+            with self._polling(("forums", keyword)) as polled:
+                # Other forums (e90post, m3cutters, bimmerpost — m3post handled above)
+                try:
+                    with instrument.span(f"forums: {keyword}"):
+                        forum_results = search_forums(keyword, headers=self.headers)
+                    polled.extend(forum_results)
+                    logger.info(f"  Forums: {len(forum_results)} results")
+                except Exception as e:
+                    logger.error(f"  Forum search failed: {e}")
 
-            # Facebook (placeholder)
-            try:
-                fb_results = search_facebook(keyword, headers=self.headers)
-                results.extend(fb_results)
-                logger.info(f"  Facebook: {len(fb_results)} results")
-            except Exception as e:
-                logger.error(f"  Facebook search failed: {e}")
+                # Facebook (placeholder)
+                try:
+                    with instrument.span(f"facebook: {keyword}"):
+                        fb_results = search_facebook(keyword, headers=self.headers)
+                    polled.extend(fb_results)
+                    logger.info(f"  Facebook: {len(fb_results)} results")
+                except Exception as e:
+                    logger.error(f"  Facebook search failed: {e}")
+            results.extend(polled)
 
         return results
 
-    def run_once(self):
-        """Execute a single search cycle."""
-        logger.info("Starting search cycle...")
-        results = self.search_all_sources()
+    def search_ebay_planned(self, keywords: List[str],
+                            due: Optional[Set[Tuple[str, str]]] = None) -> List[Dict]:
+        """Run the planned eBay queries for ``keywords``; one item per listing."""
+        queries = self._ebay_queries(keywords)
+        groups = [group for query in queries for group in query.groups]
+        if due is not None:
+            queries = [query for query in queries if ("ebay", query.text) in due]
+        if not queries:
+            return []
+        # Each query asks only for listings newer than its watermark; the
+        # advanced watermarks are stored once the results are saved.
+        self.ebay_watermarks = self._load_watermarks("ebay")
+        found: Dict[str, Dict] = {}
+        for query in queries:
+            with self._polling(("ebay", query.text)) as polled:
+                try:
+                    with instrument.span(f"ebay: {query.text}"):
+                        items = search_ebay(query.text, headers=self.headers,
+                                            max_results=self._ebay_max_results(query),
+                                            watermarks=self.ebay_watermarks)
+                    polled.extend(tag_results(query, items, groups))
+                    logger.info(f"  eBay {query.text}: {len(items)} results")
+                except Exception as e:
+                    logger.error(f"  eBay search {query.text!r} failed: {e}")
+            for item in polled:
+                found.setdefault(item["url"], item)
+        logger.info(f"eBay: {len(found)} listings from {len(queries)} queries "
+                    f"for {len(keywords)} keywords")
+        report = marginal_yield(found.values(), groups)
+        idle = [name for name, r in report.items() if not r["unique"]]
+        if idle:
+            logger.debug(f"eBay keywords with no unique listings this cycle: {', '.join(idle)}")
+        return list(found.values())
+
+    def _load_watermarks(self, source: str) -> Optional[Dict[str, str]]:
+        """Stored watermarks for a source, or None to run full searches.
+
+        Recorded and replayed cycles run full searches so that an archive
+        replays the same way against any database.
+        """
+        if self.offline or fetch.is_replaying() or fetch.is_recording():
+            return None
+        try:
+            db.init_db()
+            return db.get_watermarks(source)
+        except Exception as e:
+            logger.error(f"Failed to load {source} watermarks: {e}")
+            return {}
+
+    def run_once(self, adaptive: bool = False, sources: Optional[Set[str]] = None):
+        """Execute a single search cycle and record its timings in ``runs``.
+
+        With ``adaptive`` (and ``polling.adaptive`` configured) only the
+        searches the poll scheduler says are due run; if none are, nothing
+        happens.  ``sources`` limits the cycle to those poll-unit sources
+        (e.g. ``{"ebay"}``).
+        """
+        due = self._due_units(adaptive, sources)
+        if due is not None:
+            if not due:
+                return
+            logger.info(f"Starting search cycle ({len(due)} searches due)...")
+        else:
+            logger.info("Starting search cycle...")
+        run = instrument.begin_run()
+        try:
+            self._run_cycle(run, due)
+        finally:
+            self._finish_run(run)
+
+    def _due_units(self, adaptive: bool = False,
+                   sources: Optional[Set[str]] = None) -> Optional[Set[Tuple[str, str]]]:
+        """Poll units a cycle should search; None means all of them."""
+        due = None
+        if sources is not None:
+            due = {unit for unit in self.poll_units() if unit[0] in sources}
+        if adaptive and self.poller is not None:
+            ready = set(self.poller.due(self.poll_units()))
+            due = ready if due is None else due & ready
+        return due
+
+    def _finish_run(self, run: instrument.CycleRun):
+        instrument.end_run()
+        summary = run.summary()
+        metrics.CYCLE_SECONDS.observe(summary["duration"])
+        metrics.LAST_CYCLE.set(time.time())
+        logger.info(f"Cycle took {summary['duration']:.1f}s: "
+                    f"{summary['http_requests']} requests, {summary['errors']} errors")
+        try:
+            db.save_run(summary)
+        except Exception as e:
+            logger.error(f"Failed to record run: {e}")
+
+    def _run_cycle(self, run: instrument.CycleRun, due: Optional[Set[Tuple[str, str]]] = None):
+        results = self.search_all_sources(due) if due is not None else self.search_all_sources()
+        self._save_results(run, results)
+
+    def _save_results(self, run: instrument.CycleRun, results: List[Dict]):
+        """Dedupe, save and notify a cycle's search results."""
+        run.results = len(results)
+        metrics.count_items(metrics.ITEMS_FOUND, results)
         logger.info(f"Total results: {len(results)}")
         
         # Filter for new items
-        new_items = self.cache.get_unseen(results)
+        with instrument.span("dedupe"):
+            new_items = self.cache.get_unseen(results)
+        run.new_items = len(new_items)
         logger.info(f"New items: {len(new_items)}")
         
-        # Save to database
-        db.init_db()
-        saved_count = db.add_items(new_items)
+        # Save to database, queueing a notification for each notifier the
+        # watch rules route the item to, in the same transaction; the outbox
+        # dispatcher delivers them off-thread.
+        with instrument.span("db_insert"):
+            db.init_db()
+            saved_count = db.add_items(new_items, notifiers=self.route)
+        run.saved = saved_count
+        if self.ebay_watermarks:
+            db.set_watermarks("ebay", self.ebay_watermarks)
+        self._record_polls()
+        saved = [item for item in new_items if item.get("id")]
+        run.add_yield(saved)
+        metrics.count_items(metrics.ITEMS_NEW, saved)
         logger.info(f"Saved {saved_count} new items to database")
-        
-        # Notify for new items
-        if new_items:
-            for notifier in self.notifiers:
-                try:
-                    notifier.send_items(new_items)
-                except Exception as e:
-                    logger.error(f"Notification failed: {e}")
+        if saved:
+            events.bus.publish(events.NEW_ITEMS, saved)
+        with instrument.span("notify"):
+            self.outbox.start()
+            if saved_count:
+                self.outbox.wake()
+
+        # Warm the dashboard's thumbnail cache while image URLs are fresh
+        if new_items and self.thumbnails:
+            self.thumbnails.prefetch(item.get("image") for item in new_items)
 
-    def schedule_runs(self):
-        """Schedule recurring searches (requires external run loop)."""
-        interval_secs = self.config.get("search_interval", 1800)
-        schedule.every(interval_secs).seconds.do(self.run_once)
-        logger.info(f"Scheduled searches every {interval_secs} seconds")
+    def _record_polls(self):
+        """Teach the poll scheduler each search's new-item yield and cost."""
+        if self.poller is None or not self._polled:
+            return
+        try:
+            for unit, (found, requests) in self._polled.items():
+                self.poller.record(unit, sum(1 for item in found if item.get("id")), requests)
+            self.poller.replan()
+            self.poller.save()
+        except Exception as e:
+            logger.error(f"Failed to update poll schedule: {e}")
+
+    # --- Distributed crawling (see src/tasks.py) ---------------------------
+
+    def task_keys(self, units: List[Tuple[str, str]]) -> List[TaskKey]:
+        """Crawl tasks for poll units: one per M3Post section page, else one per unit."""
+        keys: List[TaskKey] = []
+        for source, key in units:
+            if (source, key) == M3POST_UNIT:
+                keys.extend((source, str(section["forum_id"]), page)
+                            for section in M3POST_SECTIONS
+                            for page in range(1, M3POST_PAGES + 1))
+            else:
+                keys.append((source, key, 1))
+        return keys
+
+    def enqueue_tasks(self, adaptive: bool = False, sources: Optional[Set[str]] = None) -> int:
+        """Queue the searches a cycle would run (see ``run_once``) for workers."""
+        due = self._due_units(adaptive, sources)
+        units = [unit for unit in self.poll_units() if due is None or unit in due]
+        if not units:
+            return 0
+        added = self.queue.enqueue(self.task_keys(units))
+        logger.info(f"Queued {added} crawl tasks for {len(units)} searches")
+        return added
+
+    def run_task(self, task: Task) -> List[Dict]:
+        """Run one crawl task (on a worker) and return the items it found."""
+        if task.source == M3POST_UNIT[0]:
+            return scrape_m3post_page(int(task.key), task.page, headers=self.headers,
+                                      parser=self.parser)
+        if task.source == "ebay":
+            queries = self._ebay_queries(self.config.get("parts") or [])
+            query = next((q for q in queries if q.text == task.key), None)
+            if query is None:
+                raise ValueError(f"eBay query {task.key!r} is not in this worker's plan "
+                                 f"(config differs from the coordinator's?)")
+            groups = [group for q in queries for group in q.groups]
+            items = search_ebay(query.text, headers=self.headers,
+                                max_results=self._ebay_max_results(query))
+            return tag_results(query, items, groups)
+        if task.source == "forums":
+            return (search_forums(task.key, headers=self.headers)
+                    + search_facebook(task.key, headers=self.headers))
+        raise ValueError(f"Unknown task source {task.source!r}")
+
+    def ingest_tasks(self, limit: int = 500) -> int:
+        """Save the results workers pushed back, as one recorded cycle.
+
+        Results are acknowledged only after they are saved.  A result that
+        is ingested again after a crash adds nothing: items are unique by
+        URL, and outbox rows are only written for new items.
+
+        Returns:
+            The number of task results ingested.
+        """
+        rows = self.queue.results(limit)
+        if not rows:
+            return 0
+        logger.info(f"Ingesting {len(rows)} task results...")
+        run = instrument.begin_run()
+        try:
+            self._polled = {}
+            self.ebay_watermarks = None
+            results: List[Dict] = []
+            for row in rows:
+                unit = M3POST_UNIT if row["source"] == M3POST_UNIT[0] else (row["source"], row["key"])
+                found, requests = self._polled.get(unit, ([], 0))
+                self._polled[unit] = (found + row["items"], requests + (row["requests"] or 0))
+                results.extend(row["items"])
+            self._save_results(run, results)
+            self.queue.ack([row["id"] for row in rows])
+        finally:
+            self._finish_run(run)
+        return len(rows)
+
+    def close(self, timeout: float = 60.0):
+        """Deliver pending notifications (up to ``timeout``) before exiting."""
+        self.parser.close()
+        if self.thumbnails is not None:
+            self.thumbnails.close()
+        self.outbox.stop(timeout=timeout)
+
+    def build_scheduler(self) -> Scheduler:
+        """The daemon's jobs: one per source, or one adaptive-polling check.
+
+        Intervals and jitter come from the ``schedule`` config section
+        (interval defaults to ``search_interval``).  Each source's first run
+        is right away, delayed only by its jitter.  With a task queue the
+        jobs enqueue crawl tasks instead of searching, and an ``ingest`` job
+        saves the workers' results every ``tasks.ingest_interval`` seconds.
+        """
+        scheduler = Scheduler()
+        # A coordinator queues the searches for workers and ingests their results.
+        cycle = self.enqueue_tasks if self.queue is not None else self.run_once
+        if self.queue is not None:
+            scheduler.add("ingest", self.ingest_tasks,
+                          (self.config.get("tasks") or {}).get("ingest_interval", 30))
+        if self.poller is not None:
+            scheduler.add("adaptive", functools.partial(cycle, adaptive=True),
+                          self.poller.tick)
+            logger.info(f"Adaptive polling: checking for due searches every "
+                        f"{self.poller.tick} seconds")
+            return scheduler
+        default = self.config.get("search_interval", 1800)
+        jobs = self.config.get("schedule") or {}
+        for name, source in SOURCE_JOBS.items():
+            job = jobs.get(name) or {}
+            scheduler.add(name, functools.partial(cycle, sources={source}),
+                          job.get("interval", default), jitter=job.get("jitter", 0))
+        return scheduler
 
     def run_scheduled(self):
-        """Blocking loop for scheduled searches."""
-        self.schedule_runs()
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+        """Run scheduled searches until ``stop_scheduled`` (or SIGTERM/SIGINT)."""
+        self.scheduler = self.build_scheduler()
+        if threading.current_thread() is threading.main_thread():
+            self.scheduler.install_signal_handlers()
+        self.scheduler.run()
+
+    def stop_scheduled(self):
+        """Make ``run_scheduled`` return once the current search finishes."""
+        if self.scheduler is not None:
+            self.scheduler.stop()
@@ -0,0 +1,113 @@
+"""Fingerprinted static assets with precompressed variants.
+
+At startup every file under ``src/static`` is hashed and, if it is a text
+type that compresses well, gzipped once in memory.  Templates reference
+assets through ``asset_url('css/style.css')``, which yields a content-hashed
+URL such as ``/assets/css/style.3f2a9c1b7d4e.css``.  Because the name changes
+whenever the content does, those responses can be cached by browsers for a
+year without revalidation.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).parent / "static"
+
+ASSET_URL_PREFIX = "/assets/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Only text-like types are worth compressing; images are already compressed.
+COMPRESSIBLE_TYPES = {
+    "text/css", "text/javascript", "application/javascript",
+    "image/svg+xml", "application/json", "text/plain",
+}
+MIN_GZIP_SIZE = 512  # bytes; below this the gzip header outweighs the gain
+
+
+class Asset:
+    """One static file with its fingerprint and optional gzip body."""
+
+    def __init__(self, logical: str, path: Path):
+        self.logical = logical
+        self.path = path
+        self.mtime = path.stat().st_mtime
+        data = path.read_bytes()
+        self.size = len(data)
+        self.digest = hashlib.sha256(data).hexdigest()[:12]
+        self.mimetype = mimetypes.guess_type(logical)[0] or "application/octet-stream"
+
+        stem, dot, ext = logical.rpartition(".")
+        self.name = f"{stem}.{self.digest}.{ext}" if dot else f"{logical}.{self.digest}"
+
+        # Text assets are kept in memory (they are small) alongside a
+        # precompressed copy; everything else is streamed from disk.
+        self.body: Optional[bytes] = None
+        self.gzipped: Optional[bytes] = None
+        if self.mimetype in COMPRESSIBLE_TYPES:
+            self.body = data
+            if self.size >= MIN_GZIP_SIZE:
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(compressed) < self.size:
+                    self.gzipped = compressed
+
+
+class AssetManifest:
+    """Maps logical asset paths to fingerprinted names and back.
+
+    Args:
+        static_dir: Directory to scan.
+        auto_reload: Re-fingerprint an asset when its file changes (for
+            development; costs one ``stat`` per ``url_for`` call).
+    """
+
+    def __init__(self, static_dir: Path = STATIC_DIR, auto_reload: bool = False):
+        self.static_dir = Path(static_dir)
+        self.auto_reload = auto_reload
+        self._by_logical: Dict[str, Asset] = {}
+        self._by_name: Dict[str, Asset] = {}
+        self.build()
+
+    def build(self):
+        """Scan the static directory and fingerprint every file."""
+        self._by_logical.clear()
+        self._by_name.clear()
+        if not self.static_dir.is_dir():
+            return
+        for root, _, files in os.walk(self.static_dir):
+            for filename in files:
+                path = Path(root) / filename
+                logical = path.relative_to(self.static_dir).as_posix()
+                self._add(Asset(logical, path))
+        logger.info(f"Fingerprinted {len(self._by_logical)} static assets")
+
+    def _add(self, asset: Asset):
+        old = self._by_logical.get(asset.logical)
+        if old is not None:
+            self._by_name.pop(old.name, None)
+        self._by_logical[asset.logical] = asset
+        self._by_name[asset.name] = asset
+
+    def url_for(self, logical: str) -> str:
+        """Return the fingerprinted URL for ``logical`` (plain /static/ if unknown)."""
+        asset = self._by_logical.get(logical)
+        if asset is not None and self.auto_reload:
+            try:
+                if asset.path.stat().st_mtime != asset.mtime:
+                    asset = Asset(logical, asset.path)
+                    self._add(asset)
+            except OSError:
+                asset = None
+        if asset is None:
+            return f"/static/{logical}"
+        return ASSET_URL_PREFIX + asset.name
+
+    def lookup(self, name: str) -> Optional[Asset]:
+        """Find an asset by its fingerprinted name."""
+        return self._by_name.get(name)
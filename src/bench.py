@@ -0,0 +1,368 @@
+"""Offline benchmark suite.
+
+Everything runs against checked-in fixtures (``tests/fixtures``) served
+through ``fetch.replaying`` and a throwaway SQLite database, so results are
+comparable between machines and commits without network access::
+
+    python main.py bench --output bench.json
+    python main.py bench --baseline bench.json      # flag regressions
+
+Each benchmark is timed in loops calibrated to ``min_time``; the reported
+``per_call_ms`` is the median over ``repeat`` rounds.
+"""
+
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from src import db, fetch
+
+FIXTURES_DIR = Path(__file__).parent.parent / "tests" / "fixtures"
+
+M3POST_LISTING_URL = "https://www.m3post.com/forums/forumdisplay.php?f=182&order=desc&page=1"
+M3POST_THREAD_URL = "https://www.m3post.com/forums/showthread.php?t=1700074"
+BENCH_KEYWORD = "coilovers"
+
+WEB_ROUTES = [
+    "/",
+    "/recent",
+    "/category/Wheels",
+    "/search?q=coilovers",
+    "/api/items",
+    "/api/search?category=Wheels&max_price=1000",
+    "/api/search?q=coilovers",
+    "/stats",
+]
+
+_SOURCES = ["ebay", "ebay", "ebay", "forum:m3post", "forum:m3post", "forum:e90post",
+            "forum:bimmerpost", "forum:m3cutters"]
+_PARTS = ["BBS CH-R wheels", "KW V3 coilovers", "Akrapovic evo exhaust", "OEM carbon roof",
+          "CSL trunk lid", "Recaro Sportster CS seats", "Brembo GT brake kit", "Apex ARC-8 wheels",
+          "Supersprint X-pipe", "Vorsteiner hood", "front lip spoiler", "Dinan intake",
+          "Eibach springs", "Stoptech rotors", "Gintani tune", "subframe mounts", "iDrive retrofit",
+          "DCT paddles", "mirror caps", "PS4S tires", "alcantara steering wheel", "rod bearings",
+          "H&R sway bars", "LCI tail lights", "Harman Kardon amp", "bumper", "diffuser", "grille"]
+
+
+def load_fixture(name: str) -> bytes:
+    return (FIXTURES_DIR / name).read_bytes()
+
+
+def synthetic_items(n: int, seed: int = 0, start: int = 0) -> List[Dict]:
+    """``n`` plausible, unique items (urls numbered from ``start``)."""
+    rng = random.Random(seed)
+    items = []
+    for i in range(start, start + n):
+        part = rng.choice(_PARTS)
+        price = rng.choice([45, 90, 150, 240, 450, 700, 1200, 1850, 2600, 4200, 6500])
+        items.append({
+            "source": rng.choice(_SOURCES),
+            "title": f"E9X M3 {part} #{i}",
+            "price": rng.choice([f"${price:,}", f"{price}.00 USD", "Contact"]),
+            "url": f"https://bench.example.com/item/{i}",
+            "image": None,
+            "keyword": part.split()[-1],
+        })
+    return items
+
+
+def fixture_replay_entries() -> List[Dict]:
+    """Replay entries that answer the scrapers' requests with the fixtures."""
+    from src.sources.ebay import EBAY_API_URLS, EBAY_BASE_URL, EBAY_ENV
+    from src.sources.forum import FORUMS
+
+    html = {"Content-Type": "text/html; charset=ISO-8859-1"}
+    json_type = {"Content-Type": "application/json"}
+    ebay_query = urlencode({
+        "q": f"{BENCH_KEYWORD} E9X M3",
+        "limit": 20,
+        "sort": "newlyListed",
+        "filter": "buyingOptions:{AUCTION|FIXED_PRICE}",
+    })
+    forum = FORUMS[0]
+    return [
+        {"method": "GET", "url": M3POST_LISTING_URL, "headers": html,
+         "body": load_fixture("m3post_listing.html")},
+        {"method": "GET", "url": M3POST_THREAD_URL, "headers": html,
+         "body": load_fixture("m3post_thread.html")},
+        {"method": "POST", "url": f"{EBAY_API_URLS.get(EBAY_ENV)}/identity/oauth2/token",
+         "headers": json_type, "body": b'{"access_token": "bench", "expires_in": 7200}'},
+        {"method": "GET", "headers": json_type, "body": load_fixture("ebay_browse.json"),
+         "url": fetch._full_url("GET", f"{EBAY_BASE_URL}/buy/browse/v1/item_summary/search?{ebay_query}", None)},
+        {"method": "GET", "headers": html, "body": load_fixture("forum_search.html"),
+         "url": fetch._full_url("GET", forum["base_url"].rstrip("/") + forum["search_endpoint"],
+                                {"q": BENCH_KEYWORD})},
+    ]
+
+
+def text_corpus() -> List[str]:
+    """Titles and post lines from the fixtures, for the text benchmarks."""
+    from bs4 import BeautifulSoup
+
+    corpus = []
+    listing = BeautifulSoup(load_fixture("m3post_listing.html"), "lxml")
+    corpus += [a.get_text(strip=True) for a in listing.select('a[id^="thread_title_"]')]
+    thread = BeautifulSoup(load_fixture("m3post_thread.html"), "lxml")
+    for post in thread.select('div[id^="post_message_"]'):
+        corpus += [line for line in post.get_text("\n").splitlines() if line.strip()]
+    corpus += [item["title"] for item in json.loads(load_fixture("ebay_browse.json"))["itemSummaries"]]
+    return corpus
+
+
+def measure(fn: Callable[[], object], min_time: float = 0.2, repeat: int = 5,
+            per_call: int = 1) -> Dict:
+    """Time ``fn``: calibrate loops to ``min_time`` per round, then ``repeat`` rounds.
+
+    ``per_call`` divides the result when one call processes several units
+    (e.g. a whole corpus), so numbers are per unit.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 2 if elapsed < min_time / 4 else max(int(min_time / max(elapsed, 1e-9)) + 1, 2)
+        loops = min(loops, 1_000_000)
+
+    rounds = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        rounds.append((time.perf_counter() - start) / loops)
+    per_unit = [r / per_call for r in rounds]
+    median = statistics.median(per_unit)
+    return {
+        "per_call_ms": round(median * 1000, 6),
+        "min_ms": round(min(per_unit) * 1000, 6),
+        "max_ms": round(max(per_unit) * 1000, 6),
+        "ops_per_sec": round(1 / median, 1) if median else None,
+        "loops": loops,
+        "rounds": repeat,
+    }
+
+
+def _parsing_benchmarks() -> List[Tuple[str, Callable, int]]:
+    from src.sources.ebay import search_ebay
+    from src.sources.forum import (FORUMS, _BROWSER_HEADERS, _fetch_m3post_listing_page,
+                                   _parse_thread_details_fast, _parse_thread_details_soup,
+                                   extract_thread_details, search_generic_forum)
+
+    thread_html = load_fixture("m3post_thread.html").decode()
+
+    def listing():
+        threads = _fetch_m3post_listing_page(1, dict(_BROWSER_HEADERS))
+        assert threads, "listing fixture produced no threads"
+
+    def thread():
+        details = extract_thread_details(M3POST_THREAD_URL, headers=dict(_BROWSER_HEADERS))
+        assert details["price"], "thread fixture produced no price"
+
+    def thread_fast():
+        assert _parse_thread_details_fast(thread_html, M3POST_THREAD_URL)["image"]
+
+    def thread_soup():
+        assert _parse_thread_details_soup(thread_html, M3POST_THREAD_URL)["image"]
+
+    def ebay():
+        assert search_ebay(BENCH_KEYWORD), "eBay fixture produced no items"
+
+    def forum():
+        assert search_generic_forum(FORUMS[0], BENCH_KEYWORD), "forum fixture produced no items"
+
+    return [
+        ("parse.m3post_listing", listing, 1),
+        ("parse.m3post_thread", thread, 1),
+        ("parse.thread_details_lxml", thread_fast, 1),
+        ("parse.thread_details_soup", thread_soup, 1),
+        ("parse.ebay_search", ebay, 1),
+        ("parse.forum_search", forum, 1),
+    ]
+
+
+def price_corpus() -> List[Dict]:
+    """Labelled texts (``text`` and expected asking ``price`` or null)."""
+    return json.loads(load_fixture("price_corpus.json"))
+
+
+def price_accuracy(corpus: Optional[List[Dict]] = None) -> Dict:
+    """Share of the labelled corpus where ``best_price`` finds the expected value."""
+    from src.prices import best_prices
+
+    corpus = corpus if corpus is not None else price_corpus()
+    found = best_prices(entry["text"] for entry in corpus)
+    misses = [entry["text"] for entry, best in zip(corpus, found)
+              if (best.value if best else None) != entry["price"]]
+    return {"cases": len(corpus), "correct": len(corpus) - len(misses),
+            "accuracy": round(1 - len(misses) / len(corpus), 4) if corpus else 0.0,
+            "misses": misses}
+
+
+def _text_benchmarks() -> List[Tuple[str, Callable, int]]:
+    from src.prices import extract_prices_many
+    from src.sources.forum import extract_price
+
+    corpus = text_corpus()
+    labelled = [entry["text"] for entry in price_corpus()]
+
+    def prices():
+        for text in corpus:
+            extract_price(text)
+
+    def candidates():
+        extract_prices_many(labelled)
+
+    def categories():
+        for text in corpus:
+            db.categorize_item(text, BENCH_KEYWORD)
+
+    return [
+        ("text.extract_price", prices, len(corpus)),
+        ("text.extract_prices_batch", candidates, len(labelled)),
+        ("text.categorize_item", categories, len(corpus)),
+    ]
+
+
+def build_synthetic_db(path: Path, n: int, seed: int = 0, days: int = 60):
+    """Create a database of ``n`` synthetic items spread over ``days`` days."""
+    db.DB_PATH = path
+    db.init_db()
+    batch = 5000
+    for start in range(0, n, batch):
+        db.add_items(synthetic_items(min(batch, n - start), seed=seed + start, start=start))
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE items SET found_date = datetime('now', '-' || (id % ?) || ' days', "
+                 "'-' || (id % 1440) || ' minutes')", (days,))
+    conn.commit()
+    conn.close()
+
+
+def _db_benchmarks(workdir: Path, batch: int = 500) -> List[Tuple[str, Callable, int]]:
+    db.DB_PATH = workdir / "insert.db"
+    db.init_db()
+    counter = {"next": 0}
+
+    def insert():
+        start = counter["next"]
+        counter["next"] += batch
+        assert db.add_items(synthetic_items(batch, seed=start, start=start)) == batch
+
+    return [("db.add_items", insert, batch)]
+
+
+def _web_benchmarks(workdir: Path, n_items: int) -> List[Tuple[str, Callable, int]]:
+    from src.web import app
+
+    build_synthetic_db(workdir / "web.db", n_items)
+    client = app.test_client()
+    benches = []
+    for route in WEB_ROUTES:
+        def get(route=route):
+            resp = client.get(route)
+            assert resp.status_code == 200, f"{route} returned {resp.status_code}"
+        benches.append((f"web.{route}", get, 1))
+    return benches
+
+
+def run(only: Optional[str] = None, n_items: int = 20000, min_time: float = 0.2,
+        repeat: int = 5, log: Callable[[str], None] = print) -> Dict:
+    """Run the suite and return results as a JSON-serialisable dict.
+
+    Args:
+        only: Substring filter on benchmark names.
+        n_items: Size of the synthetic database behind the web benchmarks.
+        min_time: Seconds per timing round.
+        repeat: Timing rounds per benchmark.
+        log: Progress callback.
+    """
+    results: Dict[str, Dict] = {}
+    saved_path = db.DB_PATH
+    with tempfile.TemporaryDirectory(prefix="partsfinder-bench-") as tmp:
+        workdir = Path(tmp)
+        groups = [
+            ("parse", _parsing_benchmarks),
+            ("text", _text_benchmarks),
+            ("db", lambda: _db_benchmarks(workdir)),
+            ("web", lambda: _web_benchmarks(workdir, n_items)),
+        ]
+        try:
+            with fetch.replaying(entries=fixture_replay_entries()):
+                for group, make in groups:
+                    if only and only not in group and not any(
+                            only in name for name in _group_names(group)):
+                        continue
+                    for name, fn, units in make():
+                        if only and only not in name:
+                            continue
+                        results[name] = measure(fn, min_time=min_time, repeat=repeat,
+                                                per_call=units)
+                        log(f"{name:<48} {results[name]['per_call_ms']:>12.4f} ms")
+        finally:
+            db.DB_PATH = saved_path
+
+    output = {"meta": _meta(n_items), "benchmarks": results}
+    if any(name.startswith("text.extract_price") for name in results):
+        output["accuracy"] = {"extract_price": price_accuracy()}
+        log(f"{'price extraction accuracy':<48} {output['accuracy']['extract_price']['accuracy']:>12.1%}")
+    return output
+
+
+def _group_names(group: str) -> List[str]:
+    if group == "web":
+        return [f"web.{route}" for route in WEB_ROUTES]
+    return {
+        "parse": ["parse.m3post_listing", "parse.m3post_thread", "parse.thread_details_lxml",
+                  "parse.thread_details_soup", "parse.ebay_search", "parse.forum_search"],
+        "text": ["text.extract_price", "text.extract_prices_batch", "text.categorize_item"],
+        "db": ["db.add_items"],
+    }[group]
+
+
+def _meta(n_items: int) -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=Path(__file__).parent, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sqlite": sqlite3.sqlite_version,
+        "web_db_items": n_items,
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float = 0.2) -> List[Dict]:
+    """Per-benchmark change against a baseline run.
+
+    Returns one row per benchmark present in both, with ``ratio`` (new /
+    old time) and ``regressed`` set when the slowdown exceeds ``threshold``.
+    """
+    rows = []
+    old = baseline.get("benchmarks", {})
+    for name, new in results.get("benchmarks", {}).items():
+        if name not in old or not old[name].get("per_call_ms"):
+            continue
+        ratio = new["per_call_ms"] / old[name]["per_call_ms"]
+        rows.append({
+            "name": name,
+            "baseline_ms": old[name]["per_call_ms"],
+            "current_ms": new["per_call_ms"],
+            "ratio": round(ratio, 3),
+            "regressed": ratio > 1 + threshold,
+        })
+    return rows
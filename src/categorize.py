@@ -0,0 +1,106 @@
+"""Keyword categorisation of listings.
+
+All category keywords are compiled into one lookup table keyed by their
+first word, so categorising a title is one tokenising pass plus a dict
+lookup per word, however many keywords there are.  Keywords match whole
+words (an optional plural "s"/"es" is allowed), so "rim" does not fire
+inside "trim" nor "lip" inside "clip", and multi-word keywords accept any
+run of spaces or punctuation between words ("carbon-fiber").  At each
+position the longest keyword wins, so "steering wheel" counts as Interior
+rather than Wheels; when a title hits several categories the one listed
+first in ``CATEGORIES`` wins.
+"""
+
+import re
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+OTHER = "Other"
+
+# Category -> keywords, highest priority first.  Items matching nothing are OTHER.
+CATEGORIES: Dict[str, List[str]] = {
+    "Exterior": ["bumper", "fender", "hood", "spoiler", "lip", "diffuser", "carbon fiber",
+                 "splitter", "grille", "trim", "cosmetic", "exterior"],
+    "Wheels": ["wheel", "rim", "tire", "tyre"],
+    "Suspension": ["coilover", "suspension", "lowering", "spring", "damper", "shock",
+                   "control arm", "strut", "brake", "chassis", "spacer"],
+    "Interior": ["seat", "interior", "dashboard", "steering wheel", "shifter", "pedal", "mat",
+                 "carpet"],
+    "Engine": ["engine", "motor", "cylinder head", "valve", "valvetronic", "piston", "clutch",
+               "flywheel", "header", "manifold", "exhaust", "muffler", "catback", "downpipe",
+               "intake", "supercharger", "turbo", "transmission", "differential", "driveshaft",
+               "drivetrain"],
+    "Electronics": ["audio", "video", "phone", "alarm", "navigation", "radar", "electronic"],
+    "Detailing": ["wash", "wax", "detailing", "touchup"],
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class Categorizer:
+    """Assign each text the highest-priority category among its keyword hits.
+
+    Args:
+        categories: Category -> keywords, in priority order.  A keyword listed
+            under several categories belongs to the first.
+        default: Category for text that matches no keyword.
+    """
+
+    def __init__(self, categories: Dict[str, Sequence[str]] = CATEGORIES, default: str = OTHER):
+        self.categories = list(categories)
+        self.default = default
+        # first word -> [(remaining words, rank)], longest keyword first
+        self._index: Dict[str, List[Tuple[Tuple[str, ...], int]]] = {}
+        seen = set()
+        for rank, keywords in enumerate(categories.values()):
+            for keyword in keywords:
+                words = tuple(_WORD.findall(keyword.lower()))
+                if not words or words in seen:
+                    continue
+                seen.add(words)
+                for last in (words[-1], words[-1] + "s", words[-1] + "es"):
+                    variant = words[:-1] + (last,)
+                    self._index.setdefault(variant[0], []).append((variant[1:], rank))
+        for entries in self._index.values():
+            entries.sort(key=lambda entry: -len(entry[0]))
+        # Fast path: when no multi-word keyword can start in the text, the
+        # answer is the best rank among the single words it contains.
+        self._single = {word: min(rank for rest, rank in entries if not rest)
+                        for word, entries in self._index.items()
+                        if any(not rest for rest, _ in entries)}
+        self._multi_first = frozenset(word for word, entries in self._index.items()
+                                      if any(rest for rest, _ in entries))
+
+    def categorize(self, title: str, keyword: str = "") -> str:
+        """Category for a title (and the search keyword that found it)."""
+        words = _WORD.findall(f"{title} {keyword}".lower() if keyword else title.lower())
+        if self._multi_first.isdisjoint(words):
+            ranks = [rank for rank in map(self._single.get, words) if rank is not None]
+            return self.categories[min(ranks)] if ranks else self.default
+        index = self._index
+        best = len(self.categories)
+        i, n = 0, len(words)
+        while i < n:
+            entries = index.get(words[i])
+            i += 1
+            if entries is None:
+                continue
+            for rest, rank in entries:
+                if rest and tuple(words[i:i + len(rest)]) != rest:
+                    continue
+                i += len(rest)  # the longest match consumes its words
+                if rank < best:
+                    best = rank
+                break
+            if best == 0:
+                break
+        return self.categories[best] if best < len(self.categories) else self.default
+
+    def categorize_many(self, rows: Iterable[Tuple[str, str]]) -> List[str]:
+        """Categories for ``(title, keyword)`` pairs, in order."""
+        categorize = self.categorize
+        return [categorize(title or "", keyword or "") for title, keyword in rows]
+
+
+_default = Categorizer()
+categorize = _default.categorize
+categorize_many = _default.categorize_many
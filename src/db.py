@@ -2,37 +2,54 @@
 
 import sqlite3
 import json
+import logging
+import re
+import time
+import uuid
 from pathlib import Path
-from datetime import datetime
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Dict, Optional, Union
+
+from src.categorize import CATEGORIES, OTHER, categorize, categorize_many
+from src.metrics import timed_sql
+from src.prices import best_prices
+
+logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).parent / "parts.db"
 
+# Seconds a connection waits for another thread's or process's write lock
+# before giving up with "database is locked".
+BUSY_TIMEOUT = 30.0
+
+_wal_paths = set()
+
+
+def connect(**kwargs) -> sqlite3.Connection:
+    """Open a connection to ``DB_PATH``; every query in the app goes through here.
 
-CATEGORIES = {
-    "Exterior": ["bumper", "fender", "hood", "spoiler", "lip", "diffuser", "carbon fiber", "splitter", "grille", "trim", "cosmetic"],
-    "Wheels": ["wheel", "rim", "tire", "tyre"],
-    "Suspension": ["coilover", "suspension", "lowering", "spring", "damper", "shock", "control arm", "strut", "brake"],
-    "Interior": ["seat", "interior", "dashboard", "steering wheel", "shifter", "pedal", "mat", "carpet", "trim"],
-    "Engine": ["engine", "motor", "cylinder head", "valve", "piston", "clutch", "flywheel", "header", "manifold", "exhaust", "muffler", "catback", "downpipe", "intake", "supercharger", "turbo", "transmission", "differential", "driveshaft"],
-    "Electronics": ["audio", "video", "phone", "alarm", "navigation", "radar"],
-    "Detailing": ["wash", "wax", "detailing", "touchup"],
-    "Other": [],
-}
+    The database runs in WAL mode, so the dashboard's reads and the
+    scheduler's writes (``main.py all`` runs both in one process) do not
+    block each other, and writers queue for up to ``BUSY_TIMEOUT`` seconds
+    instead of failing at once.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT, **kwargs)
+    if DB_PATH not in _wal_paths:
+        conn.execute("PRAGMA journal_mode = WAL")  # persistent: once per file
+        _wal_paths.add(DB_PATH)
+    return conn
 
 
 def categorize_item(title: str, keyword: str = "") -> str:
     """Auto-categorize item based on title/keyword."""
-    combined = f"{title} {keyword}".lower()
-    for category, keywords in CATEGORIES.items():
-        if any(kw in combined for kw in keywords):
-            return category
-    return "Other"
+    return categorize(title or "", keyword or "")
 
 
+@timed_sql
 def init_db():
     """Initialize SQLite database."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
+    conn.execute("PRAGMA journal_mode = WAL")  # in case a bulk load switched it off
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
     
@@ -62,48 +79,359 @@ def init_db():
             )
         """)
         conn.commit()
-    
+
+    c.execute("PRAGMA table_info(items)")
+    if 'price_value' not in {row[1] for row in c.fetchall()}:
+        # Migrate: numeric price for range filters, backfilled once
+        c.execute("ALTER TABLE items ADD COLUMN price_value REAL")
+        conn.create_function("parse_price_value", 1, parse_price_value, deterministic=True)
+        c.execute("UPDATE items SET price_value = parse_price_value(price) WHERE price IS NOT NULL")
+        conn.commit()
+
+    existing = {row[0] for row in c.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    if not {name for name, _ in ITEM_INDEXES} <= existing:
+        for name, columns in ITEM_INDEXES:
+            c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON items ({columns})")
+        c.execute("ANALYZE items")  # give the planner row estimates for the new indexes
+    _init_facet_counts(c)
+    _init_fts(c)
+
+    # Pending notifications, one row per (item, notifier). 'sending' rows
+    # hold a lease until next_attempt_at; if the sender dies they are
+    # picked up again once it expires.
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL REFERENCES items(id),
+            notifier TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            delivered_at TIMESTAMP,
+            UNIQUE (item_id, notifier)
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (notifier, state, next_attempt_at)")
+
+    # One row per search cycle; breakdowns are JSON (see src/instrument.py).
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TIMESTAMP NOT NULL,
+            duration REAL NOT NULL,
+            results INTEGER NOT NULL DEFAULT 0,
+            new_items INTEGER NOT NULL DEFAULT 0,
+            saved INTEGER NOT NULL DEFAULT 0,
+            http_requests INTEGER NOT NULL DEFAULT 0,
+            http_bytes INTEGER NOT NULL DEFAULT 0,
+            http_errors INTEGER NOT NULL DEFAULT 0,
+            errors INTEGER NOT NULL DEFAULT 0,
+            stages TEXT,
+            hosts TEXT,
+            yields TEXT
+        )
+    """)
+
+    # Per-source incremental-search state, e.g. the newest eBay listing
+    # date seen for each keyword.
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS watermarks (
+            source TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, key)
+        )
+    """)
+
+    # Adaptive polling estimates per (source, key); see src/polling.py.
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS poll_state (
+            source TEXT NOT NULL,
+            key TEXT NOT NULL,
+            rate REAL NOT NULL,
+            cost REAL NOT NULL,
+            polls INTEGER NOT NULL DEFAULT 0,
+            new_items INTEGER NOT NULL DEFAULT 0,
+            last_polled REAL,
+            interval REAL,
+            PRIMARY KEY (source, key)
+        )
+    """)
+
+    # Crawl task queue for ``main.py worker``; see src/tasks.py.  At most
+    # one pending or leased task per (source, key, page).
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            key TEXT NOT NULL,
+            page INTEGER NOT NULL DEFAULT 1,
+            state TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at REAL NOT NULL,
+            lease_token TEXT,
+            lease_until REAL,
+            worker TEXT,
+            result TEXT,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            finished_at REAL
+        )
+    """)
+    c.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_active ON tasks (source, key, page)
+        WHERE state IN ('pending', 'leased')
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks (state, available_at)")
+    conn.commit()
+
     conn.close()
 
 
-def add_item(item: Dict) -> bool:
-    """Insert an item. Returns True if new, False if duplicate."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+ITEM_INDEXES = [
+    ("idx_items_archived_found", "archived, found_date"),
+    ("idx_items_category_found", "archived, category, found_date"),
+    ("idx_items_source_found", "archived, source, found_date"),
+    ("idx_items_price", "archived, price_value"),
+]
+
+
+def _init_fts(c: sqlite3.Cursor):
+    """Create a trigram full-text index over title/keyword, if FTS5 is available.
+
+    Trigram tokens make ``MATCH '"text"'`` behave like ``LIKE '%text%'``
+    without scanning every row.
+    """
+    if _has_fts(c):
+        return
+    try:
+        c.execute("""
+            CREATE VIRTUAL TABLE items_fts USING fts5(
+                title, keyword, content='items', content_rowid='id', tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 trigram index unavailable, text search will scan: {e}")
+        return
+    c.execute("""
+        CREATE TRIGGER items_fts_insert AFTER INSERT ON items BEGIN
+            INSERT INTO items_fts (rowid, title, keyword) VALUES (NEW.id, NEW.title, NEW.keyword);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER items_fts_delete AFTER DELETE ON items BEGIN
+            INSERT INTO items_fts (items_fts, rowid, title, keyword)
+            VALUES ('delete', OLD.id, OLD.title, OLD.keyword);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER items_fts_update AFTER UPDATE OF title, keyword ON items BEGIN
+            INSERT INTO items_fts (items_fts, rowid, title, keyword)
+            VALUES ('delete', OLD.id, OLD.title, OLD.keyword);
+            INSERT INTO items_fts (rowid, title, keyword) VALUES (NEW.id, NEW.title, NEW.keyword);
+        END
+    """)
+    c.execute("INSERT INTO items_fts (items_fts) VALUES ('rebuild')")
+
+
+def _has_fts(c: sqlite3.Cursor) -> bool:
+    return c.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='items_fts'"
+    ).fetchone() is not None
+
+
+# --- Facet counters -------------------------------------------------------
+#
+# facet_counts holds the number of unarchived items per (source, category,
+# price bucket, day).  Triggers keep it in step with the items table, so
+# facet counts for filters that line up with these dimensions come from a
+# few thousand counter rows instead of a scan of the whole items table.
+
+PRICE_BUCKET_EDGES = [100, 250, 500, 1000, 2500, 5000]
+
+
+def _price_bucket_labels() -> List[str]:
+    labels = []
+    lower = 0
+    for edge in PRICE_BUCKET_EDGES:
+        labels.append(f"{lower}-{edge}")
+        lower = edge
+    labels.append(f"{lower}+")
+    return labels
+
+
+PRICE_BUCKET_LABELS = _price_bucket_labels()
+
+# Ages are measured in calendar days (UTC, like CURRENT_TIMESTAMP) so the
+# items table and the per-day counters bucket identically.
+AGE_BUCKETS = [("1d", 1), ("7d", 7), ("30d", 30)]
+
+
+def _price_bucket_sql(column: str) -> str:
+    """SQL CASE mapping a price column to its bucket index (-1 = no price)."""
+    whens = [f"WHEN {column} IS NULL THEN -1"]
+    whens += [f"WHEN {column} < {edge} THEN {i}" for i, edge in enumerate(PRICE_BUCKET_EDGES)]
+    return f"(CASE {' '.join(whens)} ELSE {len(PRICE_BUCKET_EDGES)} END)"
+
+
+def _age_cutoff(days: int) -> str:
+    return (datetime.now(timezone.utc).date() - timedelta(days=days)).isoformat()
+
+
+def _age_bucket_sql(column: str) -> str:
+    """SQL CASE mapping a timestamp/day column to its age bucket label."""
+    # Literal cutoffs: date('now', ...) would be re-evaluated for every row.
+    whens = " ".join(
+        f"WHEN {column} >= '{_age_cutoff(days)}' THEN '{label}'"
+        for label, days in AGE_BUCKETS
+    )
+    return f"(CASE {whens} ELSE 'older' END)"
+
+
+def _init_facet_counts(c: sqlite3.Cursor):
+    """Create the facet counter table and its maintenance triggers."""
+    exists = c.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='facet_counts'"
+    ).fetchone()
+    if exists:
+        return
+
+    c.execute("""
+        CREATE TABLE facet_counts (
+            source TEXT NOT NULL,
+            category TEXT NOT NULL,
+            price_bucket INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            PRIMARY KEY (source, category, price_bucket, day)
+        ) WITHOUT ROWID
+    """)
+    c.execute("CREATE INDEX idx_facet_counts_day ON facet_counts (day, n)")
+
+    def row(ref: str) -> str:
+        return (f"{ref}.source, COALESCE({ref}.category, 'Other'), "
+                f"{_price_bucket_sql(ref + '.price_value')}, "
+                f"COALESCE(date({ref}.found_date), date('now'))")
+
+    bump = """
+        INSERT INTO facet_counts (source, category, price_bucket, day, n)
+        VALUES ({row}, {delta})
+        ON CONFLICT (source, category, price_bucket, day) DO UPDATE SET n = n + {delta};
+    """
+    c.execute(f"""
+        CREATE TRIGGER items_facets_insert AFTER INSERT ON items
+        WHEN NEW.archived = 0
+        BEGIN {bump.format(row=row('NEW'), delta=1)} END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER items_facets_delete AFTER DELETE ON items
+        WHEN OLD.archived = 0
+        BEGIN {bump.format(row=row('OLD'), delta=-1)} END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER items_facets_update_old
+        AFTER UPDATE OF source, category, price_value, found_date, archived ON items
+        WHEN OLD.archived = 0
+        BEGIN {bump.format(row=row('OLD'), delta=-1)} END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER items_facets_update_new
+        AFTER UPDATE OF source, category, price_value, found_date, archived ON items
+        WHEN NEW.archived = 0
+        BEGIN {bump.format(row=row('NEW'), delta=1)} END
+    """)
+
+    c.execute(f"""
+        INSERT INTO facet_counts (source, category, price_bucket, day, n)
+        SELECT {row('items')}, COUNT(*)
+        FROM items WHERE archived = 0
+        GROUP BY 1, 2, 3, 4
+    """)
+
+
+_PRICE_NUMBER = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+
+def parse_price_value(price: Optional[str]) -> Optional[float]:
+    """Parse the numeric amount out of a stored price string ('$1,500', '1299.99 USD')."""
+    if not price:
+        return None
+    match = _PRICE_NUMBER.search(str(price))
+    if not match:
+        return None
+    try:
+        return float(match.group(0).replace(',', ''))
+    except ValueError:
+        return None
+
+
+def _insert_item(c: sqlite3.Cursor, item: Dict) -> Optional[int]:
+    """Insert one item on an open cursor. Returns its id, or None if a duplicate."""
+    category = item.get("category") or categorize_item(item.get("title", ""), item.get("keyword", ""))
     try:
-        category = item.get("category") or categorize_item(item.get("title", ""), item.get("keyword", ""))
         c.execute("""
-            INSERT INTO items (source, title, price, url, image, keyword, category)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO items (source, title, price, price_value, url, image, keyword, category)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             item.get("source"),
             item.get("title"),
             item.get("price"),
+            parse_price_value(item.get("price")),
             item.get("url"),
             item.get("image"),
             item.get("keyword"),
             category,
         ))
-        conn.commit()
-        conn.close()
-        return True
     except sqlite3.IntegrityError:
-        conn.close()
-        return False
+        return None
+    item["category"] = category
+    return c.lastrowid
+
+
+def add_item(item: Dict) -> bool:
+    """Insert an item. Returns True if new, False if duplicate."""
+    return add_items([item]) == 1
 
 
-def add_items(items: List[Dict]) -> int:
-    """Insert multiple items. Returns count of new items."""
+@timed_sql
+def add_items(items: List[Dict],
+              notifiers: Union[List[str], Callable[[Dict], List[str]]] = None) -> int:
+    """Insert multiple items in one transaction. Returns count of new items.
+
+    Each new item gets its ``id`` and ``category`` set, and, for every name in
+    ``notifiers``, a pending outbox row written in the same transaction, so an
+    alert can never be lost between saving an item and notifying about it.
+    ``notifiers`` may also be a function of the saved item (watch-rule
+    routing) returning the names for that item.
+    """
+    conn = connect()
+    c = conn.cursor()
     count = 0
+    now = time.time()
     for item in items:
-        if add_item(item):
-            count += 1
+        item_id = _insert_item(c, item)
+        if item_id is None:
+            continue
+        item["id"] = item_id
+        count += 1
+        names = notifiers(item) if callable(notifiers) else notifiers
+        for name in names or []:
+            c.execute("""
+                INSERT INTO outbox (item_id, notifier, next_attempt_at)
+                VALUES (?, ?, ?)
+            """, (item_id, name, now))
+    conn.commit()
+    conn.close()
     return count
 
 
+@timed_sql
 def get_items(limit: int = 100, offset: int = 0, archived: bool = False) -> List[Dict]:
     """Fetch items from database."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
     c.execute("""
@@ -117,9 +445,22 @@ def get_items(limit: int = 100, offset: int = 0, archived: bool = False) -> List
     return [dict(row) for row in rows]
 
 
+@timed_sql
+def get_item(item_id: int) -> Optional[Dict]:
+    """Fetch a single item by id."""
+    conn = connect()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute("SELECT * FROM items WHERE id = ?", (item_id,))
+    row = c.fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+
+@timed_sql
 def get_recent_items(hours: int = 24, limit: int = 50) -> List[Dict]:
     """Get items found in the last N hours."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
     c.execute("""
@@ -134,9 +475,24 @@ def get_recent_items(hours: int = 24, limit: int = 50) -> List[Dict]:
     return [dict(row) for row in rows]
 
 
+@timed_sql
+def get_item_titles(source: str, days: int = 30) -> List[str]:
+    """Titles of a source's items found in the last N days (archived included)."""
+    conn = connect()
+    c = conn.cursor()
+    c.execute("""
+        SELECT title FROM items
+        WHERE source = ? AND found_date >= datetime('now', ?)
+    """, (source, f'-{days} days'))
+    titles = [row[0] for row in c.fetchall()]
+    conn.close()
+    return titles
+
+
+@timed_sql
 def search_items(keyword: str, limit: int = 50) -> List[Dict]:
     """Search items by title or keyword."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
     search_term = f"%{keyword}%"
@@ -151,18 +507,94 @@ def search_items(keyword: str, limit: int = 50) -> List[Dict]:
     return [dict(row) for row in rows]
 
 
+@timed_sql
 def archive_item(item_id: int):
     """Archive an item."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     c = conn.cursor()
     c.execute("UPDATE items SET archived = 1 WHERE id = ?", (item_id,))
     conn.commit()
     conn.close()
 
 
+@timed_sql
+def recategorize_items(pinned: Optional[Dict[tuple, str]] = None, batch: int = 10000,
+                       dry_run: bool = False) -> Dict[tuple, int]:
+    """Re-run categorisation over every stored item.
+
+    Rows are read in id order, ``batch`` at a time, and only rows whose
+    category changes are updated (one transaction per batch).  ``pinned``
+    maps ``(source, keyword)`` to a fixed category, for items whose category
+    came from where they were found rather than from their title.
+
+    Returns:
+        Count of changed rows per ``(old category, new category)``.
+    """
+    pinned = pinned or {}
+    changes: Dict[tuple, int] = {}
+    conn = connect()
+    c = conn.cursor()
+    last_id = 0
+    while True:
+        rows = c.execute(
+            "SELECT id, source, title, keyword, category FROM items WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch),
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        labels = categorize_many((title, keyword) for _, _, title, keyword, _ in rows)
+        updates = []
+        for (item_id, source, _, keyword, old), new in zip(rows, labels):
+            new = pinned.get((source, keyword), new)
+            if new != old:
+                changes[(old, new)] = changes.get((old, new), 0) + 1
+                updates.append((new, item_id))
+        if updates and not dry_run:
+            c.executemany("UPDATE items SET category = ? WHERE id = ?", updates)
+            conn.commit()
+    conn.close()
+    return changes
+
+
+@timed_sql
+def backfill_prices(batch: int = 10000, dry_run: bool = False) -> int:
+    """Fill in prices for items stored without one, from their titles.
+
+    Items whose price could not be parsed (missing, "Contact", "N/A USD")
+    are re-read in id order, ``batch`` at a time, and given the best asking
+    price ``src.prices`` finds in the title.
+
+    Returns:
+        Number of items that gained a price.
+    """
+    conn = connect()
+    c = conn.cursor()
+    filled = 0
+    last_id = 0
+    while True:
+        rows = c.execute(
+            "SELECT id, title FROM items WHERE price_value IS NULL AND id > ? ORDER BY id LIMIT ?",
+            (last_id, batch),
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        updates = [(best.text, best.value, item_id)
+                   for (item_id, _), best in zip(rows, best_prices(title for _, title in rows))
+                   if best is not None]
+        filled += len(updates)
+        if updates and not dry_run:
+            c.executemany("UPDATE items SET price = ?, price_value = ? WHERE id = ?", updates)
+            conn.commit()
+    conn.close()
+    return filled
+
+
+@timed_sql
 def get_stats() -> Dict:
     """Get database statistics."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     c = conn.cursor()
     c.execute("SELECT COUNT(*) as total, COUNT(DISTINCT source) as sources FROM items WHERE archived = 0")
     row = c.fetchone()
@@ -175,12 +607,13 @@ def get_stats() -> Dict:
 
 def get_categories() -> List[str]:
     """Get all categories in use."""
-    return list(CATEGORIES.keys()) + ["Other"]
+    return list(CATEGORIES) + [OTHER]
 
 
+@timed_sql
 def get_items_by_category(category: str, limit: int = 100, offset: int = 0, archived: bool = False) -> List[Dict]:
     """Fetch items by category."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
     c.execute("""
@@ -194,9 +627,10 @@ def get_items_by_category(category: str, limit: int = 100, offset: int = 0, arch
     return [dict(row) for row in rows]
 
 
+@timed_sql
 def get_category_stats() -> Dict:
     """Get item count by category."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     c = conn.cursor()
     c.execute("""
         SELECT category, COUNT(*) as count
@@ -208,3 +642,597 @@ def get_category_stats() -> Dict:
     rows = c.fetchall()
     conn.close()
     return {row[0]: row[1] for row in rows}
+
+
+@timed_sql
+def get_items_after(item_id: int, limit: int = 500) -> List[Dict]:
+    """Fetch unarchived items inserted after the given id, oldest first."""
+    conn = connect()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute("""
+        SELECT * FROM items
+        WHERE id > ? AND archived = 0
+        ORDER BY id ASC
+        LIMIT ?
+    """, (item_id, limit))
+    rows = c.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+
+@timed_sql
+def get_max_item_id() -> int:
+    """Return the highest item id in the database (0 if empty)."""
+    conn = connect()
+    c = conn.cursor()
+    c.execute("SELECT COALESCE(MAX(id), 0) FROM items")
+    row = c.fetchone()
+    conn.close()
+    return row[0]
+
+
+def _split_price_range(min_price: Optional[float], max_price: Optional[float]):
+    """Split ``[min_price, max_price)`` into whole counter buckets and leftovers.
+
+    Returns:
+        (buckets, partial_ranges): bucket indexes fully inside the range
+        (including -1, "no price", when both bounds are None) and up to two
+        ``(lo, hi)`` price ranges that cut through a bucket.
+    """
+    if min_price is None and max_price is None:
+        return list(range(-1, len(PRICE_BUCKET_EDGES) + 1)), []
+
+    lo = min_price if min_price is not None else 0
+    hi = max_price if max_price is not None else float("inf")
+    lowers = [0] + PRICE_BUCKET_EDGES
+    uppers = PRICE_BUCKET_EDGES + [float("inf")]
+
+    buckets, partial = [], []
+    for i, (lower, upper) in enumerate(zip(lowers, uppers)):
+        if upper <= lo or lower >= hi:
+            continue
+        if lower >= lo and upper <= hi:
+            buckets.append(i)
+        else:
+            partial.append((max(lo, lower), min(hi, upper)))
+    return buckets, partial
+
+
+def _match_clauses(sources: List[str], categories: List[str], since: Optional[str],
+                   until: Optional[str], date_column: str):
+    """WHERE fragments for the source/category/date filters."""
+    clauses, params = [], []
+    if sources:
+        clauses.append(f"source IN ({','.join('?' * len(sources))})")
+        params.extend(sources)
+    if categories:
+        clauses.append(f"category IN ({','.join('?' * len(categories))})")
+        params.extend(categories)
+    if since:
+        clauses.append(f"{date_column} >= date(?)")
+        params.append(since)
+    if until:
+        clauses.append(f"{date_column} < date(?, '+1 day')")
+        params.append(until)
+    return clauses, params
+
+
+def _fts_phrase(query: str) -> str:
+    """Quote a user query as one FTS5 phrase (substring match on trigrams)."""
+    return '"' + query.replace('"', '""') + '"'
+
+
+@timed_sql
+def faceted_search(query: str = "", sources: List[str] = None, categories: List[str] = None,
+                   min_price: float = None, max_price: float = None,
+                   since: str = None, until: str = None,
+                   limit: int = 50, offset: int = 0) -> Dict:
+    """Filter items on any combination of dimensions and count facets.
+
+    Price bounds are ``min_price <= price < max_price``; ``since``/``until``
+    are inclusive ``YYYY-MM-DD`` dates.  Facet counts (per source, category,
+    price bucket and age bucket) describe the whole filtered set.
+
+    Without a text query the counts come from the ``facet_counts`` table;
+    only the slices of a price range that cut through a bucket are counted
+    from items, via the price index.  A text query narrows the set through
+    the trigram index first and counts the matches in one grouped pass.
+
+    Returns:
+        Dict with 'items', 'total' and 'facets' keys.
+    """
+    sources = sources or []
+    categories = categories or []
+
+    conn = connect()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+
+    base, base_params = _match_clauses(sources, categories, since, until, "found_date")
+    base.insert(0, "archived = 0")
+    if query:
+        if len(query) >= 3 and _has_fts(c):
+            base.append("id IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)")
+            base_params.append(_fts_phrase(query))
+        else:
+            base.append("(title LIKE ? OR keyword LIKE ?)")
+            base_params.extend([f"%{query}%"] * 2)
+
+    # --- Results ---
+    # With a source/category filter, walking that index in found_date order
+    # beats sorting a price-index range scan, so hide price from the planner.
+    price_col = "+price_value" if (sources or categories) else "price_value"
+    clauses, params = list(base), list(base_params)
+    if min_price is not None:
+        clauses.append(f"{price_col} >= ?")
+        params.append(min_price)
+    if max_price is not None:
+        clauses.append(f"{price_col} < ?")
+        params.append(max_price)
+    c.execute(f"""
+        SELECT * FROM items
+        WHERE {' AND '.join(clauses)}
+        ORDER BY found_date DESC
+        LIMIT ? OFFSET ?
+    """, params + [limit, offset])
+    items = [dict(row) for row in c.fetchall()]
+
+    # --- Facets ---
+    groups, ages = [], []
+    item_facets = (f"source, COALESCE(category, 'Other'), {_price_bucket_sql('price_value')}, "
+                   f"{_age_bucket_sql('found_date')}, COUNT(*)")
+    if query:
+        clauses, params = list(base), list(base_params)
+        if min_price is not None:
+            clauses.append("price_value >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            clauses.append("price_value < ?")
+            params.append(max_price)
+        c.execute(f"SELECT {item_facets} FROM items WHERE {' AND '.join(clauses)} "
+                  "GROUP BY 1, 2, 3, 4", params)
+        groups.extend(c.fetchall())
+    else:
+        buckets, partial = _split_price_range(min_price, max_price)
+        if buckets:
+            fclauses, fparams = _match_clauses(sources, categories, since, until, "day")
+            fclauses.insert(0, f"price_bucket IN ({','.join(map(str, buckets))})")
+            fwhere = " AND ".join(fclauses)
+            # Rolled up in primary-key order (no temp B-tree); the age facet
+            # only needs the last 30 days, read through the day index.
+            c.execute(f"""
+                SELECT source, category, price_bucket, SUM(n)
+                FROM facet_counts WHERE {fwhere}
+                GROUP BY 1, 2, 3
+            """, fparams)
+            groups.extend((src, cat, bucket, None, n) for src, cat, bucket, n in c.fetchall())
+            c.execute(f"""
+                SELECT {_age_bucket_sql('day')}, SUM(n)
+                FROM facet_counts WHERE {fwhere} AND day >= ?
+                GROUP BY 1
+            """, fparams + [_age_cutoff(AGE_BUCKETS[-1][1])])
+            ages.extend(c.fetchall())
+        for lo, hi in partial:
+            clauses = base + ["price_value >= ?"]
+            params = base_params + [lo]
+            if hi != float("inf"):
+                clauses.append("price_value < ?")
+                params.append(hi)
+            c.execute(f"SELECT {item_facets} FROM items WHERE {' AND '.join(clauses)} "
+                      "GROUP BY 1, 2, 3, 4", params)
+            groups.extend(c.fetchall())
+    conn.close()
+
+    facets = {"source": {}, "category": {}, "price": {}, "age": {}}
+    total = 0
+    for source, category, bucket, age, count in groups:
+        if not count:
+            continue
+        total += count
+        price_label = PRICE_BUCKET_LABELS[bucket] if bucket >= 0 else "none"
+        for facet, key in (("source", source), ("category", category), ("price", price_label)):
+            facets[facet][key] = facets[facet].get(key, 0) + count
+        if age is not None:
+            ages.append((age, count))
+
+    for age, count in ages:
+        if count:
+            facets["age"][age] = facets["age"].get(age, 0) + count
+    # Counter rows only report recent ages; whatever is left is older.
+    older = total - sum(facets["age"].values())
+    if older:
+        facets["age"]["older"] = facets["age"].get("older", 0) + older
+
+    for facet in ("source", "category"):
+        facets[facet] = dict(sorted(facets[facet].items(), key=lambda kv: -kv[1]))
+
+    return {"items": items, "total": total, "facets": facets}
+
+
+# --- Notification outbox --------------------------------------------------
+
+@timed_sql
+def claim_outbox(notifier: str, limit: int = 50, lease: float = 300) -> List[Dict]:
+    """Lease up to ``limit`` due outbox rows for a notifier.
+
+    Returns item dicts with ``outbox_id`` and ``attempts`` added.  The rows
+    move to 'sending' until they are marked delivered/failed or the lease
+    runs out.
+    """
+    now = time.time()
+    conn = connect(isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute("BEGIN IMMEDIATE")
+    c.execute("""
+        SELECT outbox.id AS outbox_id, outbox.attempts, items.*
+        FROM outbox JOIN items ON items.id = outbox.item_id
+        WHERE outbox.notifier = ? AND outbox.state IN ('pending', 'sending')
+          AND outbox.next_attempt_at <= ?
+        ORDER BY outbox.id
+        LIMIT ?
+    """, (notifier, now, limit))
+    rows = [dict(row) for row in c.fetchall()]
+    if rows:
+        ids = [row["outbox_id"] for row in rows]
+        c.execute(f"""
+            UPDATE outbox SET state = 'sending', next_attempt_at = ?
+            WHERE id IN ({','.join('?' * len(ids))})
+        """, [now + lease] + ids)
+    c.execute("COMMIT")
+    conn.close()
+    return rows
+
+
+@timed_sql
+def mark_outbox_delivered(outbox_ids: List[int]):
+    """Record successful delivery."""
+    if not outbox_ids:
+        return
+    conn = connect()
+    c = conn.cursor()
+    c.execute(f"""
+        UPDATE outbox SET state = 'delivered', delivered_at = CURRENT_TIMESTAMP, last_error = NULL
+        WHERE id IN ({','.join('?' * len(outbox_ids))})
+    """, outbox_ids)
+    conn.commit()
+    conn.close()
+
+
+@timed_sql
+def mark_outbox_failed(outbox_ids: List[int], error: str, retry_at: Optional[float]):
+    """Record a failed attempt; ``retry_at`` None gives up ('dead')."""
+    if not outbox_ids:
+        return
+    conn = connect()
+    c = conn.cursor()
+    state = "dead" if retry_at is None else "pending"
+    c.execute(f"""
+        UPDATE outbox
+        SET state = ?, attempts = attempts + 1, last_error = ?, next_attempt_at = ?
+        WHERE id IN ({','.join('?' * len(outbox_ids))})
+    """, [state, error[:500], retry_at or 0] + outbox_ids)
+    conn.commit()
+    conn.close()
+
+
+@timed_sql
+def defer_outbox(outbox_ids: List[int], retry_at: float):
+    """Put rows back to wait until ``retry_at`` without counting an attempt."""
+    if not outbox_ids:
+        return
+    conn = connect()
+    c = conn.cursor()
+    c.execute(f"""
+        UPDATE outbox SET state = 'pending', next_attempt_at = ?
+        WHERE id IN ({','.join('?' * len(outbox_ids))})
+    """, [retry_at] + outbox_ids)
+    conn.commit()
+    conn.close()
+
+
+@timed_sql
+def get_outbox_stats() -> Dict[str, Dict[str, int]]:
+    """Outbox row counts per notifier and state."""
+    conn = connect()
+    c = conn.cursor()
+    c.execute("SELECT notifier, state, COUNT(*) FROM outbox GROUP BY notifier, state")
+    rows = c.fetchall()
+    conn.close()
+    stats: Dict[str, Dict[str, int]] = {}
+    for notifier, state, count in rows:
+        stats.setdefault(notifier, {})[state] = count
+    return stats
+
+
+# --- Cycle history ---------------------------------------------------------
+
+RUN_JSON_FIELDS = ("stages", "hosts", "yields")
+
+
+@timed_sql
+def save_run(summary: Dict) -> int:
+    """Store a cycle summary from ``CycleRun.summary()``. Returns the run id."""
+    conn = connect()
+    c = conn.cursor()
+    c.execute("""
+        INSERT INTO runs (started_at, duration, results, new_items, saved, http_requests,
+                          http_bytes, http_errors, errors, stages, hosts, yields)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        summary["started_at"], summary["duration"], summary["results"],
+        summary["new_items"], summary["saved"], summary["http_requests"],
+        summary["http_bytes"], summary["http_errors"], summary["errors"],
+        *(json.dumps(summary.get(field, {})) for field in RUN_JSON_FIELDS),
+    ))
+    run_id = c.lastrowid
+    conn.commit()
+    conn.close()
+    return run_id
+
+
+@timed_sql
+def get_runs(limit: int = 20) -> List[Dict]:
+    """Most recent cycle summaries, newest first."""
+    conn = connect()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute("SELECT * FROM runs ORDER BY id DESC LIMIT ?", (limit,))
+    rows = c.fetchall()
+    conn.close()
+    runs = []
+    for row in rows:
+        run = dict(row)
+        for field in RUN_JSON_FIELDS:
+            run[field] = json.loads(run[field]) if run[field] else {}
+        runs.append(run)
+    return runs
+
+
+# --- Search watermarks -----------------------------------------------------
+
+@timed_sql
+def get_watermarks(source: str) -> Dict[str, str]:
+    """Watermarks stored for a source, keyed by e.g. search keyword."""
+    conn = connect()
+    c = conn.cursor()
+    c.execute("SELECT key, value FROM watermarks WHERE source = ?", (source,))
+    marks = dict(c.fetchall())
+    conn.close()
+    return marks
+
+
+@timed_sql
+def set_watermarks(source: str, marks: Dict[str, str]):
+    """Store (insert or replace) watermarks for a source."""
+    if not marks:
+        return
+    conn = connect()
+    conn.executemany("""
+        INSERT INTO watermarks (source, key, value) VALUES (?, ?, ?)
+        ON CONFLICT (source, key) DO UPDATE SET value = excluded.value,
+                                                updated_at = CURRENT_TIMESTAMP
+    """, [(source, key, value) for key, value in marks.items()])
+    conn.commit()
+    conn.close()
+
+
+# --- Adaptive polling --------------------------------------------------------
+
+POLL_STATE_COLUMNS = ("source", "key", "rate", "cost", "polls", "new_items",
+                      "last_polled", "interval")
+
+
+@timed_sql
+def load_poll_state() -> List[Dict]:
+    """Every stored poll unit's estimates (see ``src.polling.PollState``)."""
+    conn = connect()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute(f"SELECT {', '.join(POLL_STATE_COLUMNS)} FROM poll_state")
+    rows = [dict(row) for row in c.fetchall()]
+    conn.close()
+    return rows
+
+
+@timed_sql
+def save_poll_state(states: List[Dict]):
+    """Replace the stored poll units with ``states``."""
+    conn = connect()
+    conn.execute("DELETE FROM poll_state")
+    conn.executemany(
+        f"INSERT INTO poll_state ({', '.join(POLL_STATE_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(POLL_STATE_COLUMNS))})",
+        [tuple(state[col] for col in POLL_STATE_COLUMNS) for state in states])
+    conn.commit()
+    conn.close()
+
+
+# --- Crawl task queue ------------------------------------------------------
+
+TASK_COLUMNS = ("id", "source", "key", "page", "state", "attempts", "lease_token",
+                "worker", "last_error")
+
+
+@timed_sql
+def enqueue_tasks(tasks: List[tuple]) -> int:
+    """Queue ``(source, key, page)`` tasks; ones already pending or leased are skipped."""
+    if not tasks:
+        return 0
+    now = time.time()
+    conn = connect()
+    c = conn.cursor()
+    before = conn.total_changes
+    c.executemany("""
+        INSERT OR IGNORE INTO tasks (source, key, page, available_at, created_at)
+        VALUES (?, ?, ?, ?, ?)
+    """, [(source, key, page, now, now) for source, key, page in tasks])
+    added = conn.total_changes - before
+    conn.commit()
+    conn.close()
+    return added
+
+
+@timed_sql
+def lease_tasks(worker: str, limit: int = 1, lease: float = 300,
+                max_attempts: int = 5) -> List[Dict]:
+    """Lease up to ``limit`` runnable tasks to ``worker`` for ``lease`` seconds.
+
+    Runnable means pending and due, or leased with the lease run out (the
+    worker died).  Each lease counts as an attempt; a task whose lease runs
+    out after ``max_attempts`` attempts is marked 'dead' instead.  Each
+    returned task has a fresh ``lease_token`` for ``complete_task`` and
+    ``fail_task``.
+    """
+    now = time.time()
+    conn = connect(isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute("BEGIN IMMEDIATE")
+    c.execute("""
+        UPDATE tasks SET state = 'dead', lease_token = NULL, finished_at = ?,
+                         last_error = COALESCE(last_error, 'lease expired')
+        WHERE state = 'leased' AND lease_until <= ? AND attempts >= ?
+    """, (now, now, max_attempts))
+    c.execute(f"""
+        SELECT {', '.join(TASK_COLUMNS)} FROM tasks
+        WHERE (state = 'pending' AND available_at <= ?)
+           OR (state = 'leased' AND lease_until <= ?)
+        ORDER BY available_at, id
+        LIMIT ?
+    """, (now, now, limit))
+    rows = [dict(row) for row in c.fetchall()]
+    for row in rows:
+        row.update(state="leased", attempts=row["attempts"] + 1,
+                   lease_token=uuid.uuid4().hex, worker=worker)
+        c.execute("""
+            UPDATE tasks SET state = 'leased', attempts = ?, lease_token = ?,
+                             lease_until = ?, worker = ?
+            WHERE id = ?
+        """, (row["attempts"], row["lease_token"], now + lease, worker, row["id"]))
+    c.execute("COMMIT")
+    conn.close()
+    return rows
+
+
+@timed_sql
+def complete_task(task_id: int, token: str, result: str) -> bool:
+    """Store a leased task's result (JSON); False if the lease was lost to another worker."""
+    conn = connect()
+    c = conn.cursor()
+    c.execute("""
+        UPDATE tasks SET state = 'done', result = ?, lease_token = NULL,
+                         finished_at = ?, last_error = NULL
+        WHERE id = ? AND lease_token = ? AND state = 'leased'
+    """, (result, time.time(), task_id, token))
+    ok = c.rowcount == 1
+    conn.commit()
+    conn.close()
+    return ok
+
+
+@timed_sql
+def fail_task(task_id: int, token: str, error: str, retry_at: Optional[float]) -> bool:
+    """Record a failed attempt; ``retry_at`` None moves the task to 'dead'."""
+    conn = connect()
+    c = conn.cursor()
+    if retry_at is None:
+        c.execute("""
+            UPDATE tasks SET state = 'dead', lease_token = NULL, last_error = ?, finished_at = ?
+            WHERE id = ? AND lease_token = ? AND state = 'leased'
+        """, (error[:500], time.time(), task_id, token))
+    else:
+        c.execute("""
+            UPDATE tasks SET state = 'pending', lease_token = NULL, last_error = ?,
+                             available_at = ?
+            WHERE id = ? AND lease_token = ? AND state = 'leased'
+        """, (error[:500], retry_at, task_id, token))
+    ok = c.rowcount == 1
+    conn.commit()
+    conn.close()
+    return ok
+
+
+@timed_sql
+def get_task_results(limit: int = 100) -> List[Dict]:
+    """Finished tasks whose results have not been ingested yet, oldest first."""
+    conn = connect()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute("""
+        SELECT id, source, key, page, worker, result FROM tasks
+        WHERE state = 'done' ORDER BY finished_at, id LIMIT ?
+    """, (limit,))
+    rows = [dict(row) for row in c.fetchall()]
+    conn.close()
+    return rows
+
+
+@timed_sql
+def mark_tasks_ingested(task_ids: List[int]):
+    """Mark results as ingested and drop their payloads."""
+    if not task_ids:
+        return
+    conn = connect()
+    conn.execute(f"""
+        UPDATE tasks SET state = 'ingested', result = NULL
+        WHERE state = 'done' AND id IN ({','.join('?' * len(task_ids))})
+    """, task_ids)
+    conn.commit()
+    conn.close()
+
+
+@timed_sql
+def get_task_stats() -> Dict[str, int]:
+    """Task counts per state."""
+    conn = connect()
+    c = conn.cursor()
+    c.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state")
+    stats = dict(c.fetchall())
+    conn.close()
+    return stats
+
+
+@timed_sql
+def get_dead_tasks(limit: int = 50) -> List[Dict]:
+    """The dead-letter queue: tasks that ran out of attempts, newest first."""
+    conn = connect()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT {', '.join(TASK_COLUMNS)}, finished_at FROM tasks
+        WHERE state = 'dead' ORDER BY finished_at DESC, id DESC LIMIT ?
+    """, (limit,))
+    rows = [dict(row) for row in c.fetchall()]
+    conn.close()
+    return rows
+
+
+@timed_sql
+def requeue_dead_tasks() -> int:
+    """Give dead tasks a fresh set of attempts (skipping ones queued again since)."""
+    now = time.time()
+    conn = connect()
+    c = conn.cursor()
+    c.execute("""
+        UPDATE OR IGNORE tasks SET state = 'pending', attempts = 0, available_at = ?
+        WHERE state = 'dead'
+    """, (now,))
+    count = c.rowcount
+    c.execute("DELETE FROM tasks WHERE state = 'dead'")  # duplicates of active tasks
+    conn.commit()
+    conn.close()
+    return count
+
+
+@timed_sql
+def purge_tasks(before: float) -> int:
+    """Delete ingested tasks that finished before ``before`` (unix time)."""
+    conn = connect()
+    c = conn.cursor()
+    c.execute("DELETE FROM tasks WHERE state = 'ingested' AND finished_at < ?", (before,))
+    count = c.rowcount
+    conn.commit()
+    conn.close()
+    return count
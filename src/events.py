@@ -0,0 +1,233 @@
+"""Live new-item feed shared by all Server-Sent Events clients.
+
+When the agent and the dashboard share a process (``main.py all``) the
+agent announces each write on the in-process ``bus`` and the feed fetches
+the new rows right away, instead of polling the database on a timer.
+"""
+
+import logging
+import queue
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from src import db
+
+logger = logging.getLogger(__name__)
+
+# Topic published after a cycle saves items; the payload is the saved
+# item dicts (each with its ``id``).
+NEW_ITEMS = "items.new"
+
+
+class EventBus:
+    """Synchronous in-process publish/subscribe by topic.
+
+    Handlers run in the publishing thread; one that raises is logged and
+    does not stop the others.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[[Any], None]]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic: str, handler: Callable[[Any], None]):
+        with self._lock:
+            self._handlers.setdefault(topic, []).append(handler)
+
+    def unsubscribe(self, topic: str, handler: Callable[[Any], None]):
+        with self._lock:
+            handlers = self._handlers.get(topic, [])
+            if handler in handlers:
+                handlers.remove(handler)
+
+    def publish(self, topic: str, payload: Any = None) -> int:
+        """Call every handler of ``topic``; returns how many ran without error."""
+        with self._lock:
+            handlers = list(self._handlers.get(topic, ()))
+        ok = 0
+        for handler in handlers:
+            try:
+                handler(payload)
+                ok += 1
+            except Exception as e:
+                logger.error(f"Event handler for {topic} failed: {e}", exc_info=True)
+        return ok
+
+
+# Process-wide bus; only ``main.py all`` has subscribers on it.
+bus = EventBus()
+
+
+class Subscription:
+    """One connected client: a bounded queue plus the last id it was sent."""
+
+    def __init__(self, last_id: int, maxsize: int = 1000):
+        self.queue: "queue.Queue[Optional[Dict]]" = queue.Queue(maxsize=maxsize)
+        self.last_id = last_id
+        self.dropped = False
+
+    def offer(self, item: Dict) -> bool:
+        """Queue an item unless it was already delivered. Returns False if full."""
+        if item["id"] <= self.last_id:
+            return True
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            return False
+        self.last_id = item["id"]
+        return True
+
+
+class NewItemFeed:
+    """Polls the items table once per tick and fans new rows out to subscribers.
+
+    However many clients are connected, the feed issues a single
+    ``get_items_after`` query per tick.  Recently seen rows are kept in a
+    small ring buffer so that a reconnecting client (``Last-Event-ID``) can
+    usually be caught up without touching the database.
+
+    Args:
+        poll_interval: Seconds between database polls.
+        backlog: Number of recent items kept for resuming clients.
+    """
+
+    def __init__(self, poll_interval: float = 2.0, backlog: int = 500):
+        self.poll_interval = poll_interval
+        self.backlog = backlog
+        self._recent: Deque[Dict] = deque(maxlen=backlog)
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._last_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._bus: Optional[EventBus] = None
+
+    def _ensure_started(self):
+        if not self._subscribers:
+            # The poller idles without clients, so resync before resuming.
+            latest = db.get_max_item_id()
+            if latest != self._last_id:
+                self._recent.clear()
+                self._last_id = latest
+        if self._bus is not None:
+            return  # pushed by the bus; no polling thread
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="new-item-feed", daemon=True
+            )
+            self._thread.start()
+
+    def attach(self, bus: EventBus):
+        """Take new items from ``bus`` instead of polling the database.
+
+        Only writes announced on the bus reach clients, so this is for a
+        process that runs the agent itself.
+        """
+        self._bus = bus
+        bus.subscribe(NEW_ITEMS, self._on_new_items)
+        self._stop.set()  # retire a polling thread if one is running
+
+    def _on_new_items(self, items: List[Dict]):
+        # Fetch the stored rows (the shape clients get when polling); with
+        # nobody listening, the next subscribe resyncs instead.
+        if items and self._subscribers:
+            self.poll_once()
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """Register a client, replaying anything newer than ``last_event_id``."""
+        with self._lock:
+            self._ensure_started()
+            start = self._last_id if last_event_id is None else last_event_id
+            sub = Subscription(start)
+
+            if last_event_id is not None and last_event_id < self._last_id:
+                oldest = self._recent[0]["id"] if self._recent else None
+                if oldest is not None and oldest <= last_event_id + 1:
+                    self._replay(sub, [i for i in self._recent if i["id"] > last_event_id])
+                else:
+                    self._catch_up(sub, last_event_id)
+
+            # A client whose catch-up overflowed its queue is not registered:
+            # live items would leave a gap after what it was sent.  Its stream
+            # ends once drained and the browser resumes from Last-Event-ID.
+            if not sub.dropped:
+                self._subscribers.append(sub)
+        return sub
+
+    @staticmethod
+    def _replay(sub: Subscription, items: List[Dict]) -> bool:
+        for item in items:
+            if not sub.offer(item):
+                sub.dropped = True
+                return False
+        return True
+
+    def _catch_up(self, sub: Subscription, after: int):
+        """Page missed rows from the database up to the feed's position."""
+        while after < self._last_id:
+            page = db.get_items_after(after, limit=self.backlog)
+            if not page or not self._replay(sub, page):
+                return
+            after = page[-1]["id"]
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, items: List[Dict]):
+        """Fan freshly inserted rows (with ``id``) out to every subscriber."""
+        if not items:
+            return
+        with self._lock:
+            for item in items:
+                self._recent.append(item)
+                if self._last_id is None or item["id"] > self._last_id:
+                    self._last_id = item["id"]
+            for sub in list(self._subscribers):
+                for item in items:
+                    if not sub.offer(item):
+                        # Slow consumer: cut it loose, the browser will
+                        # reconnect with Last-Event-ID and catch up.
+                        logger.debug(f"Dropping slow SSE subscriber at id {sub.last_id}")
+                        sub.dropped = True
+                        self._subscribers.remove(sub)
+                        break
+
+    def poll_once(self) -> int:
+        """Run one database poll and publish any new rows. Returns the count."""
+        with self._lock:
+            if self._last_id is None:
+                self._last_id = db.get_max_item_id()
+            after = self._last_id
+        items = db.get_items_after(after, limit=self.backlog)
+        self.publish(items)
+        return len(items)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            if not self._subscribers:
+                continue
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"New-item feed poll failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._bus is not None:
+            self._bus.unsubscribe(NEW_ITEMS, self._on_new_items)
+            self._bus = None
+        with self._lock:
+            for sub in self._subscribers:
+                try:
+                    sub.queue.put_nowait(None)
+                except queue.Full:
+                    pass
+            self._subscribers.clear()
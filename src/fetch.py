@@ -0,0 +1,226 @@
+"""Instrumented HTTP helpers for the source scrapers.
+
+``get``/``post`` behave exactly like ``requests.get``/``requests.post`` but
+report each request's host, latency, response size and failure to the
+current cycle (see ``src.instrument``) and to the fetch latency metric.
+
+They can also record every exchange to a gzipped JSON-lines archive, or
+replay such an archive instead of touching the network::
+
+    with fetch.recording("cycle.jsonl.gz"):
+        agent.run_once()
+
+    with fetch.replaying("cycle.jsonl.gz"):
+        agent.run_once()      # same responses, no network
+
+Responses are matched by method and full URL (query included) and served
+in recorded order; once a URL's responses run out the last one repeats.  A
+request missing from the archive raises ``requests.ConnectionError``, as an
+unreachable site would.  Credentials (Authorization/Cookie headers and
+OAuth tokens in bodies) are not written to the archive.
+"""
+
+import base64
+import gzip
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from src import instrument
+from src.metrics import FETCH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_SECRET_HEADERS = {"authorization", "cookie", "set-cookie", "proxy-authorization"}
+_SECRET_FIELDS = ("access_token", "refresh_token")
+
+
+def _observe(url: str, start: float, nbytes: int, error: bool):
+    elapsed = time.perf_counter() - start
+    host = urlsplit(url).netloc or "unknown"
+    FETCH_SECONDS.labels(host, "error" if error else "ok").observe(elapsed)
+    run = instrument.current_run()
+    if run is not None:
+        run.add_http(host, elapsed, nbytes, error)
+
+
+def _full_url(method: str, url: str, params) -> str:
+    return requests.Request(method.upper(), url, params=params).prepare().url
+
+
+def _redact_body(body: bytes) -> bytes:
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    if isinstance(data, dict) and any(f in data for f in _SECRET_FIELDS):
+        for field in _SECRET_FIELDS:
+            if field in data:
+                data[field] = "REDACTED"
+        return json.dumps(data).encode()
+    return body
+
+
+class Recorder:
+    """Append request/response pairs to a gzipped JSON-lines archive."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def add(self, method: str, url: str, headers: Optional[Dict], resp: requests.Response):
+        entry = {
+            "method": method.upper(),
+            "url": url,
+            "request_headers": {k: v for k, v in (headers or {}).items()
+                                if k.lower() not in _SECRET_HEADERS},
+            "status": resp.status_code,
+            "reason": resp.reason,
+            "headers": {k: v for k, v in resp.headers.items()
+                        if k.lower() not in _SECRET_HEADERS},
+            "body": base64.b64encode(_redact_body(resp.content or b"")).decode("ascii"),
+        }
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Replayer:
+    """Serve responses from an archive written by ``Recorder``.
+
+    Args:
+        path: Archive to load.
+        entries: Archive-format dicts to serve instead of (or as well as) a
+            file; ``body`` may be given as raw bytes.
+    """
+
+    def __init__(self, path: Optional[str] = None, entries: Iterable[Dict] = ()):
+        self.path = path
+        self._entries: Dict[tuple, List[Dict]] = {}
+        self._served: Dict[tuple, int] = {}
+        self.misses: List[str] = []
+        self._lock = threading.Lock()
+        if path:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._add(json.loads(line))
+        for entry in entries:
+            self._add(dict(entry))
+
+    def _add(self, entry: Dict):
+        body = entry.get("body") or b""
+        entry["content"] = body if isinstance(body, bytes) else base64.b64decode(body)
+        entry.setdefault("headers", {})
+        self._entries.setdefault((entry["method"].upper(), entry["url"]), []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._entries.values())
+
+    def response_for(self, method: str, url: str) -> requests.Response:
+        key = (method.upper(), url)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses.append(url)
+                raise requests.ConnectionError(f"No recorded response for {method.upper()} {url}")
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+        entry = entries[min(index, len(entries) - 1)]
+
+        resp = requests.Response()
+        resp.status_code = entry.get("status", 200)
+        resp.reason = entry.get("reason") or ""
+        resp.headers = CaseInsensitiveDict(entry["headers"])
+        resp._content = entry["content"]
+        resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+        resp.url = url
+        return resp
+
+
+_recorder: Optional[Recorder] = None
+_replayer: Optional[Replayer] = None
+
+
+@contextmanager
+def recording(path: str):
+    """Record every request made through this module to ``path``."""
+    global _recorder
+    _recorder = Recorder(path)
+    try:
+        yield _recorder
+    finally:
+        recorder, _recorder = _recorder, None
+        recorder.close()
+        logger.info(f"Recorded {recorder.count} HTTP exchanges to {path}")
+
+
+@contextmanager
+def replaying(path: Optional[str] = None, entries: Iterable[Dict] = ()):
+    """Serve requests from an archive (or in-memory entries) instead of the network."""
+    global _replayer
+    _replayer = Replayer(path, entries)
+    try:
+        yield _replayer
+    finally:
+        replayer, _replayer = _replayer, None
+        if replayer.misses:
+            logger.warning(f"{len(replayer.misses)} requests were not in {path or 'the replay'}")
+
+
+def is_replaying() -> bool:
+    return _replayer is not None
+
+
+def is_recording() -> bool:
+    return _recorder is not None
+
+
+def polite_sleep(seconds: float):
+    """Rate-limit pause between live requests; skipped when replaying."""
+    if _replayer is None:
+        time.sleep(seconds)
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """``requests.<method>`` with instrumentation. HTTP >= 400 counts as an error."""
+    start = time.perf_counter()
+    replayer, recorder = _replayer, _recorder
+    try:
+        if replayer is not None:
+            resp = replayer.response_for(method, _full_url(method, url, kwargs.get("params")))
+        else:
+            resp = getattr(requests, method)(url, **kwargs)
+    except Exception:
+        _observe(url, start, 0, True)
+        raise
+    if kwargs.get("stream") and replayer is None:
+        nbytes = int(resp.headers.get("Content-Length") or 0)
+    else:
+        nbytes = len(resp.content or b"")  # reads the body inside the timing
+    _observe(url, start, nbytes, resp.status_code >= 400)
+    if recorder is not None:
+        recorder.add(method, _full_url(method, url, kwargs.get("params")),
+                     kwargs.get("headers"), resp)
+    return resp
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("get", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("post", url, **kwargs)
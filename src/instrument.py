@@ -0,0 +1,127 @@
+"""Lightweight per-cycle instrumentation.
+
+``Agent.run_once`` opens a ``CycleRun`` with ``begin_run()``; while it is
+active, ``span(name)`` blocks add their wall time (and any exception) to the
+named stage, and ``src.fetch`` reports every HTTP request.  At the end of the
+cycle ``summary()`` is stored in the ``runs`` table and shown on /stats.
+
+Outside a cycle (the web app, tests) spans cost one attribute lookup.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+
+class CycleRun:
+    """Stage timings and HTTP counters for one search cycle."""
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._t0 = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.stages: Dict[str, Dict] = {}
+        self.hosts: Dict[str, Dict] = {}
+        self.yields: Dict[str, int] = {}
+        self.results = 0
+        self.new_items = 0
+        self.saved = 0
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, seconds: float, error: bool = False):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "errors": 0})
+            stage["seconds"] += seconds
+            stage["calls"] += 1
+            stage["errors"] += int(error)
+
+    def add_http(self, host: str, seconds: float, nbytes: int, error: bool = False):
+        with self._lock:
+            entry = self.hosts.setdefault(
+                host, {"requests": 0, "bytes": 0, "errors": 0, "seconds": 0.0})
+            entry["requests"] += 1
+            entry["bytes"] += nbytes
+            entry["errors"] += int(error)
+            entry["seconds"] += seconds
+
+    def add_yield(self, items: Iterable[Dict]):
+        """Count new items per ``source / keyword``."""
+        with self._lock:
+            for item in items:
+                key = f"{item.get('source') or 'unknown'} / {item.get('keyword') or '-'}"
+                self.yields[key] = self.yields.get(key, 0) + 1
+
+    def http_requests(self) -> int:
+        """HTTP requests made so far in this cycle."""
+        with self._lock:
+            return sum(h["requests"] for h in self.hosts.values())
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._t0
+
+    def summary(self) -> Dict:
+        """Flat totals plus per-stage, per-host and per-yield breakdowns."""
+        with self._lock:
+            stages = {name: dict(s, seconds=round(s["seconds"], 3))
+                      for name, s in self.stages.items()}
+            hosts = {name: dict(h, seconds=round(h["seconds"], 3))
+                     for name, h in self.hosts.items()}
+            return {
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "duration": round(self.duration or time.perf_counter() - self._t0, 3),
+                "results": self.results,
+                "new_items": self.new_items,
+                "saved": self.saved,
+                "http_requests": sum(h["requests"] for h in hosts.values()),
+                "http_bytes": sum(h["bytes"] for h in hosts.values()),
+                "http_errors": sum(h["errors"] for h in hosts.values()),
+                "errors": sum(s["errors"] for s in stages.values()),
+                "stages": stages,
+                "hosts": hosts,
+                "yields": dict(self.yields),
+            }
+
+
+_current: Optional[CycleRun] = None
+
+
+def begin_run() -> CycleRun:
+    """Start recording a cycle; spans and fetches report to it until ``end_run``."""
+    global _current
+    _current = CycleRun()
+    return _current
+
+
+def end_run() -> Optional[CycleRun]:
+    global _current
+    run, _current = _current, None
+    if run is not None:
+        run.finish()
+    return run
+
+
+def current_run() -> Optional[CycleRun]:
+    return _current
+
+
+@contextmanager
+def span(name: str):
+    """Time a block as stage ``name`` of the current cycle (no-op outside one).
+
+    Exceptions are counted against the stage and re-raised.
+    """
+    run = _current
+    if run is None:
+        yield
+        return
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        run.add_stage(name, time.perf_counter() - start, error)
@@ -0,0 +1,183 @@
+"""Closed-loop load test for the web dashboard (``python main.py loadtest``).
+
+``concurrency`` worker threads each send requests back to back for
+``duration`` seconds, picking targets from a weighted mix of the pages
+people actually use: the home page (mostly page 1, sometimes deep pages),
+category pages, text search and ``/api/items``.  The report gives overall
+throughput and latency percentiles per route.
+
+Point it at a running server (``main.py web --production``) for realistic
+numbers.  ``serve_in_process`` starts a threaded development server in this
+process instead, which is convenient but shares the GIL with the workers.
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Search terms: common hits, rarer hits and misses.
+SEARCH_TERMS = ["coilovers", "wheels", "exhaust", "brembo", "recaro", "CSL", "akrapovic",
+                "carbon fiber", "supercharger", "e92", "ohlins", "zzz no match"]
+
+# (route label, weight)
+ROUTE_MIX = [("/", 35), ("/category/<c>", 25), ("/search", 25), ("/api/items", 15)]
+
+
+def build_targets(categories: Sequence[str], n: int = 500, seed: int = 0,
+                  max_page: int = 200) -> List[Tuple[str, str]]:
+    """A shuffled list of ``(route label, path)`` following ``ROUTE_MIX``."""
+    rng = random.Random(seed)
+    labels, weights = zip(*ROUTE_MIX)
+    categories = list(categories) or ["Other"]
+
+    def page() -> int:
+        # Nearly everyone stays on the first pages; a few go deep.
+        return 1 if rng.random() < 0.7 else rng.randint(2, max_page)
+
+    targets = []
+    for label in rng.choices(labels, weights, k=n):
+        if label == "/":
+            path = "/" if rng.random() < 0.7 else f"/?page={page()}"
+        elif label == "/category/<c>":
+            path = f"/category/{quote(rng.choice(categories))}?page={page()}"
+        elif label == "/search":
+            path = f"/search?q={quote(rng.choice(SEARCH_TERMS))}"
+        else:
+            path = f"/api/items?page={page()}"
+        targets.append((label, path))
+    return targets
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence (0 if empty)."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values), math.ceil(p / 100 * len(sorted_values))) - 1)
+    return sorted_values[k]
+
+
+def _summarise(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 50), 2),
+        "p90_ms": round(1000 * percentile(latencies, 90), 2),
+        "p99_ms": round(1000 * percentile(latencies, 99), 2),
+        "max_ms": round(1000 * latencies[-1], 2) if latencies else 0.0,
+    }
+
+
+def run(base_url: str, targets: Sequence[Tuple[str, str]], concurrency: int = 8,
+        duration: float = 10.0, timeout: float = 30.0) -> Dict:
+    """Drive ``targets`` against ``base_url`` and return throughput and latencies.
+
+    Args:
+        base_url: Server root, e.g. ``http://127.0.0.1:5000``.
+        targets: ``(route label, path)`` pairs, cycled through by each worker.
+        concurrency: Number of worker threads (requests in flight).
+        duration: Seconds to run.
+        timeout: Per-request timeout; a timeout counts as an error.
+
+    Returns:
+        ``{"total": {...}, "routes": {label: {...}}, ...}`` with request and
+        error counts, requests/second and mean/p50/p90/p99/max in ms.
+    """
+    base_url = base_url.rstrip("/")
+    latencies: Dict[str, List[float]] = {label: [] for label, _ in targets}
+    errors: Dict[str, int] = {label: 0 for label in latencies}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(offset: int):
+        session = requests.Session()
+        i = offset
+        mine: List[Tuple[str, float, bool]] = []
+        while time.perf_counter() < deadline:
+            label, path = targets[i % len(targets)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                resp = session.get(base_url + path, timeout=timeout)
+                failed = resp.status_code >= 400
+            except requests.RequestException:
+                failed = True
+            mine.append((label, time.perf_counter() - start, failed))
+        with lock:
+            for label, seconds, failed in mine:
+                latencies[label].append(seconds)
+                errors[label] += int(failed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(k * len(targets) // concurrency,),
+                                name=f"load-{k}", daemon=True)
+               for k in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    every = [s for values in latencies.values() for s in values]
+    return {
+        "base_url": base_url,
+        "concurrency": concurrency,
+        "duration": round(elapsed, 2),
+        "total": _summarise(every, sum(errors.values()), elapsed),
+        "routes": {label: _summarise(values, errors[label], elapsed)
+                   for label, values in latencies.items() if values},
+    }
+
+
+def format_report(result: Dict) -> str:
+    """Table of per-route and total throughput and latency percentiles."""
+    header = (f"{'route':<16} {'requests':>9} {'errors':>7} {'req/s':>8} "
+              f"{'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    lines = [f"{result['base_url']}: {result['concurrency']} workers for {result['duration']}s",
+             "", header]
+    rows = list(result["routes"].items()) + [("total", result["total"])]
+    for label, r in rows:
+        lines.append(f"{label:<16} {r['requests']:>9} {r['errors']:>7} {r['rps']:>8.1f} "
+                     f"{r['mean_ms']:>8.1f} {r['p50_ms']:>8.1f} {r['p90_ms']:>8.1f} "
+                     f"{r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+    lines.append("(latencies in ms)")
+    return "\n".join(lines)
+
+
+def serve_in_process(host: str = "127.0.0.1", port: int = 0):
+    """Start the dashboard on a threaded development server in this process.
+
+    Returns:
+        ``(server, base_url)``; call ``server.shutdown()`` when done.
+    """
+    from werkzeug.serving import make_server
+    from src.web import app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no per-request access log
+    server = make_server(host, port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="loadtest-server", daemon=True).start()
+    base_url = f"http://{host}:{server.server_port}"
+    logger.info(f"Serving the dashboard for the load test at {base_url}")
+    return server, base_url
+
+
+def fetch_categories(base_url: str, timeout: float = 10.0) -> Optional[List[str]]:
+    """Category names from a running server's ``/api/search`` facets, if available."""
+    try:
+        resp = requests.get(f"{base_url.rstrip('/')}/api/search", params={"limit": 1}, timeout=timeout)
+        resp.raise_for_status()
+        facets = resp.json().get("facets", {}).get("category", {})
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"Could not read categories from {base_url}: {e}")
+        return None
+    return list(facets)
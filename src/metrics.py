@@ -0,0 +1,310 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+A tiny registry of counters, gauges and histograms.  Each labelled series is
+a plain object cached by its label values, so recording a sample is a dict
+lookup plus an addition under a per-metric lock (about a microsecond).
+``REGISTRY.render()`` produces the text served at ``/metrics`` by the web
+app and by the daemon's listener (``serve_metrics``).
+
+Metrics are per process: under Gunicorn each worker reports its own.
+"""
+
+import bisect
+import functools
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans sub-millisecond SQL up to slow scrapes.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._series: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_series(self):
+        """A fresh series object for one set of label values."""
+
+    def labels(self, *values):
+        """The series for these label values (created on first use)."""
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series())
+        return series
+
+    @abstractmethod
+    def _samples(self) -> Iterable[str]:
+        """Exposition lines for every series."""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "lock")
+
+    def __init__(self, lock: threading.Lock):
+        self.value = 0.0
+        self.lock = lock
+
+    def inc(self, amount: float = 1.0):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def _new_series(self):
+        return _Value(self._lock)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for values, series in list(self._series.items()):
+            yield f"{self.name}{_format_labels(self.label_names, values)} {_format_value(series.value)}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down, or be computed on scrape via ``fn``."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 fn: Optional[Callable[[], Dict[Tuple, float]]] = None):
+        super().__init__(name, help_text, labels)
+        self.fn = fn
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def _samples(self):
+        if self.fn is not None:
+            try:
+                for values, value in self.fn().items():
+                    self.labels(*values).set(value)
+            except Exception as e:
+                logger.debug(f"Gauge {self.name} callback failed: {e}")
+        return super()._samples()
+
+
+class _HistogramSeries:
+    __slots__ = ("bounds", "counts", "sum", "lock")
+
+    def __init__(self, bounds: Tuple[float, ...], lock: threading.Lock):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.lock = lock
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    """Distribution of observations (latencies) in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets, self._lock)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self):
+        for values, series in list(self._series.items()):
+            with self._lock:
+                counts, total = list(series.counts), series.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, values, le)} {cumulative}"
+            labels = _format_labels(self.label_names, values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    """Named collection of metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = (),
+              fn: Optional[Callable[[], Dict[Tuple, float]]] = None) -> Gauge:
+        return self._register(Gauge(name, help_text, labels, fn))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in Prometheus text format."""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "partsfinder_http_request_duration_seconds", "Web request latency by route.",
+    ["route", "method", "status"])
+SQL_SECONDS = REGISTRY.histogram(
+    "partsfinder_sql_duration_seconds", "Time spent in src/db.py functions.", ["function"])
+FETCH_SECONDS = REGISTRY.histogram(
+    "partsfinder_fetch_duration_seconds", "Outbound scraper HTTP latency by host.",
+    ["host", "outcome"])
+ITEMS_FOUND = REGISTRY.counter(
+    "partsfinder_items_found_total", "Search results returned, by source.", ["source"])
+ITEMS_NEW = REGISTRY.counter(
+    "partsfinder_items_new_total", "New items saved, by source.", ["source"])
+CYCLE_SECONDS = REGISTRY.histogram(
+    "partsfinder_cycle_duration_seconds", "Search cycle wall time.",
+    buckets=(5, 15, 30, 60, 120, 300, 600, 1200, 1800))
+LAST_CYCLE = REGISTRY.gauge(
+    "partsfinder_last_cycle_timestamp_seconds", "Unix time the last search cycle finished.")
+SCHEDULE_LATENESS = REGISTRY.histogram(
+    "partsfinder_schedule_lateness_seconds", "How late scheduled jobs started, by job.",
+    ["job"], buckets=(1, 5, 15, 60, 300, 900, 1800, 3600))
+TASKS_RUN = REGISTRY.counter(
+    "partsfinder_tasks_total", "Crawl tasks run by this worker, by source and outcome.",
+    ["source", "outcome"])
+SCHEDULE_MISSED = REGISTRY.counter(
+    "partsfinder_schedule_missed_total", "Scheduled runs skipped because a job ran late, by job.",
+    ["job"])
+NOTIFIER_BATCHES = REGISTRY.counter(
+    "partsfinder_notifier_batches_total",
+    "Notifier send_items calls, by notifier and outcome (sent, failed, timeout, deferred).",
+    ["notifier", "outcome"])
+NOTIFIER_ITEMS = REGISTRY.counter(
+    "partsfinder_notifier_items_total", "Items in successful notifier batches, by notifier.",
+    ["notifier"])
+NOTIFIER_SECONDS = REGISTRY.histogram(
+    "partsfinder_notifier_send_duration_seconds", "Notifier send_items latency, by notifier.",
+    ["notifier"])
+
+
+def timed_sql(func: Callable) -> Callable:
+    """Decorator recording a db function's wall time in ``SQL_SECONDS``."""
+    series = SQL_SECONDS.labels(func.__name__)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            series.observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+def count_items(counter: Counter, items: Iterable[Dict]):
+    """Add one per item to ``counter``, labelled by the item's source."""
+    counts: Dict[str, int] = {}
+    for item in items:
+        source = item.get("source") or "unknown"
+        counts[source] = counts.get(source, 0) + 1
+    for source, n in counts.items():
+        counter.labels(source).inc(n)
+
+
+def serve_metrics(host: str = "127.0.0.1", port: int = 9108,
+                  registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a background thread (for the daemon)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Serving metrics at http://{host}:{server.server_port}/metrics")
+    return server
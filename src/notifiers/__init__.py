@@ -2,5 +2,7 @@
 
 from .sms import SMSNotifier
 from .stdout import StdoutNotifier
+from .dispatch import DeliveryDeferred, NotifierDispatcher, NotifierTimeout, PartialDelivery
 
-__all__ = ["SMSNotifier", "StdoutNotifier"]
+__all__ = ["SMSNotifier", "StdoutNotifier", "NotifierDispatcher", "NotifierTimeout",
+           "DeliveryDeferred", "PartialDelivery"]
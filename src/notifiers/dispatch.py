@@ -0,0 +1,222 @@
+"""Isolated, time-limited delivery to notifiers.
+
+Every notifier gets its own worker pool (its concurrency limit), its own
+timeout and its own counters (also exported as ``partsfinder_notifier_*``
+metrics), so a hung Twilio call only ever ties up the SMS notifier's
+workers.  Notifiers whose ``send_items`` is a coroutine
+function (``async def``) run on a shared event loop thread instead, where a
+timeout actually cancels the call.
+"""
+
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, Iterable, List, Optional
+
+from src.metrics import NOTIFIER_BATCHES, NOTIFIER_ITEMS, NOTIFIER_SECONDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30.0  # seconds per send_items call
+
+
+class NotifierTimeout(TimeoutError):
+    """A notifier did not finish ``send_items`` within its timeout."""
+
+
+class PartialDelivery(RuntimeError):
+    """``send_items`` delivered only part of a batch.
+
+    Args:
+        message: What went wrong.
+        delivered: Positions in the batch of the items that did go out.
+    """
+
+    def __init__(self, message: str, delivered: Iterable[int]):
+        super().__init__(message)
+        self.delivered = sorted(set(delivered))
+
+
+class DeliveryDeferred(Exception):
+    """Nothing was sent; retry the batch at ``retry_at`` (epoch seconds).
+
+    Unlike a failure this does not use up an attempt, e.g. when a notifier's
+    send budget is spent for now.
+    """
+
+    def __init__(self, message: str, retry_at: float):
+        super().__init__(message)
+        self.retry_at = retry_at
+
+
+class NotifierStats:
+    """Delivery counters for one notifier."""
+
+    def __init__(self):
+        self.batches = 0
+        self.items = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.deferred = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.in_flight = 0
+
+    def as_dict(self) -> Dict:
+        done = self.batches + self.failures + self.timeouts + self.deferred
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "deferred": self.deferred,
+            "in_flight": self.in_flight,
+            "latency_avg": round(self.latency_total / done, 4) if done else 0.0,
+            "latency_max": round(self.latency_max, 4),
+        }
+
+
+class NotifierDispatcher:
+    """Send batches to named notifiers with per-notifier isolation.
+
+    Args:
+        notifiers: Notifier instances keyed by name.
+        timeouts: Seconds allowed per ``send_items`` call, by notifier name.
+        concurrency: Batches a notifier may have in flight at once, by name.
+        default_timeout: Timeout for notifiers not listed in ``timeouts``.
+    """
+
+    def __init__(self, notifiers: Dict[str, object], timeouts: Optional[Dict[str, float]] = None,
+                 concurrency: Optional[Dict[str, int]] = None,
+                 default_timeout: float = DEFAULT_TIMEOUT):
+        self.notifiers = notifiers
+        self.timeouts = {name: (timeouts or {}).get(name, default_timeout) for name in notifiers}
+        self.concurrency = {name: max(int((concurrency or {}).get(name, 1)), 1)
+                            for name in notifiers}
+        self.stats = {name: NotifierStats() for name in notifiers}
+        self._lock = threading.Lock()
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @staticmethod
+    def is_async(notifier) -> bool:
+        return inspect.iscoroutinefunction(getattr(notifier, "send_items", None))
+
+    def available(self, name: str) -> bool:
+        """Whether ``name`` has a free slot for another batch."""
+        with self._lock:
+            return self.stats[name].in_flight < self.concurrency[name]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return sum(s.in_flight for s in self.stats.values())
+
+    def _pool(self, name: str) -> ThreadPoolExecutor:
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None:
+                pool = ThreadPoolExecutor(max_workers=self.concurrency[name],
+                                          thread_name_prefix=f"notify-{name}")
+                self._pools[name] = pool
+            return pool
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="notify-async",
+                                 daemon=True).start()
+            return self._loop
+
+    async def _send_async(self, name: str, items: List[Dict]):
+        semaphore = self._semaphores.get(name)
+        if semaphore is None:
+            semaphore = self._semaphores[name] = asyncio.Semaphore(self.concurrency[name])
+        async with semaphore:
+            await self.notifiers[name].send_items(items)
+
+    def submit(self, name: str, items: List[Dict]) -> Future:
+        """Start sending ``items`` to ``name``; the future holds the outcome."""
+        if self.is_async(self.notifiers[name]):
+            coro = asyncio.wait_for(self._send_async(name, items), self.timeouts[name])
+            return asyncio.run_coroutine_threadsafe(coro, self._event_loop())
+        return self._pool(name).submit(self.notifiers[name].send_items, items)
+
+    def _release(self, name: str):
+        with self._lock:
+            self.stats[name].in_flight -= 1
+
+    def send(self, name: str, items: List[Dict]):
+        """Send ``items`` to one notifier, waiting at most its timeout.
+
+        A synchronous notifier that overruns keeps its worker thread (Python
+        threads cannot be killed) and its concurrency slot until the call
+        returns, but the caller is released and other notifiers are
+        unaffected.
+
+        Raises:
+            NotifierTimeout: if the notifier did not finish in time.
+            DeliveryDeferred: if the notifier asked to be retried later.
+            PartialDelivery: if only some items were delivered.
+            Exception: whatever the notifier raised.
+        """
+        stats = self.stats[name]
+        with self._lock:
+            stats.in_flight += 1
+        started = time.monotonic()
+        try:
+            future = self.submit(name, items)
+        except Exception:
+            self._release(name)
+            raise
+        future.add_done_callback(lambda _: self._release(name))
+        try:
+            future.result(timeout=self.timeouts[name])
+        except (FutureTimeout, asyncio.TimeoutError):
+            future.cancel()
+            with self._lock:
+                stats.timeouts += 1
+            NOTIFIER_BATCHES.labels(name, "timeout").inc()
+            raise NotifierTimeout(f"{name} did not finish within {self.timeouts[name]}s")
+        except DeliveryDeferred:
+            with self._lock:
+                stats.deferred += 1
+            NOTIFIER_BATCHES.labels(name, "deferred").inc()
+            raise
+        except Exception:
+            with self._lock:
+                stats.failures += 1
+            NOTIFIER_BATCHES.labels(name, "failed").inc()
+            raise
+        else:
+            with self._lock:
+                stats.batches += 1
+                stats.items += len(items)
+            NOTIFIER_BATCHES.labels(name, "sent").inc()
+            NOTIFIER_ITEMS.labels(name).inc(len(items))
+        finally:
+            elapsed = time.monotonic() - started
+            NOTIFIER_SECONDS.labels(name).observe(elapsed)
+            with self._lock:
+                stats.latency_total += elapsed
+                stats.latency_max = max(stats.latency_max, elapsed)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Counters for every notifier, keyed by name."""
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self.stats.items()}
+
+    def shutdown(self):
+        """Release worker threads; calls still running are abandoned."""
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+            loop, self._loop = self._loop, None
+        for pool in pools:
+            pool.shutdown(wait=False)
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
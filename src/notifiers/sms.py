@@ -2,41 +2,70 @@
 
 import os
 import logging
-from typing import List, Dict
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Optional, Tuple
+
+from .dispatch import DeliveryDeferred, PartialDelivery
 
 logger = logging.getLogger(__name__)
 
+# Twilio rejects message bodies longer than this (it splits into segments
+# below it and bills per segment, so fewer, fuller messages are cheaper).
+SMS_MAX_CHARS = 1600
+
+
+def format_item(item: Dict) -> str:
+    """One item as it appears in an SMS."""
+    title = item.get("title", "Unknown")[:50]  # Truncate for SMS
+    price = item.get("price", "N/A")
+    url = item.get("url", "")
+    source = item.get("source", "unknown")
+    return f"[{source}] {title} - {price}\n{url}"
+
 
 class SMSNotifier:
-    """Send SMS alerts via Twilio."""
+    """Send SMS alerts via Twilio.
 
-    def __init__(self):
+    Args:
+        digest: Pack as many items as fit into each 1600-character message
+            instead of sending one message per item.
+        hourly_budget: Maximum messages per rolling hour (None = unlimited).
+            Items that do not fit are rolled up into a "+N more" line; once
+            the budget is spent, sends are deferred until it frees up.
+        dashboard_url: Appended to the rollup line so the overflow is one tap away.
+    """
+
+    name = "sms"
+
+    def __init__(self, digest: bool = False, hourly_budget: Optional[int] = None,
+                 dashboard_url: Optional[str] = None):
         self.account_sid = os.getenv("TWILIO_ACCOUNT_SID")
         self.auth_token = os.getenv("TWILIO_AUTH_TOKEN")
         self.from_phone = os.getenv("TWILIO_FROM_PHONE")
         self.to_phone = os.getenv("ALERT_PHONE")
         self.enabled = all([self.account_sid, self.auth_token, self.from_phone, self.to_phone])
 
+        self.digest = digest
+        self.hourly_budget = hourly_budget
+        self.dashboard_url = dashboard_url
+        self._sent_at: deque = deque()
+        self._lock = threading.Lock()
+
         if self.enabled:
             try:
                 from twilio.rest import Client
                 self.client = Client(self.account_sid, self.auth_token)
+                api_base = os.getenv("TWILIO_API_BASE")
+                if api_base:
+                    self.client.api.base_url = api_base.rstrip("/")
             except ImportError:
                 logger.warning("Twilio not installed, SMS disabled")
                 self.enabled = False
 
-    def send_item(self, item: Dict):
-        """Send a single item as SMS."""
-        if not self.enabled:
-            return
-
-        title = item.get("title", "Unknown")[:50]  # Truncate for SMS
-        price = item.get("price", "N/A")
-        url = item.get("url", "")
-        source = item.get("source", "unknown")
-
-        body = f"[{source}] {title} - {price}\n{url}"
-        
+    def _send(self, body: str) -> bool:
+        """Send one message body. Returns True on success."""
         try:
             msg = self.client.messages.create(
                 body=body,
@@ -44,10 +73,106 @@ class SMSNotifier:
                 to=self.to_phone
             )
             logger.info(f"SMS sent: {msg.sid}")
+            self._sent_at.append(time.time())
+            return True
         except Exception as e:
             logger.error(f"Failed to send SMS: {e}")
+            return False
+
+    def remaining_budget(self) -> Optional[int]:
+        """Messages still allowed in the current rolling hour (None = unlimited)."""
+        if self.hourly_budget is None:
+            return None
+        cutoff = time.time() - 3600
+        while self._sent_at and self._sent_at[0] < cutoff:
+            self._sent_at.popleft()
+        return max(self.hourly_budget - len(self._sent_at), 0)
+
+    def _rollup_line(self, count: int) -> str:
+        line = f"+{count} more on dashboard"
+        if self.dashboard_url:
+            line += f" {self.dashboard_url}"
+        return line
+
+    @staticmethod
+    def _group(entries: List[str]) -> List[List[int]]:
+        """Greedily pack entries into groups (of positions) whose joined body fits one SMS."""
+        groups: List[List[int]] = []
+        length = 0
+        for i, entry in enumerate(entries):
+            if groups and length + 2 + len(entry) <= SMS_MAX_CHARS:
+                groups[-1].append(i)
+                length += 2 + len(entry)
+            else:
+                groups.append([i])
+                length = len(entry)
+        return groups
+
+    def _messages(self, items: List[Dict],
+                  max_messages: Optional[int] = None) -> List[Tuple[str, List[int]]]:
+        """Message bodies, each with the positions of the items it lists or rolls up."""
+        entries = [format_item(item)[:SMS_MAX_CHARS] for item in items]
+        groups = self._group(entries) if self.digest else [[i] for i in range(len(entries))]
+
+        rolled: List[int] = []
+        if max_messages is not None and len(groups) > max_messages:
+            rolled = [i for g in groups[max_messages:] for i in g]
+            groups = groups[:max_messages] or [[]]
+            last = groups[-1]
+            while last:
+                body = "\n\n".join(entries[i] for i in last)
+                if len(body) + 2 + len(self._rollup_line(len(rolled))) <= SMS_MAX_CHARS:
+                    break
+                rolled.insert(0, last.pop())  # make room for the rollup line
+
+        messages = []
+        for k, g in enumerate(groups):
+            lines, covered = [entries[i] for i in g], list(g)
+            if rolled and k == len(groups) - 1:
+                lines.append(self._rollup_line(len(rolled)))
+                covered += rolled
+            messages.append(("\n\n".join(lines), covered))
+        return messages
+
+    def pack(self, items: List[Dict], max_messages: Optional[int] = None) -> List[str]:
+        """Turn items into message bodies of at most ``SMS_MAX_CHARS``.
+
+        Items that do not fit in ``max_messages`` messages are counted in a
+        final "+N more on dashboard" line.
+        """
+        return [body for body, _ in self._messages(items, max_messages)]
+
+    def deliver(self, items: List[Dict]):
+        """Pack and send items now, respecting the hourly budget.
+
+        Raises:
+            DeliveryDeferred: if the budget is spent; nothing was sent.
+            PartialDelivery: if some messages failed. ``delivered`` lists
+                the items that went out (listed or in a sent rollup line),
+                so only the rest are retried.
+        """
+        if not self.enabled or not items:
+            return
+        with self._lock:
+            budget = self.remaining_budget()
+            if budget == 0:
+                oldest = self._sent_at[0] if self._sent_at else time.time()
+                raise DeliveryDeferred(f"SMS budget exhausted; {len(items)} items wait "
+                                       f"for the next send slot", retry_at=oldest + 3600)
+            messages = self._messages(items, max_messages=budget)
+            delivered, failed = [], 0
+            for body, covered in messages:
+                if self._send(body):
+                    delivered.extend(covered)
+                else:
+                    failed += 1
+        if failed:
+            raise PartialDelivery(f"{failed} of {len(messages)} SMS failed to send", delivered)
+
+    def send_item(self, item: Dict):
+        """Send a single item as SMS."""
+        self.send_items([item])
 
     def send_items(self, items: List[Dict]):
-        """Send multiple items as SMS (batched)."""
-        for item in items:
-            self.send_item(item)
+        """Send multiple items as SMS (digested and budgeted when configured)."""
+        self.deliver(items)
@@ -9,6 +9,8 @@ logger = logging.getLogger(__name__)
 class StdoutNotifier:
     """Print items to stdout."""
 
+    name = "stdout"
+
     def send_item(self, item: Dict):
         """Print a single item."""
         title = item.get("title", "Unknown")
@@ -0,0 +1,182 @@
+"""Background delivery of the notification outbox.
+
+``db.add_items`` writes one outbox row per (new item, notifier) in the same
+transaction as the item itself.  ``OutboxDispatcher`` drains those rows on
+its own thread: each notifier's due rows are leased in batches and handed to
+``send_items`` through a ``NotifierDispatcher``, which gives every notifier
+its own timeout, concurrency limit and counters.  Failures are retried with
+exponential backoff until ``max_attempts``, after which the rows are parked
+as 'dead'.  A notifier that delivers part of a batch raises
+``PartialDelivery`` and only the rest is retried; one that raises
+``DeliveryDeferred`` (e.g. its send budget is spent) gets its rows back at
+the time it asks for, without using up an attempt.  Delivery is
+at-least-once.
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from src import db
+from src.notifiers.dispatch import DeliveryDeferred, NotifierDispatcher, PartialDelivery
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxDispatcher:
+    """Drain pending outbox rows to their notifiers.
+
+    Args:
+        notifiers: Notifier instances keyed by the name used in the outbox.
+        max_workers: Notifier batches delivered concurrently in total.
+        timeouts: Seconds allowed per ``send_items`` call, by notifier name.
+        concurrency: Batches each notifier may have in flight, by name.
+        batch_size: Rows leased per notifier per batch.
+        max_attempts: Attempts before a row is marked dead.
+        base_delay: First retry delay in seconds; doubles per attempt.
+        max_delay: Cap on the retry delay.
+        poll_interval: Seconds between outbox scans when not woken early.
+    """
+
+    def __init__(self, notifiers: Dict[str, object], max_workers: int = 4,
+                 batch_size: int = 50, max_attempts: int = 8, base_delay: float = 30,
+                 max_delay: float = 3600, poll_interval: float = 15,
+                 timeouts: Optional[Dict[str, float]] = None,
+                 concurrency: Optional[Dict[str, int]] = None):
+        self.notifiers = notifiers
+        self.dispatch = NotifierDispatcher(notifiers, timeouts=timeouts, concurrency=concurrency)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="outbox")
+        self._queued: Dict[str, int] = {name: 0 for name in notifiers}
+        self._queued_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff before the next attempt, with +/-20% jitter."""
+        delay = min(self.base_delay * (2 ** max(attempts - 1, 0)), self.max_delay)
+        return delay * random.uniform(0.8, 1.2)
+
+    def _deliver(self, name: str, rows: List[Dict]):
+        try:
+            self._send_batch(name, rows)
+        except Exception as e:
+            # Recording the outcome failed (e.g. the database is locked);
+            # the rows go out again once their lease expires.
+            logger.error(f"Outbox update for {name} failed: {e}")
+        finally:
+            with self._queued_lock:
+                self._queued[name] -= 1
+
+    def _send_batch(self, name: str, rows: List[Dict]):
+        ids = [row["outbox_id"] for row in rows]
+        items = [{k: v for k, v in row.items() if k not in ("outbox_id", "attempts")}
+                 for row in rows]
+        try:
+            self.dispatch.send(name, items)
+        except DeliveryDeferred as e:
+            logger.info(f"Notifier {name} deferred {len(ids)} items: {e}")
+            db.defer_outbox(ids, e.retry_at)
+        except Exception as e:
+            if isinstance(e, PartialDelivery):
+                # Only retry what did not go out.
+                db.mark_outbox_delivered([ids[i] for i in e.delivered])
+                done = set(e.delivered)
+                rows = [row for i, row in enumerate(rows) if i not in done]
+                ids = [row["outbox_id"] for row in rows]
+            if ids:
+                self._retry_later(name, rows, ids, e)
+        else:
+            db.mark_outbox_delivered(ids)
+
+    def _retry_later(self, name: str, rows: List[Dict], ids: List[int], error: Exception):
+        attempts = max(row["attempts"] for row in rows) + 1
+        if attempts >= self.max_attempts:
+            logger.error(f"Notifier {name} gave up on {len(ids)} items after "
+                         f"{attempts} attempts: {error}")
+            db.mark_outbox_failed(ids, str(error), None)
+        else:
+            delay = self.retry_delay(attempts)
+            logger.warning(f"Notifier {name} failed ({error}); retrying {len(ids)} "
+                           f"items in {delay:.0f}s")
+            db.mark_outbox_failed(ids, str(error), time.time() + delay)
+
+    def drain_once(self) -> int:
+        """Lease and dispatch one batch per notifier with a free slot.
+
+        A notifier already at its concurrency limit (including calls that
+        timed out but have not returned yet) is skipped, so a slow or hung
+        notifier never holds up the others. Returns rows leased.
+        """
+        leased = 0
+        for name in self.notifiers:
+            with self._queued_lock:
+                if self._queued[name] >= self.dispatch.concurrency[name] \
+                        or not self.dispatch.available(name):
+                    continue
+                self._queued[name] += 1
+            try:
+                rows = db.claim_outbox(name, limit=self.batch_size)
+            except Exception as e:
+                logger.error(f"Outbox claim for {name} failed: {e}")
+                rows = []
+            if not rows:
+                with self._queued_lock:
+                    self._queued[name] -= 1
+                continue
+            leased += len(rows)
+            self._executor.submit(self._deliver, name, rows)
+        return leased
+
+    def _run(self):
+        while not self._stop.is_set():
+            leased = self.drain_once()
+            # Keep going while there is a backlog; otherwise sleep until
+            # woken by new items or the next poll.
+            if not leased:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+            else:
+                time.sleep(0.05)
+
+    def start(self):
+        """Start the background drain loop (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox-dispatch",
+                                            daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Signal that new rows were written."""
+        self._wake.set()
+
+    def idle(self) -> bool:
+        with self._queued_lock:
+            return not any(self._queued.values())
+
+    def stop(self, timeout: float = 60.0):
+        """Deliver whatever is due (up to ``timeout``), then stop the loop."""
+        deadline = time.time() + timeout
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(deadline - time.time(), 0))
+        while time.time() < deadline:
+            if not self.drain_once() and self.idle():
+                break
+            time.sleep(0.05)
+        self._executor.shutdown(wait=False)
+        self.dispatch.shutdown()
+        stats = self.dispatch.snapshot()
+        if any(s["batches"] or s["failures"] or s["timeouts"] for s in stats.values()):
+            logger.info(f"Notifier stats: {stats}")
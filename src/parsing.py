@@ -0,0 +1,142 @@
+"""Optional process pool for CPU-bound page parsing.
+
+Parsing HTML holds the GIL, so a crawl that fetches pages faster than one
+core can parse them stalls on parsing.  ``ParsePool`` moves that work to
+worker processes: the crawl sends a page's raw bytes and gets back a small
+plain dict (price, image, thread titles and URLs), so the fetching side
+stays on I/O.  Parsing in a worker overlaps with the next fetch and with
+the polite sleeps between requests.
+
+With ``workers=0`` (the default), or for batches smaller than
+``min_pages``, pages are parsed in this process instead; starting worker
+processes costs more than it saves on a handful of pages.  If the pool
+cannot be started or a worker dies, parsing falls back to this process.
+
+Configured by the ``parsing`` section of ``config.yaml``::
+
+    parsing:
+      workers: 4      # 0 parses in-process
+      min_pages: 8    # smaller batches are parsed in-process
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+def _parsers() -> Dict[str, Callable]:
+    # Imported lazily: the forum scraper itself imports this module.
+    from src.sources import forum
+    return {
+        "m3post_thread": forum.parse_thread_details,
+        "m3post_listing": forum.parse_m3post_listing,
+    }
+
+
+def parse_page(kind: str, body: Union[str, bytes], url: str,
+               encoding: Optional[str] = None):
+    """Run the ``kind`` parser on one page (in a worker or in-process).
+
+    Args:
+        kind: Parser name, e.g. ``"m3post_thread"``.
+        body: Raw response bytes (or already decoded text).
+        url: Page URL, used to resolve relative links.
+        encoding: Charset from the response headers. When None the parser
+            works out the encoding from the bytes (``<meta charset>``).
+    """
+    if isinstance(body, bytes) and encoding:
+        body = body.decode(encoding, errors="replace")
+    return _parsers()[kind](body, url)
+
+
+class PendingParse:
+    """A page handed to ``ParsePool.submit``; ``result()`` waits for its dict."""
+
+    def __init__(self, future: Future, args: tuple):
+        self._future = future
+        self._args = args
+
+    def result(self, timeout: Optional[float] = None):
+        try:
+            return self._future.result(timeout)
+        except BrokenProcessPool:
+            logger.warning(f"Parse worker died; parsing {self._args[2]} in-process")
+            return parse_page(*self._args)
+
+
+class ParsePool:
+    """Parse pages in worker processes, or in-process for small runs.
+
+    Args:
+        workers: Worker processes; 0 parses everything in-process.
+        min_pages: Batches with fewer pages than this are parsed in-process.
+    """
+
+    def __init__(self, workers: int = 0, min_pages: int = 8):
+        self.workers = max(0, int(workers or 0))
+        self.min_pages = min_pages
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "ParsePool":
+        """Pool from the ``parsing`` config section (missing means in-process)."""
+        config = config or {}
+        return cls(workers=config.get("workers", 0), min_pages=config.get("min_pages", 8))
+
+    def use_processes(self, pages: int) -> bool:
+        """Whether a batch of ``pages`` pages is worth sending to workers."""
+        return self.workers > 0 and pages >= self.min_pages
+
+    def _pool(self) -> Optional[ProcessPoolExecutor]:
+        with self._lock:
+            if self._executor is None and self.workers:
+                try:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    logger.info(f"Started {self.workers} parse workers")
+                except (OSError, NotImplementedError) as e:
+                    logger.warning(f"Cannot start parse workers ({e}); parsing in-process")
+                    self.workers = 0
+            return self._executor
+
+    def submit(self, kind: str, body: Union[str, bytes], url: str,
+               encoding: Optional[str] = None, processes: bool = True) -> PendingParse:
+        """Queue one page for parsing; see ``parse_page`` for the arguments.
+
+        With ``processes=False`` (or no workers) the page is parsed right
+        away in this process and the result is ready immediately.
+        """
+        args = (kind, body, url, encoding)
+        pool = self._pool() if processes else None
+        if pool is not None:
+            try:
+                return PendingParse(pool.submit(parse_page, *args), args)
+            except (BrokenProcessPool, RuntimeError) as e:
+                logger.warning(f"Parse pool unavailable ({e}); parsing in-process")
+                with self._lock:
+                    if self._executor is pool:
+                        self._executor = None  # the next submit starts a fresh pool
+                pool.shutdown(wait=False)
+        future: Future = Future()
+        try:
+            future.set_result(parse_page(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return PendingParse(future, args)
+
+    def close(self):
+        """Shut the worker processes down (a later ``submit`` starts new ones)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __enter__(self) -> "ParsePool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,185 @@
+"""Adaptive polling: how often each source/keyword search runs.
+
+Every search the agent runs is a poll unit ``(source, key)``: the M3Post
+section crawl, each planned eBay query, each keyword's forum search.  For
+each unit ``PollScheduler`` keeps an exponentially weighted estimate of
+its new-item rate (new items per hour) and of its cost (HTTP requests per
+poll), and spreads a fixed request budget per hour over the units:
+
+    polls per hour of unit i  ~  sqrt(rate_i / cost_i)
+
+which minimises the average time a new listing waits to be found for a
+given number of requests.  Intervals are clamped to
+``[min_interval, max_interval]`` and the rest of the budget is shared out
+again (water-filling), so a dead search backs off to ``max_interval``
+while a busy one is polled down to ``min_interval``.
+
+Without an explicit ``requests_per_hour`` the budget is what polling every
+unit once per ``search_interval`` costs, so total request volume does not
+go up.  The state is kept in the ``poll_state`` table across restarts.
+"""
+
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src import db
+
+logger = logging.getLogger(__name__)
+
+Unit = Tuple[str, str]
+
+# Assumed new items per hour for a unit that has not been polled yet.
+PRIOR_RATE = 1.0
+
+
+@dataclass
+class PollState:
+    """What is known about one poll unit."""
+
+    source: str
+    key: str
+    rate: float = PRIOR_RATE       # new items per hour (EWMA)
+    cost: float = 1.0              # HTTP requests per poll (EWMA)
+    polls: int = 0
+    new_items: int = 0
+    last_polled: Optional[float] = None
+    interval: Optional[float] = None
+
+    @property
+    def unit(self) -> Unit:
+        return self.source, self.key
+
+
+class PollScheduler:
+    """Decide which poll units are due and learn from their yields.
+
+    Args:
+        search_interval: Fixed interval this replaces; sets the default
+            budget and the assumed gap before a unit's first poll.
+        requests_per_hour: Request budget; None means polling every unit
+            once per ``search_interval``.
+        min_interval: Shortest interval between polls of one unit (s).
+        max_interval: Longest interval between polls of one unit (s).
+        alpha: Weight of the newest poll in the rate and cost estimates.
+        tick: How often the daemon checks for due units (s).
+    """
+
+    def __init__(self, search_interval: float = 1800, requests_per_hour: Optional[float] = None,
+                 min_interval: float = 600, max_interval: float = 86400,
+                 alpha: float = 0.3, tick: float = 60):
+        self.search_interval = search_interval
+        self.requests_per_hour = requests_per_hour
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.alpha = alpha
+        self.tick = tick
+        self.states: Dict[Unit, PollState] = {}
+        self._loaded = False
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional["PollScheduler"]:
+        """Scheduler from the ``polling`` config section, or None if not adaptive."""
+        polling = config.get("polling") or {}
+        if not polling.get("adaptive"):
+            return None
+        return cls(
+            search_interval=config.get("search_interval", 1800),
+            requests_per_hour=polling.get("requests_per_hour"),
+            min_interval=polling.get("min_interval", 600),
+            max_interval=polling.get("max_interval", 86400),
+            alpha=polling.get("alpha", 0.3),
+            tick=polling.get("tick", 60),
+        )
+
+    def load(self):
+        """Read the stored state (once)."""
+        if not self._loaded:
+            db.init_db()
+            for row in db.load_poll_state():
+                state = PollState(**row)
+                self.states[state.unit] = state
+            self._loaded = True
+
+    def sync(self, units: Iterable[Unit]) -> List[PollState]:
+        """Track exactly ``units`` (new ones start with the prior); return their states."""
+        self.load()
+        units = list(units)
+        for unit in units:
+            if unit not in self.states:
+                self.states[unit] = PollState(*unit)
+        wanted = set(units)
+        for unit in [u for u in self.states if u not in wanted]:
+            del self.states[unit]  # keyword removed from the config
+        if any(self.states[u].interval is None for u in units):
+            self.replan()
+        return [self.states[u] for u in units]
+
+    def due(self, units: Iterable[Unit], now: Optional[float] = None) -> List[Unit]:
+        """The units whose interval has elapsed (never-polled units are always due)."""
+        now = time.time() if now is None else now
+        return [s.unit for s in self.sync(units)
+                if s.last_polled is None or now - s.last_polled >= s.interval]
+
+    def record(self, unit: Unit, new_items: int, requests: Optional[int] = None,
+               now: Optional[float] = None):
+        """Update a unit's estimates after polling it."""
+        now = time.time() if now is None else now
+        self.load()
+        state = self.states.setdefault(unit, PollState(*unit))
+        if state.last_polled is not None:
+            elapsed = now - state.last_polled
+        else:
+            elapsed = state.interval or self.search_interval
+        hours = max(elapsed, self.min_interval) / 3600
+        state.rate += self.alpha * (new_items / hours - state.rate)
+        if requests is not None:
+            state.cost += self.alpha * (max(requests, 1) - state.cost)
+        state.polls += 1
+        state.new_items += new_items
+        state.last_polled = now
+
+    def budget(self) -> float:
+        """Requests per hour to spread over the units."""
+        if self.requests_per_hour:
+            return float(self.requests_per_hour)
+        return sum(s.cost for s in self.states.values()) * 3600 / self.search_interval
+
+    def replan(self):
+        """Recompute every unit's interval from its rate and cost."""
+        states = list(self.states.values())
+        if not states:
+            return
+        budget = self.budget()
+        lo, hi = 3600 / self.max_interval, 3600 / self.min_interval  # polls per hour
+        weights = [math.sqrt(max(s.rate, 1e-6) / max(s.cost, 1e-6)) for s in states]
+
+        def spend(scale: float) -> float:
+            return sum(s.cost * min(hi, max(lo, scale * w)) for s, w in zip(states, weights))
+
+        if spend(0) >= budget:
+            scale = 0.0  # even the longest intervals use up the budget
+            logger.warning(f"Polling budget of {budget:.0f} requests/hour is below what "
+                           f"{len(states)} searches need at max_interval")
+        else:
+            low, high = 0.0, hi / min(weights)
+            for _ in range(60):  # bisect on the scale that spends the budget
+                mid = (low + high) / 2
+                if spend(mid) > budget:
+                    high = mid
+                else:
+                    low = mid
+            scale = low
+        for state, weight in zip(states, weights):
+            state.interval = 3600 / min(hi, max(lo, scale * weight))
+
+    def save(self):
+        """Store the state of every unit."""
+        db.save_poll_state([vars(s) for s in self.states.values()])
+
+    def report(self) -> List[Dict]:
+        """Per unit: rate, cost, interval and totals, busiest first."""
+        rows = [dict(vars(s)) for s in self.states.values()]
+        return sorted(rows, key=lambda r: -r["rate"])
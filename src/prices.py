@@ -0,0 +1,133 @@
+"""Price extraction from listing titles and post text.
+
+One precompiled pattern finds every price-like token in a single scan:
+currency-symbol amounts (``$1,500``, ``€900``, ``£1.2k``), amounts with a
+currency word (``1500 USD``), and bare numbers next to a sale cue
+(``asking 1500``, ``1500 obo``).  Each candidate is then classified from
+the words around it:
+
+* ``asking`` - next to a sale cue ("asking", "price", "obo", "shipped", ...)
+* ``price``  - a plain amount with nothing to say otherwise
+* ``shipping`` - a shipping charge ("+ $40 shipping", "shipping: $40")
+* ``was``    - a reference price ("retail $2,000", "paid $1800", "was $900")
+
+``best_price`` picks the most confident asking/plain price; shipping and
+reference prices are reported but never chosen.
+"""
+
+import re
+from typing import Iterable, List, NamedTuple, Optional
+
+_NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?"
+
+# Matched against lowercased text.  The lookahead lets the engine skip any
+# position that cannot start a price before trying the alternatives, which
+# makes one combined scan cheaper than the old three separate searches.
+_PRICE = re.compile(rf"""
+    (?=[$€£\dapos])
+    (?:
+        (?P<sym>[$€£])\s?(?P<a>{_NUMBER})(?P<ka>k\b)?
+      | \b(?P<b>{_NUMBER})(?P<kb>k)?\s*
+            (?:(?P<cur>usd|eur|gbp|cad|dollars|bucks)|obo|ono|shipped|firm)\b
+      | \b(?:asking|price|obo|shipped)\s*:?\s*(?P<c>{_NUMBER})(?P<kc>k\b)?
+    )
+""", re.VERBOSE)
+
+# Context looked at on either side of a candidate (also lowercased).
+_BEFORE = 32
+_AFTER = 24
+
+_WAS_BEFORE = re.compile(
+    r"\b(?:was|were|originally|orig|retails?|retailed|msrp|paid|new\s+(?:for|price)|"
+    r"list(?:ed)?\s+(?:at|for)|valued?\s+at|bought\s+(?:it\s+)?for)\b[^$€£\d]{0,12}$")
+_SHIPPING_BEFORE = re.compile(
+    r"\b(?:shipping|s/h|s&h)(?:\s+(?:is|cost|costs|of|=|would\s+be))?\s*:?\s*$")
+_SHIPPING_AFTER = re.compile(r"^\s*(?:for\s+)?(?:shipping|s/h|s&h|to\s+ship)\b")
+_ASKING_BEFORE = re.compile(
+    r"\b(?:asking|price|priced|selling|sale|now|fs|wts|offers?|sell)\b[^$€£\d]{0,12}$")
+_ASKING_AFTER = re.compile(
+    r"^\s*(?:obo|ono|firm|shipped|neg|or\s+best\s+offer|plus|\+\s*shipping)\b")
+
+_SYMBOL_CURRENCY = {"$": "USD", "€": "EUR", "£": "GBP"}
+_WORD_CURRENCY = {"usd": "USD", "eur": "EUR", "gbp": "GBP", "cad": "CAD",
+                  "dollars": "USD", "bucks": "USD"}
+
+CONFIDENCE = {"asking": 0.9, "price": 0.6, "shipping": 0.3, "was": 0.2}
+
+
+class PriceCandidate(NamedTuple):
+    """One price found in a text."""
+
+    text: str        # display form, e.g. "$1,500" (what the scrapers store)
+    value: float
+    currency: str    # ISO code; "$" is taken to mean USD
+    kind: str        # "asking", "price", "shipping" or "was"
+    confidence: float
+    start: int       # offset of the match in the text
+
+
+def _classify(text: str, start: int, end: int, cued: bool) -> str:
+    before = text[max(0, start - _BEFORE):start]
+    after = text[end:end + _AFTER]
+    if _WAS_BEFORE.search(before):
+        return "was"
+    if _SHIPPING_BEFORE.search(before) or _SHIPPING_AFTER.match(after):
+        return "shipping"
+    if cued or _ASKING_BEFORE.search(before) or _ASKING_AFTER.match(after):
+        return "asking"
+    return "price"
+
+
+def extract_prices(text: str) -> List[PriceCandidate]:
+    """Every price candidate in ``text``, in order of appearance."""
+    if not text:
+        return []
+    text = text.lower()
+    candidates = []
+    for m in _PRICE.finditer(text):
+        symbol = m.group("sym")
+        if symbol:
+            number, k, currency = m.group("a"), m.group("ka"), _SYMBOL_CURRENCY[symbol]
+        elif m.group("b"):
+            number, k, cur = m.group("b"), m.group("kb"), m.group("cur")
+            currency = _WORD_CURRENCY[cur] if cur else "USD"
+        else:
+            number, k, currency = m.group("c"), m.group("kc"), "USD"
+        value = float(number.replace(",", "")) * (1000 if k else 1)
+        if value <= 0:
+            continue
+        if k:
+            shown = f"{value:,.0f}"
+        else:
+            shown = number
+        if symbol:
+            display = f"{symbol}{shown}"
+        elif currency == "USD":
+            display = f"${shown}"
+        else:
+            display = f"{shown} {currency}"
+        # Bare numbers only match next to a sale cue ("1500 obo", "asking 1500").
+        kind = _classify(text, m.start(), m.end(), cued=not symbol and not m.group("cur"))
+        candidates.append(PriceCandidate(display, value, currency, kind, CONFIDENCE[kind], m.start()))
+    return candidates
+
+
+def best_price(text: str) -> Optional[PriceCandidate]:
+    """The most likely asking price in ``text`` (earliest among equals), or None."""
+    best = None
+    for candidate in extract_prices(text):
+        if candidate.kind in ("shipping", "was"):
+            continue
+        if best is None or candidate.confidence > best.confidence:
+            best = candidate
+    return best
+
+
+def extract_prices_many(texts: Iterable[str]) -> List[List[PriceCandidate]]:
+    """``extract_prices`` over many texts (e.g. for backfills)."""
+    return [extract_prices(text) for text in texts]
+
+
+def best_prices(texts: Iterable[str]) -> List[Optional[PriceCandidate]]:
+    """``best_price`` over many texts, in order."""
+    return [best_price(text) for text in texts]
@@ -0,0 +1,203 @@
+"""Profile one search cycle (``python main.py profile``).
+
+The cycle runs under cProfile (main thread, deterministic), tracemalloc
+(allocation sites and peak traced memory) and a small stack sampler that
+snapshots every thread's stack every few milliseconds.  The sampler's output
+is in the "collapsed stacks" format read by flamegraph.pl and speedscope.
+
+cProfile and tracemalloc both slow Python down (tracemalloc by 2-3x), so
+use the numbers to compare where time goes, not as absolute cycle times.
+"""
+
+import cProfile
+import io
+import linecache
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+# Where self time goes, by library: (label, substrings of the pstats key).
+LIBRARY_BUCKETS = [
+    ("BeautifulSoup / lxml parsing", ("bs4", "lxml", "html5lib", "soupsieve")),
+    ("regular expressions", ("re/__init__", "/re.py", "sre_", "re._", "'re.Pattern'")),
+    ("SQLite", ("sqlite3",)),
+    ("HTTP (requests/urllib3/ssl)", ("requests", "urllib3", "ssl", "socket", "http/client")),
+    ("JSON", ("json",)),
+]
+
+
+class StackSampler:
+    """Sample all threads' Python stacks at a fixed interval.
+
+    Args:
+        interval: Seconds between samples.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        return f"{module}:{code.co_name}"
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            names.update((t.ident, t.name) for t in threading.enumerate())
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, "thread"))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> List[str]:
+        """``frame;frame;frame count`` lines, most frequent first."""
+        return [f"{stack} {n}" for stack, n in self.counts.most_common()]
+
+
+class CycleProfile:
+    """Everything captured while profiling one cycle."""
+
+    def __init__(self):
+        self.wall = 0.0
+        self.profile = cProfile.Profile()
+        self.stats: Optional[pstats.Stats] = None
+        self.allocations: List[Tuple[str, int, int]] = []  # (site, bytes, count)
+        self.peak_traced: Optional[int] = None
+        self.peak_rss: Optional[int] = None
+        self.sampler: Optional[StackSampler] = None
+        self.error: Optional[BaseException] = None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports KiB
+
+
+def profile_cycle(run: Callable[[], object], memory: bool = True, top: int = 25,
+                  sample_interval: Optional[float] = 0.005) -> CycleProfile:
+    """Run ``run()`` under the profilers and collect the results.
+
+    An exception from ``run`` is kept on ``.error`` so a failing cycle can
+    still be inspected.
+    """
+    result = CycleProfile()
+    if sample_interval:
+        result.sampler = StackSampler(sample_interval)
+        result.sampler.start()
+    if memory:
+        tracemalloc.start(10)
+
+    start = time.perf_counter()
+    result.profile.enable()
+    try:
+        run()
+    except Exception as e:
+        result.error = e
+    finally:
+        result.profile.disable()
+        result.wall = time.perf_counter() - start
+        if result.sampler:
+            result.sampler.stop()
+
+    if memory:
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        result.peak_traced = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        for stat in snapshot.statistics("lineno")[:top]:
+            frame = stat.traceback[0]
+            result.allocations.append((f"{frame.filename}:{frame.lineno}", stat.size, stat.count))
+
+    result.stats = pstats.Stats(result.profile)
+    result.peak_rss = peak_rss_bytes()
+    return result
+
+
+def library_breakdown(stats: pstats.Stats) -> Dict[str, float]:
+    """Self time per library bucket (everything else lands in "other")."""
+    totals: Dict[str, float] = {label: 0.0 for label, _ in LIBRARY_BUCKETS}
+    totals["other"] = 0.0
+    for (filename, _, name), (_, _, tottime, _, _) in stats.stats.items():
+        key = f"{filename}:{name}"
+        for label, needles in LIBRARY_BUCKETS:
+            if any(needle in key for needle in needles):
+                totals[label] += tottime
+                break
+        else:
+            totals["other"] += tottime
+    return totals
+
+
+def _mb(n: Optional[int]) -> str:
+    return "n/a" if n is None else f"{n / 1024 / 1024:.1f} MB"
+
+
+def format_report(result: CycleProfile, top: int = 25) -> str:
+    """Human-readable summary: hot functions, time by library, allocations, memory."""
+    out = io.StringIO()
+    out.write(f"Cycle wall time under the profilers: {result.wall:.2f}s\n")
+    if result.error is not None:
+        out.write(f"Cycle raised: {result.error!r}\n")
+
+    out.write(f"\nTop {top} functions by cumulative time:\n")
+    result.stats.stream = out
+    result.stats.sort_stats("cumulative").print_stats(top)
+
+    breakdown = library_breakdown(result.stats)
+    total = sum(breakdown.values()) or 1.0
+    out.write("Self time by library:\n")
+    for label, seconds in sorted(breakdown.items(), key=lambda kv: -kv[1]):
+        out.write(f"  {label:<32} {seconds:8.3f}s  {100 * seconds / total:5.1f}%\n")
+
+    if result.allocations:
+        out.write(f"\nTop {len(result.allocations)} allocation sites (live at end of cycle):\n")
+        for site, size, count in result.allocations:
+            filename, _, lineno = site.rpartition(":")
+            line = linecache.getline(filename, int(lineno)).strip()
+            out.write(f"  {size / 1024:10.1f} KiB {count:8d} blocks  {site}\n")
+            if line:
+                out.write(f"  {'':>28}{line[:90]}\n")
+
+    out.write(f"\nPeak traced Python memory: {_mb(result.peak_traced)}\n")
+    out.write(f"Peak RSS: {_mb(result.peak_rss)}\n")
+    if result.sampler:
+        out.write(f"Stack samples: {result.sampler.samples} "
+                  f"every {result.sampler.interval * 1000:.0f}ms\n")
+    return out.getvalue()
@@ -0,0 +1,204 @@
+"""Query planner for the eBay keyword searches.
+
+The configured keywords overlap: "xpipe", "x pipe" and "x-pipe" are one
+search, and every eBay query already ends in "E9X M3".  ``plan_queries``
+turns the keyword list into fewer Browse API queries:
+
+* keywords that normalise to the same letters and digits ("x-pipe",
+  "x pipe", "xpipe") become one term, sending each distinct spelling;
+* a keyword covered by the query suffix itself ("M3") needs the plain
+  suffix search and gets a query of its own;
+* the remaining terms are combined, a few at a time, into OR queries such
+  as ``(xpipe, x pipe, muffler) E9X M3``.
+
+eBay does not say which part of an OR query a listing matched, so
+``tag_results`` matches every title against all keywords locally and
+records them on the item (the first becomes its ``keyword``).
+``marginal_yield`` then counts, per keyword, the listings it matched and
+those no other keyword matched: a keyword with no unique listings adds
+nothing over the others and is a candidate to drop from the config.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Appended to every eBay query (see search_ebay).
+QUERY_SUFFIX = "E9X M3"
+
+# Browse API ``q`` is limited to 100 characters.
+MAX_QUERY_CHARS = 100
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _words(text: str) -> Tuple[str, ...]:
+    return tuple(_WORD.findall(text.lower()))
+
+
+@dataclass
+class KeywordGroup:
+    """Configured keywords that are the same search."""
+
+    key: str                  # letters and digits only, e.g. "xpipe"
+    keywords: List[str]       # as configured, in config order
+    spellings: List[str]      # distinct forms sent to eBay, e.g. ["xpipe", "x pipe"]
+
+
+@dataclass
+class Query:
+    """One Browse API search covering one or more keyword groups."""
+
+    groups: List[KeywordGroup] = field(default_factory=list)
+
+    @property
+    def terms(self) -> List[str]:
+        return [s for group in self.groups for s in group.spellings]
+
+    @property
+    def keywords(self) -> List[str]:
+        return [k for group in self.groups for k in group.keywords]
+
+    @property
+    def text(self) -> str:
+        """The search text passed to ``search_ebay`` (which adds the suffix)."""
+        terms = self.terms
+        return terms[0] if len(terms) == 1 else f"({', '.join(terms)})"
+
+
+def group_keywords(keywords: Iterable[str]) -> List[KeywordGroup]:
+    """Merge keywords that normalise to the same letters and digits."""
+    groups: Dict[str, KeywordGroup] = {}
+    for keyword in keywords:
+        words = _words(str(keyword))
+        if not words:
+            continue
+        key = "".join(words)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = KeywordGroup(key, [], [])
+        group.keywords.append(keyword)
+        spelling = " ".join(words)
+        if spelling not in group.spellings:
+            group.spellings.append(spelling)
+    return list(groups.values())
+
+
+def _is_catch_all(group: KeywordGroup) -> bool:
+    """Whether the query suffix already contains the group ("M3")."""
+    return set(_words(group.spellings[0])) <= set(_words(QUERY_SUFFIX))
+
+
+def plan_queries(keywords: Iterable[str], terms_per_query: int = 5) -> List[Query]:
+    """Group ``keywords`` and pack the groups into as few queries as allowed.
+
+    Args:
+        keywords: Configured keywords, in config order.
+        terms_per_query: Most keyword groups per OR query; 1 keeps one
+            query per group (equivalent keywords are still merged).
+
+    Returns:
+        Queries in config order of their first keyword.
+    """
+    budget = MAX_QUERY_CHARS - len(QUERY_SUFFIX) - 1
+    queries: List[Query] = []
+    current: Optional[Query] = None
+    for group in group_keywords(keywords):
+        if _is_catch_all(group):
+            # "M3" would turn an OR query into the plain suffix search.
+            queries.append(Query([group]))
+            continue
+        if current is not None:
+            candidate = Query(current.groups + [group])
+            if len(current.groups) < terms_per_query and len(candidate.text) <= budget:
+                current.groups.append(group)
+                continue
+        current = Query([group])
+        queries.append(current)
+    return queries
+
+
+def _forms(key: str) -> frozenset:
+    """``key`` and its singular/plural variants ("wheel", "wheels", ...)."""
+    forms = {key, key + "s", key + "es"}
+    if key.endswith("s"):
+        forms.add(key[:-1])
+    return frozenset(forms)
+
+
+def _matches(key: str, words: Tuple[str, ...]) -> bool:
+    """Whether consecutive ``words`` spell ``key`` or its plural ("x", "pipes")."""
+    forms = _forms(key)
+    longest = len(key) + 2
+    for i, word in enumerate(words):
+        if not key.startswith(word) and word not in forms:
+            continue
+        joined = word
+        for nxt in words[i + 1:]:
+            if joined in forms or len(joined) >= longest:
+                break
+            joined += nxt
+        if joined in forms:
+            return True
+    return False
+
+
+def matching_keywords(title: str, groups: Iterable[KeywordGroup]) -> List[str]:
+    """Configured keywords whose group appears in ``title``, in config order."""
+    words = _words(title)
+    return [k for group in groups if _matches(group.key, words) for k in group.keywords]
+
+
+def tag_results(query: Query, items: List[Dict], groups: List[KeywordGroup]) -> List[Dict]:
+    """Record the keywords each of a query's results matches.
+
+    Sets ``keywords`` (every configured keyword found in the title) and
+    ``keyword``: the first match among the query's own keywords, else the
+    first match overall, else the query's first keyword (eBay also matches
+    descriptions, which are not seen here).
+    """
+    own = set(query.keywords)
+    for item in items:
+        matched = matching_keywords(item.get("title") or "", groups)
+        item["keywords"] = matched
+        item["keyword"] = next((k for k in matched if k in own),
+                               matched[0] if matched else query.keywords[0])
+    return items
+
+
+def marginal_yield(items: Iterable[Dict], groups: List[KeywordGroup]) -> Dict[str, Dict[str, int]]:
+    """Per keyword group: listings it matched and listings only it matched.
+
+    Keyed by the group's first keyword; titles are matched locally, so the
+    counts do not depend on which query returned a listing.  A keyword the
+    query suffix already covers ("M3") matches nearly every title, so it is
+    only credited with listings no other keyword matched.
+    """
+    report = {group.keywords[0]: {"matched": 0, "unique": 0} for group in groups}
+    specific = [g for g in groups if not _is_catch_all(g)]
+    catch_all = [g for g in groups if _is_catch_all(g)]
+    for item in items:
+        words = _words(item.get("title") or "")
+        hits = [g.keywords[0] for g in specific if _matches(g.key, words)]
+        broad = [g.keywords[0] for g in catch_all if _matches(g.key, words)]
+        for name in hits + broad:
+            report[name]["matched"] += 1
+        if len(hits) == 1:
+            report[hits[0]]["unique"] += 1
+        elif not hits and len(broad) == 1:
+            report[broad[0]]["unique"] += 1
+    return report
+
+
+def format_plan(queries: List[Query], report: Optional[Dict[str, Dict[str, int]]] = None) -> str:
+    """The planned queries, with marginal yield per keyword group if given."""
+    lines = []
+    for n, query in enumerate(queries, 1):
+        lines.append(f"{n:>3}. {query.text} {QUERY_SUFFIX}")
+        for group in query.groups:
+            line = f"       {', '.join(group.keywords)}"
+            if report is not None:
+                r = report[group.keywords[0]]
+                line = f"{line:<40} matched {r['matched']:>6}  unique {r['unique']:>6}"
+            lines.append(line)
+    return "\n".join(lines)
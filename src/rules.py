@@ -0,0 +1,228 @@
+"""Watch rules: route new items to notifiers by what they are.
+
+Rules come from ``watch_rules`` in config.yaml::
+
+    watch_rules:
+      - name: cheap coilovers
+        keywords: [coilover, coilovers]
+        max_price: 1500
+        notifiers: [sms]
+      - name: m3post wheels
+        sources: [forum:m3post]
+        categories: [Wheels]
+        notifiers: [sms]
+    default_notifiers: [stdout]   # items no rule matched
+
+Every condition a rule sets must hold (sources/categories/keywords are
+any-of lists); ``regex`` is searched case-insensitively in the title.
+
+Instead of testing each rule against each item, ``RuleIndex`` compiles the
+rules into per-dimension indexes whose values are bitsets of rule numbers
+(Python ints): source -> rules, category -> rules, title word -> rules, and
+a price segment table (the sorted rule price bounds split the price axis
+into segments, each storing the rules whose interval covers it; lookup is a
+bisect).  Matching an item is a handful of dict lookups and bitwise ANDs;
+only the surviving candidates with a regex run it.
+"""
+
+import bisect
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+class WatchRule:
+    """One user-defined alert rule."""
+
+    def __init__(self, name: str, notifiers: Iterable[str], sources: Iterable[str] = (),
+                 categories: Iterable[str] = (), keywords: Iterable[str] = (),
+                 regex: Optional[str] = None, min_price: Optional[float] = None,
+                 max_price: Optional[float] = None):
+        self.name = name
+        self.notifiers = list(notifiers)
+        self.sources = set(sources)
+        self.categories = set(categories)
+        self.keywords = [tuple(_words(k)) for k in keywords if _words(k)]
+        self.regex = re.compile(regex, re.IGNORECASE) if regex else None
+        self.min_price = min_price
+        self.max_price = max_price
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "WatchRule":
+        return cls(
+            name=data.get("name", "unnamed"),
+            notifiers=data.get("notifiers", []),
+            sources=data.get("sources", []),
+            categories=data.get("categories", []),
+            keywords=data.get("keywords", []),
+            regex=data.get("regex"),
+            min_price=data.get("min_price"),
+            max_price=data.get("max_price"),
+        )
+
+    def matches(self, item: Dict, price: Optional[float]) -> bool:
+        """Reference check of one item against this rule (no index)."""
+        if self.sources and item.get("source") not in self.sources:
+            return False
+        if self.categories and item.get("category") not in self.categories:
+            return False
+        if self.min_price is not None or self.max_price is not None:
+            if price is None:
+                return False
+            if self.min_price is not None and price < self.min_price:
+                return False
+            if self.max_price is not None and price > self.max_price:
+                return False
+        title = item.get("title") or ""
+        if self.keywords:
+            padded = f" {' '.join(_words(title))} "
+            if not any(f" {' '.join(k)} " in padded for k in self.keywords):
+                return False
+        if self.regex and not self.regex.search(title):
+            return False
+        return True
+
+
+class RuleIndex:
+    """Compiled set of watch rules.
+
+    Args:
+        rules: Rules to index.
+        default_notifiers: Notifiers for items that match no rule.
+    """
+
+    def __init__(self, rules: List[WatchRule], default_notifiers: Iterable[str] = ()):
+        self.rules = rules
+        self.default_notifiers = list(default_notifiers)
+        self._all = (1 << len(rules)) - 1
+
+        self._any_source = 0
+        self._by_source: Dict[str, int] = {}
+        self._any_category = 0
+        self._by_category: Dict[str, int] = {}
+        self._no_keywords = 0
+        # first word of a keyword phrase -> [(phrase, rule bit)]
+        self._by_word: Dict[str, List] = {}
+        self._no_price = 0
+        self._regex = 0
+
+        bounds: Set[float] = set()
+        for i, rule in enumerate(rules):
+            bit = 1 << i
+            if rule.sources:
+                for source in rule.sources:
+                    self._by_source[source] = self._by_source.get(source, 0) | bit
+            else:
+                self._any_source |= bit
+            if rule.categories:
+                for category in rule.categories:
+                    self._by_category[category] = self._by_category.get(category, 0) | bit
+            else:
+                self._any_category |= bit
+            if rule.keywords:
+                for phrase in rule.keywords:
+                    self._by_word.setdefault(phrase[0], []).append((phrase, bit))
+            else:
+                self._no_keywords |= bit
+            if rule.min_price is None and rule.max_price is None:
+                self._no_price |= bit
+            else:
+                if rule.min_price is not None:
+                    bounds.add(rule.min_price)
+                if rule.max_price is not None:
+                    bounds.add(rule.max_price)
+            if rule.regex:
+                self._regex |= bit
+
+        # Price segments: n sorted bounds split the axis into 2n + 1 pieces,
+        # alternating open gaps and the bound points themselves (segment
+        # 2j + 1 is bound j).  One sweep fills in which rules cover each.
+        self._bounds = sorted(bounds)
+        position = {b: j for j, b in enumerate(self._bounds)}
+        last = 2 * len(self._bounds)
+        opens = [0] * (last + 2)
+        closes = [0] * (last + 2)
+        for i, rule in enumerate(rules):
+            if rule.min_price is None and rule.max_price is None:
+                continue
+            start = 0 if rule.min_price is None else 2 * position[rule.min_price] + 1
+            end = last if rule.max_price is None else 2 * position[rule.max_price] + 1
+            if start <= end:
+                opens[start] |= 1 << i
+                closes[end + 1] |= 1 << i
+        self._segment_masks: List[int] = []
+        active = 0
+        for s in range(last + 1):
+            active = (active | opens[s]) & ~closes[s]
+            self._segment_masks.append(active | self._no_price)
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "RuleIndex":
+        rules = [WatchRule.from_dict(r) for r in config.get("watch_rules") or []]
+        return cls(rules, config.get("default_notifiers") or [])
+
+    def _price_mask(self, price: Optional[float]) -> int:
+        if price is None:
+            return self._no_price
+        j = bisect.bisect_left(self._bounds, price)
+        if j < len(self._bounds) and self._bounds[j] == price:
+            return self._segment_masks[2 * j + 1]
+        return self._segment_masks[2 * j]
+
+    def _keyword_mask(self, title: str) -> int:
+        words = _words(title)
+        mask = self._no_keywords
+        if not self._by_word:
+            return mask
+        for pos, word in enumerate(words):
+            for phrase, bit in self._by_word.get(word, ()):
+                if mask & bit:
+                    continue
+                if len(phrase) == 1 or tuple(words[pos:pos + len(phrase)]) == phrase:
+                    mask |= bit
+        return mask
+
+    def match(self, item: Dict, price: Optional[float] = None) -> List[WatchRule]:
+        """Rules that ``item`` satisfies, in configuration order."""
+        if not self.rules:
+            return []
+        mask = self._all
+        mask &= self._any_source | self._by_source.get(item.get("source"), 0)
+        if mask:
+            mask &= self._any_category | self._by_category.get(item.get("category"), 0)
+        if mask:
+            mask &= self._price_mask(price)
+        if mask:
+            mask &= self._keyword_mask(item.get("title") or "")
+
+        matched = []
+        title = item.get("title") or ""
+        while mask:
+            low = mask & -mask
+            i = low.bit_length() - 1
+            mask ^= low
+            rule = self.rules[i]
+            if low & self._regex and not rule.regex.search(title):
+                continue
+            matched.append(rule)
+        return matched
+
+    def route(self, item: Dict, price: Optional[float] = None) -> List[str]:
+        """Notifier names for an item: its rules' notifiers, else the defaults."""
+        matched = self.match(item, price)
+        if not matched:
+            return list(self.default_notifiers)
+        names: List[str] = []
+        for rule in matched:
+            for name in rule.notifiers:
+                if name not in names:
+                    names.append(name)
+        return names
@@ -0,0 +1,187 @@
+"""Event-driven job scheduler for the daemon.
+
+``Scheduler.run`` sleeps until the next job is due (or ``stop`` is called)
+instead of waking every second.  Each job has its own interval and
+jitter:
+
+* Runs follow a fixed grid (``start + k * interval``) plus a random delay
+  of up to ``jitter`` seconds, so a slow run does not push every later run
+  back, and sources with equal intervals do not all fire at once.
+* Jobs run one at a time on the scheduler's thread, in order of due time.
+  They cannot overlap: a cycle's instrumentation (``instrument._current``)
+  and the agent's per-cycle state (``Agent._polled``,
+  ``Agent.ebay_watermarks``) are process-wide.  So a slow job (say a long
+  M3Post crawl) makes the jobs due meanwhile start late, and if it runs
+  past their next slot, miss it; both show up in the lateness and missed
+  metrics below.  Jitter still spreads jobs that are due together.
+* A job that is due while still running from an earlier ``trigger`` is
+  not started twice; that slot counts as missed.
+* A run that starts a whole interval or more late has missed deadlines.
+  They are logged and counted in ``partsfinder_schedule_missed_total``,
+  and the job continues on its next grid slot rather than replaying
+  every missed run.
+* ``stop`` (wired to SIGTERM/SIGINT by ``install_signal_handlers``) wakes
+  the loop at once.  A running job finishes first.
+"""
+
+import logging
+import random
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from src.metrics import SCHEDULE_LATENESS, SCHEDULE_MISSED
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    """A recurring job and its bookkeeping."""
+
+    name: str
+    fn: Callable[[], object]
+    interval: float
+    jitter: float = 0.0
+    slot: float = 0.0         # grid time of the next run
+    next_run: float = 0.0     # slot plus this run's jitter
+    runs: int = 0
+    missed: int = 0
+    errors: int = 0
+    running: bool = False
+    last_duration: Optional[float] = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class Scheduler:
+    """Run recurring jobs at their own intervals, one at a time, until stopped.
+
+    Args:
+        clock: Monotonic time source (seconds).
+        rng: Random source for jitter.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic,
+                 rng: Optional[random.Random] = None):
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.jobs: Dict[str, Job] = {}
+        self._wake = threading.Event()
+        self._stopping = False
+
+    def add(self, name: str, fn: Callable[[], object], interval: float,
+            jitter: float = 0.0, delay: float = 0.0) -> Job:
+        """Schedule ``fn`` every ``interval`` seconds, first after ``delay`` (+ jitter)."""
+        if interval <= 0:
+            raise ValueError(f"Job {name!r} needs a positive interval")
+        job = Job(name, fn, float(interval), max(0.0, float(jitter)))
+        job.slot = self.clock() + delay
+        job.next_run = job.slot + self._jitter(job)
+        self.jobs[name] = job
+        self._wake.set()
+        return job
+
+    def _jitter(self, job: Job) -> float:
+        return self.rng.uniform(0, job.jitter) if job.jitter else 0.0
+
+    def _advance(self, job: Job, now: float, running: bool = False):
+        """Move ``job`` to its next grid slot after ``now``, counting skipped slots.
+
+        With ``running`` the job is still busy (started by ``trigger``), so
+        the due slot is missed as well instead of being run late.
+        """
+        late = now - job.next_run
+        overdue = int(late // job.interval) if late > 0 else 0
+        missed = overdue + int(running)
+        if not running:
+            SCHEDULE_LATENESS.labels(job.name).observe(max(0.0, late))
+        if missed:
+            job.missed += missed
+            SCHEDULE_MISSED.labels(job.name).inc(missed)
+            reason = "was still running" if running else f"ran {late:.0f}s late"
+            logger.warning(f"Job {job.name} {reason}; "
+                           f"missed {missed} deadline{'s' if missed != 1 else ''}")
+        job.slot += job.interval * (1 + overdue)
+        job.next_run = job.slot + self._jitter(job)
+
+    def _execute(self, job: Job) -> bool:
+        """Run ``job`` now unless it is already running; returns whether it ran."""
+        if not job.lock.acquire(blocking=False):
+            logger.warning(f"Job {job.name} is still running; not starting it again")
+            return False
+        job.running = True
+        start = self.clock()
+        try:
+            job.fn()
+        except Exception as e:
+            job.errors += 1
+            logger.error(f"Job {job.name} failed: {e}", exc_info=True)
+        finally:
+            job.last_duration = self.clock() - start
+            job.runs += 1
+            job.running = False
+            job.lock.release()
+        return True
+
+    def run_pending(self) -> Optional[float]:
+        """Run every job that is due; return seconds until the next one (None if no jobs)."""
+        while not self._stopping:
+            now = self.clock()
+            due = [job for job in self.jobs.values() if job.next_run <= now]
+            if not due:
+                break
+            job = min(due, key=lambda j: j.next_run)
+            if job.running:
+                # Started from another thread by ``trigger``: this slot is missed.
+                self._advance(job, now, running=True)
+                continue
+            self._advance(job, now)
+            self._execute(job)
+        if not self.jobs:
+            return None
+        return max(0.0, min(job.next_run for job in self.jobs.values()) - self.clock())
+
+    def trigger(self, name: str) -> bool:
+        """Run a job right away in the calling thread (unless it is running)."""
+        return self._execute(self.jobs[name])
+
+    def run(self):
+        """Run jobs as they fall due until ``stop`` is called."""
+        self._stopping = False
+        logger.info("Scheduler started: " + ", ".join(
+            f"{job.name} every {job.interval:.0f}s" + (f" (+{job.jitter:.0f}s jitter)"
+                                                       if job.jitter else "")
+            for job in self.jobs.values()))
+        while not self._stopping:
+            wait = self.run_pending()
+            if self._stopping:
+                break
+            self._wake.wait(wait)
+            self._wake.clear()
+        logger.info("Scheduler stopped")
+
+    def stop(self):
+        """Stop ``run`` after the current job (callable from any thread or a signal handler)."""
+        self._stopping = True
+        self._wake.set()
+
+    def install_signal_handlers(self):
+        """Stop on SIGTERM and SIGINT (only possible from the main thread)."""
+        def handler(signum, frame):
+            logger.info(f"Received {signal.Signals(signum).name}; stopping after the current job")
+            self.stop()
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, handler)
+
+    def status(self) -> List[Dict]:
+        """Per job: interval, seconds until due, runs, misses, errors and last duration."""
+        now = self.clock()
+        return [{
+            "name": job.name, "interval": job.interval, "jitter": job.jitter,
+            "due_in": round(job.next_run - now, 1), "running": job.running,
+            "runs": job.runs, "missed": job.missed, "errors": job.errors,
+            "last_duration": job.last_duration,
+        } for job in self.jobs.values()]
@@ -0,0 +1,140 @@
+"""Production WSGI serving for the web dashboard.
+
+``main.py web --production`` runs the dashboard under Gunicorn with a
+preloaded app and threaded workers.  Where Gunicorn is unavailable (it does
+not run on Windows) a multi-threaded Werkzeug server is used instead.
+``main.py all`` serves it from a thread of the agent's own process
+(``serve_background``) so the two share in-process state.
+"""
+
+import logging
+import signal
+import threading
+
+from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_app(app: Flask) -> Flask:
+    """Freeze an app for production: no reloads, templates precompiled, assets hashed."""
+    from src.db import init_db
+
+    app.config['TEMPLATES_AUTO_RELOAD'] = False
+    app.jinja_env.auto_reload = False
+
+    # Compile every template once so requests only ever hit the Jinja cache.
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    logger.info(f"Precompiled {len(names)} templates")
+
+    manifest = app.extensions.get('assets')
+    if manifest is not None:
+        manifest.auto_reload = False
+        manifest.build()
+
+    # Schema setup runs once here, before any worker serves a request; a
+    # broken schema should stop startup rather than surface as failing pages.
+    init_db()
+
+    return app
+
+
+def _stop_live_feed():
+    """End open SSE streams so graceful shutdown is not held up by them."""
+    from src.web import feed
+    feed.stop()
+
+
+def serve_gunicorn(app: Flask, host: str, port: int, workers: int, threads: int,
+                   timeout: int = 60, graceful_timeout: int = 30):
+    """Run under Gunicorn with ``gthread`` workers and a preloaded app."""
+    from gunicorn.app.base import BaseApplication
+
+    def post_worker_init(worker):
+        # Gunicorn's own SIGTERM handler stops accepting and drains requests;
+        # chain in ours so long-lived SSE streams close instead of timing out.
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def on_term(signum, frame):
+            _stop_live_feed()
+            if callable(previous):
+                previous(signum, frame)
+
+        signal.signal(signal.SIGTERM, on_term)
+
+    class DashboardApplication(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{host}:{port}",
+                "workers": workers,
+                "threads": threads,
+                "worker_class": "gthread",
+                "preload_app": True,
+                "timeout": timeout,
+                "graceful_timeout": graceful_timeout,
+                "post_worker_init": post_worker_init,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    DashboardApplication().run()
+
+
+def serve_threaded(app: Flask, host: str, port: int):
+    """Fallback: Werkzeug's thread-per-request server with SIGTERM shutdown."""
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, app, threaded=True)
+    logger.info(f"Serving on http://{host}:{port} (threaded, Gunicorn unavailable)")
+
+    def on_term(signum, frame):
+        _stop_live_feed()
+        # shutdown() blocks until serve_forever returns, so call it off-thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, on_term)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def serve_background(app: Flask, host: str, port: int):
+    """Serve on a daemon thread (threaded Werkzeug) and return the server.
+
+    For running the dashboard next to the agent in one process; stop it
+    with ``server.shutdown()``.
+    """
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="web", daemon=True).start()
+    logger.info(f"Serving on http://{host}:{port} (threaded, in-process)")
+    return server
+
+
+def serve(app: Flask, host: str = "127.0.0.1", port: int = 5000,
+          workers: int = 2, threads: int = 8):
+    """Serve ``app`` with a production WSGI server.
+
+    Args:
+        app: Flask application (prepared in the parent before workers fork).
+        host: Interface to bind.
+        port: Port to listen on.
+        workers: Worker processes (Gunicorn only).
+        threads: Threads per worker (Gunicorn only; the fallback server
+            starts a thread per request).
+    """
+    prepare_app(app)
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        logger.warning("Gunicorn not installed, falling back to threaded Werkzeug server")
+        serve_threaded(app, host, port)
+        return
+    serve_gunicorn(app, host, port, workers, threads)
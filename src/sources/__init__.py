@@ -1,7 +1,8 @@
 """Data sources for parts discovery."""
 
 from .ebay import search_ebay
-from .forum import search_forums, scrape_m3post_sections
+from .forum import search_forums, scrape_m3post_page, scrape_m3post_sections
 from .facebook import search_facebook
 
-__all__ = ["search_ebay", "search_forums", "search_facebook", "scrape_m3post_sections"]
+__all__ = ["search_ebay", "search_forums", "search_facebook", "scrape_m3post_page",
+           "scrape_m3post_sections"]
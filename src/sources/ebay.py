@@ -1,9 +1,9 @@
 """eBay parts searcher using official Browse REST API."""
 
 import logging
-import requests
+from src import fetch
 import base64
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional, Tuple
 from urllib.parse import urlencode
 import os
 from pathlib import Path
@@ -27,6 +27,14 @@ EBAY_API_URLS = {
 
 EBAY_BASE_URL = EBAY_API_URLS.get(EBAY_ENV, EBAY_API_URLS["PRODUCTION"])
 
+# Delta queries (see search_ebay): listings per page (the API maximum) and
+# the most pages followed for one keyword in one cycle.
+DELTA_PAGE_SIZE = 200
+MAX_DELTA_PAGES = 10
+# Watermark key (keyword + suffix) holding where a capped delta resumes:
+# "<offset> <until>", or "" when there is nothing left to fetch.
+RESUME_SUFFIX = "#resume"
+
 
 class eBayAuthenticator:
     """Handles eBay OAuth authentication."""
@@ -38,7 +46,7 @@ class eBayAuthenticator:
     
     def get_access_token(self) -> str:
         """Get OAuth access token using Client Credentials flow."""
-        if not self.client_id or not self.client_secret:
+        if (not self.client_id or not self.client_secret) and not fetch.is_replaying():
             logger.error("eBay API credentials not configured in .env file")
             return None
         
@@ -58,7 +66,7 @@ class eBayAuthenticator:
         data = {"grant_type": "client_credentials", "scope": "https://api.ebay.com/oauth/api_scope"}
         
         try:
-            resp = requests.post(auth_url, headers=headers, data=data, timeout=10)
+            resp = fetch.post(auth_url, headers=headers, data=data, timeout=10)
             resp.raise_for_status()
             self.access_token = resp.json().get("access_token")
             logger.info(f"eBay authentication successful ({EBAY_ENV})")
@@ -68,14 +76,94 @@ class eBayAuthenticator:
             return None
 
 
-def search_ebay(keyword: str, headers: dict = None, max_results: int = 20) -> List[Dict]:
+def _parse_item(item: Dict, keyword: str) -> Dict:
+    """Convert one Browse API ``itemSummary`` to an item dict."""
+    item_id = item.get("itemId")
+    title = item.get("title", "Unknown")
+    price_info = item.get("price", {})
+    price = price_info.get("value", "N/A")
+    currency = price_info.get("currency", "USD")
+
+    # Build eBay item URL
+    item_url = f"https://www.ebay.com/itm/{item_id}"
+
+    # Get image
+    image = None
+    image_list = item.get("image", {})
+    if isinstance(image_list, dict):
+        image = image_list.get("imageUrl")
+    elif isinstance(image_list, list) and image_list:
+        image = image_list[0].get("imageUrl") if isinstance(image_list[0], dict) else image_list[0]
+
+    return {
+        "source": "ebay",
+        "title": title,
+        "price": f"{price} {currency}",
+        "url": item_url,
+        "image": image,
+        "keyword": keyword,
+        "condition": item.get("condition", "Unknown"),
+        "item_id": item_id,
+        "listed_at": item.get("itemCreationDate"),
+    }
+
+
+def _load_resume(watermarks: Dict[str, str], keyword: str) -> Optional[Dict]:
+    value = watermarks.get(keyword + RESUME_SUFFIX) or ""
+    offset, _, until = value.partition(" ")
+    if not until:
+        return None
+    return {"offset": int(offset), "until": until}
+
+
+def _drain(fetch_page: Callable[[int], List[Dict]], offset: int, until: str,
+           budget: int, items: List[Dict]) -> Tuple[int, int, bool]:
+    """Page newest-first from ``offset`` until listings older than ``until``.
+
+    Listings created at or after ``until`` are appended to ``items``.
+    Returns the pages fetched, the offset of the last page fetched, and
+    whether the range was drained within ``budget`` pages.
+    """
+    pages, last = 0, offset
+    while pages < budget:
+        page = fetch_page(offset)
+        pages, last = pages + 1, offset
+        # Inclusive, so listings sharing ``until``'s timestamp are not
+        # missed; the repeats are dropped by the URL dedupe.
+        fresh = [item for item in page if (item["listed_at"] or until) >= until]
+        items.extend(fresh)
+        if len(fresh) < len(page) or len(page) < DELTA_PAGE_SIZE:
+            return pages, last, True
+        offset += DELTA_PAGE_SIZE
+    return pages, last, False
+
+
+def search_ebay(keyword: str, headers: dict = None, max_results: int = 20,
+                watermarks: Optional[Dict[str, str]] = None) -> List[Dict]:
     """Search eBay for parts using Browse API.
-    
+
+    Without a watermark this fetches the ``max_results`` newest listings.
+    With one (the ``itemCreationDate`` of the newest listing seen for this
+    keyword) it pages through the newest listings until it reaches that
+    date, so bursts are not cut off at one page.  Listings are compared on
+    ``itemCreationDate`` only, the same field the watermark is taken from.
+
+    A delta longer than ``MAX_DELTA_PAGES`` pages is finished over later
+    cycles: the watermark still moves to the newest listing, and a resume
+    point (the offset of the last page read and the old watermark) is
+    stored under ``keyword + RESUME_SUFFIX``.  Each later cycle first reads
+    what is new, then spends its remaining pages continuing from there
+    (shifted by the new listings that pushed it down, and re-reading one
+    page so listings that ended meanwhile cannot make it skip any).
+
     Args:
         keyword: Search term (e.g., "E90 exhaust")
         headers: Unused (for API compatibility)
-        max_results: Maximum number of results to return
-    
+        max_results: Maximum number of results to return without a watermark
+        watermarks: Keyword -> newest ``itemCreationDate`` seen, plus resume
+            points.  Read for ``keyword`` and updated in place once every
+            page of the cycle was fetched.
+
     Returns:
         List of dicts with keys: source, title, price, url, image, keyword
     """
@@ -91,10 +179,12 @@ def search_ebay(keyword: str, headers: dict = None, max_results: int = 20) -> Li
     search_query = f"{keyword} E9X M3"
     
     browse_url = f"{EBAY_BASE_URL}/buy/browse/v1/item_summary/search"
+    since = watermarks.get(keyword) if watermarks is not None else None
+    resume = _load_resume(watermarks, keyword) if since else None
     
     params = {
         "q": search_query,
-        "limit": max_results,
+        "limit": DELTA_PAGE_SIZE if since else max_results,
         "sort": "newlyListed",  # Sort by newly listed
         "filter": "buyingOptions:{AUCTION|FIXED_PRICE}",  # Include both auction and fixed price
     }
@@ -104,50 +194,48 @@ def search_ebay(keyword: str, headers: dict = None, max_results: int = 20) -> Li
         "Content-Language": "en-US",
         "User-Agent": "M3PartsFinder/1.0"
     }
-    
+
+    def fetch_page(offset: int) -> List[Dict]:
+        query = dict(params, offset=offset) if since else params
+        resp = fetch.get(f"{browse_url}?{urlencode(query)}", headers=headers, timeout=15)
+        resp.raise_for_status()
+        return [_parse_item(item, keyword) for item in resp.json().get("itemSummaries", [])]
+
     items = []
     try:
-        url = f"{browse_url}?{urlencode(params)}"
-        resp = requests.get(url, headers=headers, timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
-        
-        for item in data.get("itemSummaries", []):
-            # Extract item details
-            item_id = item.get("itemId")
-            title = item.get("title", "Unknown")
-            price_info = item.get("price", {})
-            price = price_info.get("value", "N/A")
-            currency = price_info.get("currency", "USD")
-            
-            # Build eBay item URL
-            item_url = f"https://www.ebay.com/itm/{item_id}"
-            
-            # Get image
-            image = None
-            image_list = item.get("image", {})
-            if isinstance(image_list, dict):
-                image = image_list.get("imageUrl")
-            elif isinstance(image_list, list) and image_list:
-                image = image_list[0].get("imageUrl") if isinstance(image_list[0], dict) else image_list[0]
-            
-            # Get condition
-            condition = item.get("condition", "Unknown")
-            
-            items.append({
-                "source": "ebay",
-                "title": title,
-                "price": f"{price} {currency}",
-                "url": item_url,
-                "image": image,
-                "keyword": keyword,
-                "condition": condition,
-                "item_id": item_id,
-            })
-        
-        logger.info(f"eBay search '{keyword}': {len(items)} results")
-        
+        if not since:
+            items = fetch_page(0)
+            pages = 1
+        else:
+            pages, last, drained = _drain(fetch_page, 0, since, MAX_DELTA_PAGES, items)
+            if not drained:
+                logger.warning(f"eBay search '{keyword}': stopped after {pages} pages "
+                               f"({len(items)} new listings); resuming at offset {last} "
+                               f"next cycle")
+                # Continue from here down to the oldest unfetched listing
+                # (an older resume point's range is covered by this one).
+                resume = {"offset": last, "until": resume["until"] if resume else since}
+            elif resume:
+                shift = sum(1 for item in items if (item["listed_at"] or "") > since)
+                used, last, drained = _drain(fetch_page, resume["offset"] + shift,
+                                             resume["until"], MAX_DELTA_PAGES - pages, items)
+                pages += used
+                resume = None if drained else {"offset": last, "until": resume["until"]}
+
+        logger.info(f"eBay search '{keyword}': {len(items)} results"
+                    + (f" since {since} ({pages} pages)" if since else ""))
+
+        if watermarks is not None:
+            newest = max((item["listed_at"] for item in items if item["listed_at"]), default=None)
+            if newest and (not since or newest > since):
+                watermarks[keyword] = newest
+            if resume or keyword + RESUME_SUFFIX in watermarks:
+                watermarks[keyword + RESUME_SUFFIX] = (
+                    f"{resume['offset']} {resume['until']}" if resume else "")
+
     except Exception as e:
+        # Nothing is updated after an error; the next cycle asks for the
+        # same window again.
         logger.error(f"eBay Browse API error for '{keyword}': {e}")
     
     return items
@@ -1,9 +1,14 @@
 """Forum scraper for BMW E9x and M3 communities."""
 
 import logging
-import requests
+from src import fetch, instrument
+from src.parsing import ParsePool, PendingParse
+from src.categorize import categorize
+from src.prices import best_price
 from bs4 import BeautifulSoup
-from typing import List, Dict
+from lxml import etree
+import lxml.html
+from typing import List, Dict, Optional
 import time
 import re
 
@@ -38,40 +43,8 @@ M3POST_SECTIONS = [
     {"forum_id": 182, "category": None, "label": "E9x M3 Parts"},
 ]
 
-# M3Post forum categories (from their site structure)
-M3POST_CATEGORIES = {
-    "exterior": "Exterior",
-    "cosmetic": "Exterior",
-    "wheel": "Wheels",
-    "tire": "Wheels",
-    "suspension": "Suspension",
-    "brake": "Suspension",
-    "chassis": "Suspension",
-    "spacer": "Suspension",
-    "interior": "Interior",
-    "engine": "Engine",
-    "drivetrain": "Engine",
-    "exhaust": "Engine",
-    "electronic": "Electronics",
-    "audio": "Electronics",
-    "video": "Electronics",
-    "phone": "Electronics",
-    "navigation": "Electronics",
-    "detailing": "Detailing",
-    "wash": "Detailing",
-    "wax": "Detailing",
-}
-
-def categorize_by_forum_structure(title: str) -> str:
-    """Categorize based on M3Post forum structure."""
-    title_lower = title.lower()
-
-    for keyword, category in M3POST_CATEGORIES.items():
-        if keyword in title_lower:
-            return category
-
-    return "Other"
-
+# Listing pages crawled per M3Post section each cycle.
+M3POST_PAGES = 3
 
 # Browser-like headers for forum requests (forums block bot user agents)
 _BROWSER_HEADERS = {
@@ -108,80 +81,111 @@ _m3post_listing_cache: Dict[int, Dict] = {}
 _M3POST_CACHE_TTL = 300  # seconds
 
 
-def _fetch_m3post_listing_page(page_num: int, headers: dict, forum_id: int = 182) -> List[Dict]:
-    """Fetch one page of an M3Post forum listing.
+def parse_m3post_listing(html: str, url: str) -> List[Dict]:
+    """Thread titles and canonical URLs from an M3Post forum listing page.
 
     Args:
-        page_num: 1-based page number.
-        headers: HTTP headers for the request.
-        forum_id: vBulletin forum ID to scrape.
+        html: Listing page HTML.
+        url: URL of the listing page, used to absolutise thread links.
 
     Returns:
         List of dicts with 'title' and 'url' keys.
     """
-    base = "https://www.m3post.com"
-    url = f"{base}/forums/forumdisplay.php?f={forum_id}&order=desc&page={page_num}"
+    base = '/'.join(url.split('/')[:3])
     threads: List[Dict] = []
+    soup = BeautifulSoup(html, "lxml")
 
-    try:
-        resp = requests.get(url, headers=headers, timeout=15)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "lxml")
+    # vBulletin 3.x: thread title links have id="thread_title_XXXX"
+    thread_links = soup.find_all(
+        'a', id=lambda x: x and x.startswith('thread_title_')
+    )
+
+    if not thread_links:
+        # Fallback: links inside the threads table
+        thread_links = soup.select('#threadslist a[href*="showthread.php"]')
 
-        # vBulletin 3.x: thread title links have id="thread_title_XXXX"
+    if not thread_links:
+        # Broadest fallback
         thread_links = soup.find_all(
-            'a', id=lambda x: x and x.startswith('thread_title_')
+            'a', href=lambda x: x and 'showthread.php' in x
         )
 
-        if not thread_links:
-            # Fallback: links inside the threads table
-            thread_links = soup.select('#threadslist a[href*="showthread.php"]')
-
-        if not thread_links:
-            # Broadest fallback
-            thread_links = soup.find_all(
-                'a', href=lambda x: x and 'showthread.php' in x
-            )
-
-        seen_urls: set = set()
-        for link in thread_links:
-            title = link.get_text(strip=True)
-            if not title or len(title) < 5:
-                continue
-            if title in ('«', '»', 'Previous', 'Next', 'First', 'Last'):
-                continue
+    seen_urls: set = set()
+    for link in thread_links:
+        title = link.get_text(strip=True)
+        if not title or len(title) < 5:
+            continue
+        if title in ('«', '»', 'Previous', 'Next', 'First', 'Last'):
+            continue
+
+        raw_url = link.get('href', '')
+        if not raw_url:
+            continue
+
+        # Make absolute
+        if not raw_url.startswith('http'):
+            if raw_url.startswith('/'):
+                raw_url = base + raw_url
+            else:
+                raw_url = base + '/forums/' + raw_url
+
+        canonical = _normalize_thread_url(raw_url)
+        if canonical in seen_urls:
+            continue
+        seen_urls.add(canonical)
+
+        threads.append({'title': title, 'url': canonical})
 
-            raw_url = link.get('href', '')
-            if not raw_url:
-                continue
+    return threads
 
-            # Make absolute
-            if not raw_url.startswith('http'):
-                if raw_url.startswith('/'):
-                    raw_url = base + raw_url
-                else:
-                    raw_url = base + '/forums/' + raw_url
 
-            canonical = _normalize_thread_url(raw_url)
-            if canonical in seen_urls:
-                continue
-            seen_urls.add(canonical)
+def _fetch_m3post_listing_page(page_num: int, headers: dict, forum_id: int = 182,
+                               parser: Optional[ParsePool] = None) -> List[Dict]:
+    """Fetch one page of an M3Post forum listing.
 
-            threads.append({'title': title, 'url': canonical})
+    Args:
+        page_num: 1-based page number.
+        headers: HTTP headers for the request.
+        forum_id: vBulletin forum ID to scrape.
+        parser: Pool that parses the page; in-process when None.
 
+    Returns:
+        List of dicts with 'title' and 'url' keys.
+    """
+    try:
+        return _fetch_m3post_listing(page_num, headers, forum_id, parser)
     except Exception as e:
         logger.warning(f"Failed to fetch M3Post listing page {page_num}: {e}")
 
-    return threads
+    return []
+
+
+def _submit_m3post_listing(page_num: int, headers: dict, forum_id: int, parser: ParsePool,
+                           processes: bool = True) -> PendingParse:
+    """Fetch one listing page, raising on HTTP errors, and queue it for parsing."""
+    url = (f"https://www.m3post.com/forums/forumdisplay.php"
+           f"?f={forum_id}&order=desc&page={page_num}")
+    resp = fetch.get(url, headers=headers, timeout=15)
+    resp.raise_for_status()
+    return parser.submit("m3post_listing", resp.content, url,
+                         encoding=resp.encoding, processes=processes)
 
 
-def _get_m3post_threads(headers: dict, forum_id: int = 182, pages: int = 3) -> List[Dict]:
+def _fetch_m3post_listing(page_num: int, headers: dict, forum_id: int,
+                          parser: Optional[ParsePool] = None) -> List[Dict]:
+    """Fetch and parse one listing page, raising on HTTP errors."""
+    return _submit_m3post_listing(page_num, headers, forum_id, parser or ParsePool()).result()
+
+
+def _get_m3post_threads(headers: dict, forum_id: int = 182, pages: int = 3,
+                        parser: Optional[ParsePool] = None) -> List[Dict]:
     """Return M3Post forum threads for a given section, using a short-lived cache.
 
     Args:
         headers: HTTP headers.
         forum_id: vBulletin forum ID to scrape.
         pages: Number of listing pages to scrape.
+        parser: Pool that parses the listing pages; in-process when None.
 
     Returns:
         List of thread dicts with 'title' and 'url' keys.
@@ -194,11 +198,20 @@ def _get_m3post_threads(headers: dict, forum_id: int = 182, pages: int = 3) -> L
             logger.debug("Using cached M3Post f=%d threads (%d)", forum_id, len(cache['threads']))
             return cache['threads']
 
+    parser = parser or ParsePool()
+    processes = parser.use_processes(pages)
     all_threads: List[Dict] = []
     seen_urls: set = set()
 
     for page_num in range(1, pages + 1):
-        page_threads = _fetch_m3post_listing_page(page_num, headers, forum_id=forum_id)
+        try:
+            pending = _submit_m3post_listing(page_num, headers, forum_id, parser, processes)
+            if page_num < pages:
+                fetch.polite_sleep(0.5)  # the page parses meanwhile
+            page_threads = pending.result()
+        except Exception as e:
+            logger.warning(f"Failed to fetch M3Post listing page {page_num}: {e}")
+            page_threads = []
         for t in page_threads:
             if t['url'] not in seen_urls:
                 seen_urls.add(t['url'])
@@ -207,15 +220,92 @@ def _get_m3post_threads(headers: dict, forum_id: int = 182, pages: int = 3) -> L
 
         if not page_threads:
             break
-        if page_num < pages:
-            time.sleep(0.5)
 
     _m3post_listing_cache[forum_id] = {'threads': all_threads, 'timestamp': now}
     logger.info("Cached %d M3Post threads from f=%d (%d pages)", len(all_threads), forum_id, pages)
     return all_threads
 
 
-def scrape_m3post_sections(headers: dict = None, pages: int = 3) -> List[Dict]:
+def _m3post_headers(headers: Optional[dict]) -> dict:
+    """Browser-like headers plus any caller headers except the user agent."""
+    req_headers = dict(_BROWSER_HEADERS)
+    if headers:
+        for k, v in headers.items():
+            if k.lower() != 'user-agent':
+                req_headers[k] = v
+    return req_headers
+
+
+def _m3post_section(forum_id: int) -> Dict:
+    for section in M3POST_SECTIONS:
+        if section["forum_id"] == forum_id:
+            return section
+    return {"forum_id": forum_id}
+
+
+def _enrich_m3post_threads(threads: List[Dict], section: Dict, req_headers: dict,
+                           parser: ParsePool, seen_urls: set) -> List[Dict]:
+    """Fetch each thread page for price and image; items for threads with a price."""
+    forced_category = section.get("category")
+    label = section.get("label", str(section["forum_id"]))
+
+    # Fetch thread pages here and hand their bytes to the parse pool,
+    # which parses them while the next pages are fetched.
+    processes = parser.use_processes(len(threads))
+    pending = []
+    for thread in threads:
+        canonical = _normalize_thread_url(thread['url'])
+        if canonical in seen_urls:
+            continue
+        seen_urls.add(canonical)
+
+        # Fetch thread page for price + image
+        with instrument.span("m3post.enrich"):
+            resp = _fetch_thread_page(canonical, req_headers)
+        details = None
+        if resp is not None:
+            with instrument.span("m3post.parse"):
+                details = parser.submit("m3post_thread", resp.content, canonical,
+                                        encoding=resp.encoding, processes=processes)
+        pending.append((thread, canonical, details))
+        fetch.polite_sleep(0.3)
+
+    items: List[Dict] = []
+    for thread, canonical, details in pending:
+        thread_details: Dict = {}
+        if details is not None:
+            with instrument.span("m3post.parse"):
+                try:
+                    thread_details = details.result()
+                except Exception as e:
+                    logger.debug("Failed to parse thread %s: %s", canonical, e)
+
+        price = (
+            extract_price(thread['title'])
+            or thread_details.get("price")
+        )
+
+        # Skip posts without a price
+        if not price:
+            logger.debug("Skipping (no price): %s", thread['title'])
+            continue
+
+        category = forced_category or categorize(thread['title'])
+
+        items.append({
+            "source": "forum:m3post",
+            "title": thread['title'],
+            "price": price,
+            "url": canonical,
+            "image": thread_details.get("image"),
+            "keyword": label,
+            "category": category,
+        })
+    return items
+
+
+def scrape_m3post_sections(headers: dict = None, pages: int = M3POST_PAGES,
+                           parser: Optional[ParsePool] = None) -> List[Dict]:
     """Scrape all threads from configured M3Post forum sections.
 
     Grabs everything from the first N pages of each section — no keyword
@@ -226,63 +316,54 @@ def scrape_m3post_sections(headers: dict = None, pages: int = 3) -> List[Dict]:
     Args:
         headers: HTTP headers (browser-like UA is always used).
         pages: Number of listing pages to fetch per section.
+        parser: Pool that parses the listing and thread pages; in-process when None.
 
     Returns:
         List of item dicts ready for database insertion.
     """
-    req_headers = dict(_BROWSER_HEADERS)
-    if headers:
-        for k, v in headers.items():
-            if k.lower() != 'user-agent':
-                req_headers[k] = v
+    parser = parser or ParsePool()
+    req_headers = _m3post_headers(headers)
 
     items: List[Dict] = []
     seen_urls: set = set()
 
     for section in M3POST_SECTIONS:
         forum_id = section["forum_id"]
-        forced_category = section.get("category")
         label = section.get("label", str(forum_id))
 
-        threads = _get_m3post_threads(req_headers, forum_id=forum_id, pages=pages)
+        with instrument.span("m3post.listing"):
+            threads = _get_m3post_threads(req_headers, forum_id=forum_id, pages=pages,
+                                          parser=parser)
         logger.info("M3Post [%s] (f=%d): %d threads from %d pages",
                      label, forum_id, len(threads), pages)
+        items.extend(_enrich_m3post_threads(threads, section, req_headers, parser, seen_urls))
 
-        for thread in threads:
-            canonical = _normalize_thread_url(thread['url'])
-            if canonical in seen_urls:
-                continue
-            seen_urls.add(canonical)
-
-            # Fetch thread page for price + image
-            thread_details = extract_thread_details(canonical, headers=req_headers)
-
-            price = (
-                extract_price(thread['title'])
-                or thread_details.get("price")
-            )
+    logger.info("M3Post sections total: %d items with prices", len(items))
+    return items
 
-            # Skip posts without a price
-            if not price:
-                logger.debug("Skipping (no price): %s", thread['title'])
-                continue
 
-            category = forced_category or categorize_by_forum_structure(thread['title'])
+def scrape_m3post_page(forum_id: int, page: int, headers: dict = None,
+                       parser: Optional[ParsePool] = None) -> List[Dict]:
+    """Scrape one listing page of one M3Post section (a crawl task).
 
-            items.append({
-                "source": "forum:m3post",
-                "title": thread['title'],
-                "price": price,
-                "url": canonical,
-                "image": thread_details.get("image"),
-                "keyword": label,
-                "category": category,
-            })
+    Like ``scrape_m3post_sections`` for a single page, except that a failed
+    listing fetch raises so the task can be retried.
 
-            time.sleep(0.3)
+    Args:
+        forum_id: vBulletin forum ID of the section.
+        page: 1-based listing page.
+        headers: HTTP headers (browser-like UA is always used).
+        parser: Pool that parses the listing and thread pages; in-process when None.
 
-    logger.info("M3Post sections total: %d items with prices", len(items))
-    return items
+    Returns:
+        List of item dicts ready for database insertion.
+    """
+    parser = parser or ParsePool()
+    req_headers = _m3post_headers(headers)
+    with instrument.span("m3post.listing"):
+        threads = _fetch_m3post_listing(page, req_headers, forum_id, parser)
+    return _enrich_m3post_threads(threads, _m3post_section(forum_id), req_headers,
+                                  parser, set())
 
 
 def search_generic_forum(forum: dict, keyword: str, headers: dict = None, max_results: int = 10) -> List[Dict]:
@@ -301,7 +382,7 @@ def search_generic_forum(forum: dict, keyword: str, headers: dict = None, max_re
         # Build search URL
         params = {"q": keyword}
         search_url = base.rstrip("/") + search_ep
-        resp = requests.get(search_url, params=params, headers=headers, timeout=15)
+        resp = fetch.get(search_url, params=params, headers=headers, timeout=15)
         resp.raise_for_status()
         
         soup = BeautifulSoup(resp.text, "lxml")
@@ -326,7 +407,7 @@ def search_generic_forum(forum: dict, keyword: str, headers: dict = None, max_re
                 price = extract_price(title)
                 
                 # Categorize based on title and keyword
-                category = categorize_by_forum_structure(title + " " + keyword)
+                category = categorize(title, keyword)
                 
                 items.append({
                     "source": f"forum:{forum['name']}",
@@ -345,7 +426,10 @@ def search_generic_forum(forum: dict, keyword: str, headers: dict = None, max_re
 
 
 def extract_price(text: str) -> str:
-    """Extract price from text like '$1,500', '1500 USD', 'asking 1500', etc.
+    """Extract the asking price from text like '$1,500', '1500 USD', 'asking 1500', etc.
+
+    Shipping charges and reference prices ("retail $2,000") are skipped;
+    see ``src.prices`` for the candidates and how they are classified.
 
     Args:
         text: Text to search for price patterns.
@@ -353,154 +437,228 @@ def extract_price(text: str) -> str:
     Returns:
         Price string or None if no price found.
     """
-    # Pattern 1: $XXX or €XXX with optional cents
-    match = re.search(r'[$€][\d,]+(?:\.\d{2})?', text)
-    if match:
-        return match.group(0)
-
-    # Pattern 2: "1500 USD", "1500 obo", "asking 1500", "price 1500"
-    match = re.search(
-        r'(?:asking|price|obo|shipped)\s*:?\s*(\d[\d,]*)',
-        text, re.IGNORECASE,
+    best = best_price(text)
+    return best.text if best else None
+
+
+# vBulletin UI image patterns to skip (icons, smilies, status indicators, etc.)
+IMAGE_SKIP_PATTERNS = [
+    'banner', 'icon', 'logo', 'nav', 'avatar',
+    '1x1', 'spacer', 'button', 'pixel',
+    'smilie', 'smiley', 'emoji', 'emoticon',
+    'statusicon', 'inlinemod', 'reputation',
+    'clear.gif', '/misc/', '/buttons/',
+    '/icons/', 'progress_bar', 'rank',
+    'forum_old', 'collapse_', 'postcount',
+    'vbulletin_css', '/images/ranks/',
+]
+_IMAGE_SKIP = re.compile('|'.join(map(re.escape, IMAGE_SKIP_PATTERNS)))
+
+# First post content area, in order of preference (same as the soup path).
+_FIRST_POST_XPATHS = [
+    etree.XPath("//div[starts-with(@id, 'post_message_')][1]"),
+    etree.XPath("//div[contains(concat(' ', normalize-space(@class), ' '), ' postcontent ')][1]"),
+    etree.XPath("//blockquote[contains(concat(' ', normalize-space(@class), ' '), ' postcontent ')][1]"),
+]
+_ATTACHMENT_IMGS = etree.XPath("//img[contains(@src, 'attachment.php')]")
+_ATTACHMENT_LAZY_IMGS = etree.XPath("//img[contains(@data-src, 'attachment.php')]")
+_ATTACHMENT_LINKS = etree.XPath("//a[contains(@href, 'attachment.php')]")
+
+
+def _make_absolute(src: str, base_url: str) -> str:
+    if src.startswith('//'):
+        return 'https:' + src
+    if src.startswith('/'):
+        return base_url + src
+    if not src.startswith('http'):
+        return base_url + '/' + src
+    return src
+
+
+def _is_content_image(img) -> bool:
+    """Return True if the img tag (BeautifulSoup or lxml element) looks like real post content."""
+    src = img.get('src', '') or img.get('data-src', '')
+    if not src:
+        return False
+    if _IMAGE_SKIP.search(src.lower()):
+        return False
+    try:
+        w = img.get('width', '')
+        h = img.get('height', '')
+        if w and int(str(w).replace('px', '')) < 50:
+            return False
+        if h and int(str(h).replace('px', '')) < 50:
+            return False
+    except (ValueError, TypeError):
+        pass
+    return True
+
+
+def _parse_thread_details_fast(html: str, thread_url: str) -> Dict:
+    """Thread price and image via lxml and precompiled XPath.
+
+    Same strategies and results as ``_parse_thread_details_soup``, but
+    without building a BeautifulSoup tree: XPath goes straight to the first
+    post and the attachment images, and each strategy stops at the first
+    content image.
+    """
+    result: Dict = {"price": None, "image": None}
+    doc = lxml.html.document_fromstring(html)
+    base_url = '/'.join(thread_url.split('/')[:3])
+
+    first_post = None
+    for xpath in _FIRST_POST_XPATHS:
+        found = xpath(doc)
+        if found:
+            first_post = found[0]
+            break
+    result["price"] = extract_price((first_post if first_post is not None else doc).text_content())
+
+    # Strategy 1: vBulletin attachment images, then lazy-loaded ones
+    imgs = _ATTACHMENT_IMGS(doc) or _ATTACHMENT_LAZY_IMGS(doc)
+    for img in imgs:
+        if _is_content_image(img):
+            result["image"] = _make_absolute(img.get('src', '') or img.get('data-src', ''), base_url)
+            return result
+
+    # Strategy 2: images inside the post content area
+    for img in (first_post if first_post is not None else doc).iter('img'):
+        if _is_content_image(img):
+            result["image"] = _make_absolute(img.get('src', '') or img.get('data-src', ''), base_url)
+            return result
+
+    # Strategy 3: linked attachment thumbnails (a > img), using the full-size link
+    for link in _ATTACHMENT_LINKS(doc):
+        thumb = link.find('.//img')
+        if thumb is not None and (thumb.get('src', '') or thumb.get('data-src', '')):
+            result["image"] = _make_absolute(
+                link.get('href', '') or thumb.get('src', '') or thumb.get('data-src', ''), base_url)
+            return result
+    return result
+
+
+def _parse_thread_details_soup(html: str, thread_url: str) -> Dict:
+    """Thread price and image from a full BeautifulSoup tree (fallback path)."""
+    result: Dict = {"price": None, "image": None}
+    soup = BeautifulSoup(html, "lxml")
+
+    # --- Price extraction ---
+    # Look in the first post content div for prices
+    first_post = (
+        soup.find('div', id=lambda x: x and x.startswith('post_message_'))
+        or soup.find('div', class_='postcontent')
+        or soup.find('blockquote', class_='postcontent')
     )
-    if match:
-        return f"${match.group(1)}"
+    price_text = first_post.get_text() if first_post else soup.get_text()
+    price = extract_price(price_text)
+    if price:
+        result["price"] = price
+
+    # --- Image extraction ---
+    # Narrow the search to the first post content area when possible.
+    # Also look in the attachment section below the post.
+    search_area = first_post if first_post else soup
+    base_url = '/'.join(thread_url.split('/')[:3])
+
+    # Strategy 1: vBulletin attachment images (attachment.php)
+    # These are the "attached images" at the bottom of forum posts
+    attachment_imgs = soup.find_all(
+        'img', src=lambda x: x and 'attachment.php' in x
+    )
+    if not attachment_imgs:
+        # Also check data-src for lazy-loaded attachments
+        attachment_imgs = soup.find_all(
+            'img', attrs={'data-src': lambda x: x and 'attachment.php' in str(x)}
+        )
+    for img in attachment_imgs:
+        src = img.get('src', '') or img.get('data-src', '')
+        if src and _is_content_image(img):
+            result["image"] = _make_absolute(src, base_url)
+            break
 
-    # Pattern 3: number followed by price-related word
-    match = re.search(r'(\d[\d,]+)\s*(?:USD|obo|shipped|firm)', text, re.IGNORECASE)
-    if match:
-        return f"${match.group(1)}"
+    # Strategy 2: Images inside the post content area
+    if not result["image"]:
+        imgs = search_area.find_all('img')
+        for img in imgs:
+            if _is_content_image(img):
+                src = img.get('src', '') or img.get('data-src', '')
+                result["image"] = _make_absolute(src, base_url)
+                break
 
-    return None
+    # Strategy 3: Linked attachment thumbnails (a > img pattern)
+    if not result["image"]:
+        attachment_links = soup.find_all(
+            'a', href=lambda x: x and 'attachment.php' in x
+        )
+        for link in attachment_links:
+            thumb = link.find('img')
+            if thumb:
+                src = thumb.get('src', '') or thumb.get('data-src', '')
+                if src:
+                    # Use the full-size attachment URL from the link href
+                    full_src = link.get('href', '')
+                    result["image"] = _make_absolute(full_src or src, base_url)
+                    break
 
+    return result
 
-def extract_thread_details(thread_url: str, headers: dict = None) -> Dict:
-    """Fetch a thread page and extract the first price and image from post content.
+
+def parse_thread_details(html: str, thread_url: str) -> Dict:
+    """Extract the first price and image from a thread page's post content.
 
     Looks inside the first post's content area (vBulletin ``post_message_*``
-    div or ``alt1`` cell) so that navigation chrome, avatars, and other UI
-    images are ignored.
+    div or ``postcontent`` block) so that navigation chrome, avatars, and
+    other UI images are ignored.  Uses the lxml fast path and falls back to
+    the BeautifulSoup parser if lxml cannot handle the page.
 
     Args:
-        thread_url: Full URL of the thread.
-        headers: HTTP headers for the request.
+        html: Thread page HTML.
+        thread_url: URL of the thread, used to absolutise image links.
 
     Returns:
         Dict with 'price' (str|None) and 'image' (str|None) keys.
     """
-    if not headers:
-        headers = dict(_BROWSER_HEADERS)
+    try:
+        return _parse_thread_details_fast(html, thread_url)
+    except (etree.LxmlError, ValueError) as e:
+        logger.debug("Fast thread parse failed for %s (%s); using BeautifulSoup", thread_url, e)
+        return _parse_thread_details_soup(html, thread_url)
 
-    result: Dict = {"price": None, "image": None}
 
+def _fetch_thread_page(thread_url: str, headers: dict):
+    """GET a thread page; None (logged) if the request fails."""
     try:
-        resp = requests.get(thread_url, headers=headers, timeout=10)
+        resp = fetch.get(thread_url, headers=headers, timeout=10)
         resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "lxml")
+        return resp
+    except Exception as e:
+        logger.debug("Failed to fetch thread %s: %s", thread_url, e)
+        return None
 
-        # --- Price extraction ---
-        # Look in the first post content div for prices
-        first_post = (
-            soup.find('div', id=lambda x: x and x.startswith('post_message_'))
-            or soup.find('div', class_='postcontent')
-            or soup.find('blockquote', class_='postcontent')
-        )
-        price_text = first_post.get_text() if first_post else soup.get_text()
-        price = extract_price(price_text)
-        if price:
-            result["price"] = price
-
-        # --- Image extraction ---
-        # Narrow the search to the first post content area when possible.
-        # Also look in the attachment section below the post.
-        search_area = first_post if first_post else soup
-
-        # vBulletin UI patterns to skip (icons, smilies, status indicators, etc.)
-        skip_patterns = [
-            'banner', 'icon', 'logo', 'nav', 'avatar',
-            '1x1', 'spacer', 'button', 'pixel',
-            'smilie', 'smiley', 'emoji', 'emoticon',
-            'statusicon', 'inlinemod', 'reputation',
-            'clear.gif', '/misc/', '/buttons/',
-            '/icons/', 'progress_bar', 'rank',
-            'forum_old', 'collapse_', 'postcount',
-            'vbulletin_css', '/images/ranks/',
-        ]
-
-        base_url = '/'.join(thread_url.split('/')[:3])
-
-        def _make_absolute(src: str) -> str:
-            if src.startswith('//'):
-                return 'https:' + src
-            if src.startswith('/'):
-                return base_url + src
-            if not src.startswith('http'):
-                return base_url + '/' + src
-            return src
-
-        def _is_content_image(img_tag) -> bool:
-            """Return True if the img tag looks like real post content."""
-            src = img_tag.get('src', '') or img_tag.get('data-src', '')
-            if not src:
-                return False
-            src_lower = src.lower()
-            if any(p in src_lower for p in skip_patterns):
-                return False
-            try:
-                w = img_tag.get('width', '')
-                h = img_tag.get('height', '')
-                if w and int(str(w).replace('px', '')) < 50:
-                    return False
-                if h and int(str(h).replace('px', '')) < 50:
-                    return False
-            except (ValueError, TypeError):
-                pass
-            return True
-
-        # Strategy 1: vBulletin attachment images (attachment.php)
-        # These are the "attached images" at the bottom of forum posts
-        attachment_imgs = soup.find_all(
-            'img', src=lambda x: x and 'attachment.php' in x
-        )
-        if not attachment_imgs:
-            # Also check data-src for lazy-loaded attachments
-            attachment_imgs = soup.find_all(
-                'img', attrs={'data-src': lambda x: x and 'attachment.php' in str(x)}
-            )
-        for img in attachment_imgs:
-            src = img.get('src', '') or img.get('data-src', '')
-            if src and _is_content_image(img):
-                result["image"] = _make_absolute(src)
-                break
 
-        # Strategy 2: Images inside the post content area
-        if not result["image"]:
-            imgs = search_area.find_all('img')
-            for img in imgs:
-                if _is_content_image(img):
-                    src = img.get('src', '') or img.get('data-src', '')
-                    result["image"] = _make_absolute(src)
-                    break
+def extract_thread_details(thread_url: str, headers: dict = None) -> Dict:
+    """Fetch a thread page and extract the first price and image from post content.
 
-        # Strategy 3: Linked attachment thumbnails (a > img pattern)
-        if not result["image"]:
-            attachment_links = soup.find_all(
-                'a', href=lambda x: x and 'attachment.php' in x
-            )
-            for link in attachment_links:
-                thumb = link.find('img')
-                if thumb:
-                    src = thumb.get('src', '') or thumb.get('data-src', '')
-                    if src:
-                        # Use the full-size attachment URL from the link href
-                        full_src = link.get('href', '')
-                        result["image"] = _make_absolute(full_src or src)
-                        break
+    See ``parse_thread_details`` for what is extracted.
 
-    except Exception as e:
-        logger.debug("Failed to extract thread details from %s: %s", thread_url, e)
+    Args:
+        thread_url: Full URL of the thread.
+        headers: HTTP headers for the request.
 
-    return result
+    Returns:
+        Dict with 'price' (str|None) and 'image' (str|None) keys.
+    """
+    if not headers:
+        headers = dict(_BROWSER_HEADERS)
+
+    resp = _fetch_thread_page(thread_url, headers)
+    if resp is not None:
+        try:
+            return parse_thread_details(resp.text, thread_url)
+        except Exception as e:
+            logger.debug("Failed to extract thread details from %s: %s", thread_url, e)
+
+    return {"price": None, "image": None}
 
 
 def search_forum(forum: dict, keyword: str, headers: dict = None, max_results: int = 10) -> List[Dict]:
@@ -527,6 +685,6 @@ def search_forums(keyword: str, headers: dict = None, max_results: int = 20) ->
     for forum in FORUMS:
         forum_results = search_forum(forum, keyword, headers=headers, max_results=max_results // len(FORUMS) + 2)
         results.extend(forum_results)
-        time.sleep(0.5)  # Rate limit between forums
+        fetch.polite_sleep(0.5)  # Rate limit between forums
 
     return results[:max_results]
@@ -0,0 +1,177 @@
+"""Synthetic item generator for testing the dashboard at scale.
+
+``seed_database`` fills a database with millions of realistic items: the
+sources the agent scrapes, titles that categorise the way real listings
+do, every price format the scrapers store, found dates spread over a
+window, and a share of archived items.  It is what ``seed_db.py`` runs.
+
+Rows go in with ``executemany`` on one connection with syncing off.  The
+FTS index, facet counters and item indexes are dropped first and rebuilt
+once at the end by ``db.init_db`` (maintaining them row by row through the
+triggers is several times slower than rebuilding them).
+"""
+
+import bisect
+import itertools
+import logging
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Tuple
+
+from src import db
+
+logger = logging.getLogger(__name__)
+
+# (source, weight): roughly the mix a year of crawling produced.
+SOURCES = [
+    ("ebay", 55),
+    ("forum:m3post", 25),
+    ("forum:e90post", 10),
+    ("forum:bimmerpost", 6),
+    ("forum:m3cutters", 4),
+]
+
+# (part phrase, search keyword); the phrase decides the category.
+PARTS = [
+    ("carbon fiber trunk spoiler", "spoiler"), ("front bumper with splitter", "bumper"),
+    ("CSL style hood", "hood"), ("rear diffuser", "diffuser"), ("kidney grille set", "grille"),
+    ("19\" forged wheels", "wheels"), ("BBS CH-R wheels", "wheels"), ("Michelin PS4S tires", "tires"),
+    ("KW V3 coilovers", "coilovers"), ("Ohlins R&T coilovers", "coilovers"),
+    ("rear control arm set", "suspension"), ("Brembo brake kit", "brake"),
+    ("Recaro seats", "seats"), ("alcantara steering wheel", "steering wheel"),
+    ("short shifter", "shifter"), ("floor mats", "interior"),
+    ("Akrapovic evo exhaust", "exhaust"), ("Meistershaft muffler delete", "muffler"),
+    ("lightweight flywheel", "flywheel"), ("Gruppe M intake", "intake"),
+    ("ESS supercharger kit", "supercharger"), ("DCT transmission", "transmission"),
+    ("Harman Kardon audio", "audio"), ("Escort radar install kit", "radar"),
+    ("touchup paint pen", "touchup"), ("OEM owner's manual", "manual"),
+    ("battery tender", "battery"), ("tow hook", "tow hook"),
+]
+
+CONDITIONS = ["", "", "New", "Used", "Like new", "OEM", "Mint", "Take-off"]
+MODELS = ["E90 M3", "E92 M3", "E93 M3", "E9X M3", "M3"]
+PRICES = [35, 60, 90, 150, 240, 325, 450, 700, 950, 1200, 1650, 2100, 2800, 3900, 5200, 7500]
+
+# Column order of the rows yielded by ``generate_rows``.
+COLUMNS = ("source", "title", "price", "price_value", "url", "image", "keyword",
+           "category", "found_date", "archived")
+
+
+def _price(rng: random.Random, source: str) -> Optional[str]:
+    """A price string in one of the formats the scrapers store."""
+    amount = rng.choice(PRICES) * rng.choice([1, 1, 1, 0.9, 1.1])
+    if source == "ebay":
+        if rng.random() < 0.01:
+            return "N/A USD"
+        currency = rng.choices(["USD", "GBP", "EUR", "CAD"], [85, 6, 6, 3])[0]
+        return f"{amount + rng.choice([0, 0.99, 0.5]):.2f} {currency}"
+    roll = rng.random()
+    if roll < 0.08:
+        return "Contact"
+    if roll < 0.10:
+        return None
+    whole = int(amount)
+    return rng.choice([f"${whole:,}", f"${whole}", f"${whole:,}.00", f"€{whole:,}"])
+
+
+def generate_rows(n: int, seed: int = 0, start: int = 0, days: int = 365,
+                  archived_share: float = 0.3,
+                  now: Optional[datetime] = None) -> Iterator[Tuple]:
+    """Yield ``n`` item rows (see ``COLUMNS``) with urls numbered from ``start``.
+
+    Found dates are spread over the last ``days`` days, denser towards the
+    present; items older than a month are archived with probability
+    ``archived_share`` (scaled so the overall share matches).
+    """
+    rng = random.Random(seed)
+    now = (now or datetime.now()).replace(second=0, microsecond=0)
+    sources, weights = zip(*SOURCES)
+    cum_weights = list(itertools.accumulate(weights))
+    categories = {}
+    stamps = {}
+    span = days * 1440
+    for i in range(start, start + n):
+        source = sources[bisect.bisect(cum_weights, rng.random() * cum_weights[-1])]
+        part, keyword = rng.choice(PARTS)
+        title = " ".join(filter(None, [rng.choice(MODELS), rng.choice(CONDITIONS), part, f"#{i}"]))
+        key = (part, keyword)
+        category = categories.get(key)
+        if category is None:
+            category = categories[key] = db.categorize_item(part, keyword)
+        price = _price(rng, source)
+        minutes = int(span * rng.random() ** 1.5)
+        stamp = stamps.get(minutes)
+        if stamp is None:
+            stamp = stamps[minutes] = (now - timedelta(minutes=minutes)).strftime("%Y-%m-%d %H:%M:%S")
+        archived = int(minutes > 30 * 1440 and rng.random() < archived_share * 1.2)
+        host = "www.ebay.com/itm" if source == "ebay" else f"www.{source[6:]}.com/forums/t"
+        yield (
+            source, title, price, db.parse_price_value(price), f"https://{host}/{i}",
+            None, keyword, category, stamp, archived,
+        )
+
+
+def _drop_derived(conn: sqlite3.Connection):
+    """Drop the FTS index, facet counters and item indexes (init_db rebuilds them)."""
+    triggers = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='trigger' AND tbl_name='items'")]
+    for name in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+    conn.execute("DROP TABLE IF EXISTS items_fts")
+    conn.execute("DROP TABLE IF EXISTS facet_counts")
+    for name, _ in db.ITEM_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.commit()
+
+
+def seed_database(path: Path, n: int, seed: int = 0, days: int = 365,
+                  archived_share: float = 0.3, batch: int = 50000,
+                  progress: Optional[Callable[[int], None]] = None) -> int:
+    """Append ``n`` synthetic items to the database at ``path``.
+
+    Args:
+        path: SQLite file; created if missing. Existing items are kept.
+        n: Number of items to add.
+        seed: Random seed; the same seed and size give the same rows.
+        days: Spread found dates over this many days.
+        archived_share: Rough fraction of items marked archived.
+        batch: Rows per transaction.
+        progress: Called with the running total after each batch.
+
+    Returns:
+        Number of items inserted.
+    """
+    saved_path = db.DB_PATH
+    db.DB_PATH = Path(path)
+    try:
+        db.init_db()
+        conn = db.connect()
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        _drop_derived(conn)
+        start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM items").fetchone()[0]
+        before = conn.total_changes
+        rows = generate_rows(n, seed=seed, start=start, days=days, archived_share=archived_share)
+        sql = (f"INSERT OR IGNORE INTO items ({', '.join(COLUMNS)}) "
+               f"VALUES ({', '.join('?' * len(COLUMNS))})")
+        done = 0
+        t0 = time.perf_counter()
+        while True:
+            chunk = list(itertools.islice(rows, batch))
+            if not chunk:
+                break
+            conn.executemany(sql, chunk)
+            conn.commit()
+            done += len(chunk)
+            if progress:
+                progress(done)
+        inserted = conn.total_changes - before
+        conn.close()
+        logger.info(f"Inserted {inserted} items in {time.perf_counter() - t0:.1f}s; rebuilding indexes")
+        db.init_db()  # recreates indexes, facet counters and the FTS index
+        return inserted
+    finally:
+        db.DB_PATH = saved_path
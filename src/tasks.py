@@ -0,0 +1,448 @@
+"""Crawl task queue: spread searches over worker hosts.
+
+Forums rate-limit by IP, so instead of one agent doing every search, the
+daemon can act as a coordinator (``main.py daemon --queue``) and workers
+on other hosts (``main.py worker``), each with its own egress IP, do the
+fetching:
+
+* The coordinator enqueues one task per ``(source, key, page)``: an
+  M3Post section listing page, a planned eBay query, a keyword's forum
+  search.  A task that is already pending or leased is not queued twice.
+* A worker leases tasks for ``lease`` seconds (a visibility timeout),
+  runs them and pushes the found items back with the lease token.  If the
+  worker dies, the lease runs out and another worker gets the task; a
+  result sent under a lost lease is rejected, so each task has at most
+  one result.
+* Failed attempts are retried with exponential backoff.  After
+  ``max_attempts`` the task is moved to the dead-letter queue ('dead'),
+  where ``main.py tasks`` shows it and ``--requeue-dead`` retries it.
+* The coordinator ingests results through the normal cycle (dedupe, save,
+  notify) and then acknowledges them.  Items are unique by URL, so
+  ingesting a result twice after a crash saves and notifies nothing twice.
+
+The store is the SQLite database (``tasks`` table) by default, which
+suits workers that share the coordinator's disk, or Redis
+(``tasks.backend: redis``) for workers on other hosts.
+"""
+
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from src import db, instrument
+from src.metrics import TASKS_RUN
+
+logger = logging.getLogger(__name__)
+
+TaskKey = Tuple[str, str, int]
+
+# Ingested tasks are kept this long (SQLite store) for ``main.py tasks``.
+KEEP_INGESTED = 7 * 86400
+
+
+@dataclass
+class Task:
+    """One leased unit of crawl work."""
+
+    id: Union[int, str]
+    source: str
+    key: str
+    page: int = 1
+    attempts: int = 0
+    lease_token: Optional[str] = None
+    worker: Optional[str] = None
+
+
+class TaskQueue(ABC):
+    """A store of crawl tasks, leased to workers.
+
+    Args:
+        lease: Seconds a leased task stays invisible to other workers.
+        max_attempts: Attempts before a task goes to the dead-letter queue.
+        retry_delay: Delay before the first retry (s); doubles per attempt.
+    """
+
+    def __init__(self, lease: float = 300, max_attempts: int = 5, retry_delay: float = 60):
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def retry_at(self, attempts: int, now: Optional[float] = None) -> Optional[float]:
+        """When to retry after ``attempts`` attempts, or None to give up."""
+        if attempts >= self.max_attempts:
+            return None
+        now = time.time() if now is None else now
+        return now + self.retry_delay * 2 ** max(attempts - 1, 0)
+
+    @abstractmethod
+    def enqueue(self, tasks: Iterable[TaskKey]) -> int:
+        """Queue tasks; returns how many were new (not already pending or leased)."""
+
+    @abstractmethod
+    def lease_tasks(self, worker: str, limit: int = 1) -> List[Task]:
+        """Lease up to ``limit`` runnable tasks to ``worker``."""
+
+    @abstractmethod
+    def complete(self, task: Task, items: List[Dict], requests: Optional[int] = None) -> bool:
+        """Push a task's result; False if its lease was lost to another worker."""
+
+    @abstractmethod
+    def fail(self, task: Task, error: str) -> bool:
+        """Record a failed attempt: retry later, or dead-letter after the last one."""
+
+    @abstractmethod
+    def results(self, limit: int = 100) -> List[Dict]:
+        """Results not ingested yet: task fields plus ``items`` and ``requests``."""
+
+    @abstractmethod
+    def ack(self, task_ids: List):
+        """Mark results as ingested."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Task counts per state."""
+
+    @abstractmethod
+    def dead(self, limit: int = 50) -> List[Dict]:
+        """The dead-letter queue, newest first."""
+
+    @abstractmethod
+    def requeue_dead(self) -> int:
+        """Give every dead task a fresh set of attempts."""
+
+
+def _encode_result(items: List[Dict], requests: Optional[int]) -> str:
+    return json.dumps({"items": items, "requests": requests}, default=str)
+
+
+def _decode_result(row: Dict) -> Dict:
+    payload = json.loads(row.pop("result") or "{}")
+    row["items"] = payload.get("items") or []
+    row["requests"] = payload.get("requests")
+    return row
+
+
+class SqliteTaskQueue(TaskQueue):
+    """Tasks in the ``tasks`` table of the database (``src.db``)."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        db.init_db()
+
+    def enqueue(self, tasks: Iterable[TaskKey]) -> int:
+        db.purge_tasks(time.time() - KEEP_INGESTED)
+        return db.enqueue_tasks(list(tasks))
+
+    def lease_tasks(self, worker: str, limit: int = 1) -> List[Task]:
+        rows = db.lease_tasks(worker, limit=limit, lease=self.lease,
+                              max_attempts=self.max_attempts)
+        return [Task(row["id"], row["source"], row["key"], row["page"], row["attempts"],
+                     row["lease_token"], row["worker"]) for row in rows]
+
+    def complete(self, task: Task, items: List[Dict], requests: Optional[int] = None) -> bool:
+        return db.complete_task(task.id, task.lease_token, _encode_result(items, requests))
+
+    def fail(self, task: Task, error: str) -> bool:
+        return db.fail_task(task.id, task.lease_token, error, self.retry_at(task.attempts))
+
+    def results(self, limit: int = 100) -> List[Dict]:
+        return [_decode_result(row) for row in db.get_task_results(limit)]
+
+    def ack(self, task_ids: List):
+        db.mark_tasks_ingested(list(task_ids))
+
+    def stats(self) -> Dict[str, int]:
+        return db.get_task_stats()
+
+    def dead(self, limit: int = 50) -> List[Dict]:
+        return db.get_dead_tasks(limit)
+
+    def requeue_dead(self) -> int:
+        return db.requeue_dead_tasks()
+
+
+# Redis layout under ``prefix``: ``:task:<id>`` hashes, ``:pending`` and
+# ``:leased`` sorted sets (scored by due time and lease expiry), ``:done``
+# list of results to ingest, ``:dead`` sorted set (scored by time of death)
+# and ``:active`` hash of "source|key|page" -> id for pending/leased tasks.
+# State changes run as Lua scripts so they are atomic.
+
+_REDIS_ENQUEUE = """
+local p, dedupe = ARGV[1], ARGV[2]
+if redis.call('HEXISTS', p .. ':active', dedupe) == 1 then return 0 end
+local id = redis.call('INCR', p .. ':seq')
+redis.call('HSET', p .. ':task:' .. id, 'source', ARGV[3], 'key', ARGV[4], 'page', ARGV[5],
+           'state', 'pending', 'attempts', 0, 'dedupe', dedupe, 'created_at', ARGV[6])
+redis.call('HSET', p .. ':active', dedupe, id)
+redis.call('ZADD', p .. ':pending', ARGV[6], id)
+return 1
+"""
+
+_REDIS_LEASE = """
+local p, now, limit = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3])
+local lease, max_attempts, worker = tonumber(ARGV[4]), tonumber(ARGV[5]), ARGV[6]
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', p .. ':leased', '-inf', now)) do
+  local t = p .. ':task:' .. id
+  redis.call('ZREM', p .. ':leased', id)
+  if tonumber(redis.call('HGET', t, 'attempts')) >= max_attempts then
+    redis.call('HSET', t, 'state', 'dead', 'token', '', 'finished_at', now)
+    redis.call('HSETNX', t, 'last_error', 'lease expired')
+    redis.call('HDEL', p .. ':active', redis.call('HGET', t, 'dedupe'))
+    redis.call('ZADD', p .. ':dead', now, id)
+  else
+    -- back in the queue; the old token stays valid until someone re-leases
+    redis.call('HSET', t, 'state', 'pending')
+    redis.call('ZADD', p .. ':pending', now, id)
+  end
+end
+local leased = {}
+for i, id in ipairs(redis.call('ZRANGEBYSCORE', p .. ':pending', '-inf', now, 'LIMIT', 0, limit)) do
+  local t = p .. ':task:' .. id
+  redis.call('ZREM', p .. ':pending', id)
+  redis.call('ZADD', p .. ':leased', now + lease, id)
+  redis.call('HINCRBY', t, 'attempts', 1)
+  redis.call('HSET', t, 'state', 'leased', 'token', ARGV[6 + i], 'worker', worker)
+  table.insert(leased, id)
+end
+return leased
+"""
+
+_REDIS_FINISH = """
+local p, id, token, now = ARGV[1], ARGV[2], ARGV[3], ARGV[4]
+local t = p .. ':task:' .. id
+local state = redis.call('HGET', t, 'state')
+if redis.call('HGET', t, 'token') ~= token or (state ~= 'leased' and state ~= 'pending') then
+  return 0
+end
+redis.call('ZREM', p .. ':leased', id)
+redis.call('ZREM', p .. ':pending', id)
+redis.call('HSET', t, 'token', '')
+if ARGV[5] == 'done' then
+  redis.call('HSET', t, 'state', 'done', 'result', ARGV[6], 'finished_at', now)
+  redis.call('HDEL', t, 'last_error')
+  redis.call('HDEL', p .. ':active', redis.call('HGET', t, 'dedupe'))
+  redis.call('RPUSH', p .. ':done', id)
+elseif ARGV[5] == 'dead' then
+  redis.call('HSET', t, 'state', 'dead', 'last_error', ARGV[6], 'finished_at', now)
+  redis.call('HDEL', p .. ':active', redis.call('HGET', t, 'dedupe'))
+  redis.call('ZADD', p .. ':dead', now, id)
+else
+  redis.call('HSET', t, 'state', 'pending', 'last_error', ARGV[6])
+  redis.call('ZADD', p .. ':pending', ARGV[7], id)
+end
+return 1
+"""
+
+_REDIS_REQUEUE = """
+local p, now = ARGV[1], ARGV[2]
+local count = 0
+for _, id in ipairs(redis.call('ZRANGE', p .. ':dead', 0, -1)) do
+  local t = p .. ':task:' .. id
+  local dedupe = redis.call('HGET', t, 'dedupe')
+  if redis.call('HEXISTS', p .. ':active', dedupe) == 1 then
+    redis.call('DEL', t)  -- queued again since
+  else
+    redis.call('HSET', t, 'state', 'pending', 'attempts', 0)
+    redis.call('HSET', p .. ':active', dedupe, id)
+    redis.call('ZADD', p .. ':pending', now, id)
+    count = count + 1
+  end
+end
+redis.call('DEL', p .. ':dead')
+return count
+"""
+
+_TASK_FIELDS = ("source", "key", "page", "state", "attempts", "worker", "last_error",
+                "finished_at")
+
+
+class RedisTaskQueue(TaskQueue):
+    """Tasks in Redis, for workers on other hosts.
+
+    Args:
+        url: Redis URL, e.g. ``redis://coordinator:6379/0``.
+        prefix: Key prefix for every key the queue uses.
+        client: Existing client (``decode_responses=True``) instead of ``url``.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0",
+                 prefix: str = "partsfinder:tasks", client=None, **kwargs):
+        super().__init__(**kwargs)
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("tasks.backend 'redis' needs the redis package "
+                                   "(pip install redis)")
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.client = client
+        self._enqueue = self.client.register_script(_REDIS_ENQUEUE)
+        self._lease = self.client.register_script(_REDIS_LEASE)
+        self._finish = self.client.register_script(_REDIS_FINISH)
+        self._requeue = self.client.register_script(_REDIS_REQUEUE)
+
+    def _task(self, task_id) -> Dict:
+        values = self.client.hmget(f"{self.prefix}:task:{task_id}", *_TASK_FIELDS)
+        row = dict(zip(_TASK_FIELDS, values), id=task_id)
+        row["page"] = int(row["page"] or 1)
+        row["attempts"] = int(row["attempts"] or 0)
+        return row
+
+    def enqueue(self, tasks: Iterable[TaskKey]) -> int:
+        now = time.time()
+        return sum(self._enqueue(args=[self.prefix, f"{source}|{key}|{page}",
+                                       source, key, page, now])
+                   for source, key, page in tasks)
+
+    def lease_tasks(self, worker: str, limit: int = 1) -> List[Task]:
+        tokens = [uuid.uuid4().hex for _ in range(limit)]
+        ids = self._lease(args=[self.prefix, time.time(), limit, self.lease,
+                                self.max_attempts, worker] + tokens)
+        tasks = []
+        for task_id, token in zip(ids, tokens):
+            row = self._task(task_id)
+            tasks.append(Task(task_id, row["source"], row["key"], row["page"],
+                              row["attempts"], token, worker))
+        return tasks
+
+    def complete(self, task: Task, items: List[Dict], requests: Optional[int] = None) -> bool:
+        return bool(self._finish(args=[self.prefix, task.id, task.lease_token, time.time(),
+                                       "done", _encode_result(items, requests)]))
+
+    def fail(self, task: Task, error: str) -> bool:
+        retry_at = self.retry_at(task.attempts)
+        outcome = "dead" if retry_at is None else "retry"
+        return bool(self._finish(args=[self.prefix, task.id, task.lease_token, time.time(),
+                                       outcome, error[:500], retry_at or 0]))
+
+    def results(self, limit: int = 100) -> List[Dict]:
+        rows = []
+        for task_id in self.client.lrange(f"{self.prefix}:done", 0, limit - 1):
+            row = self._task(task_id)
+            row["result"] = self.client.hget(f"{self.prefix}:task:{task_id}", "result")
+            rows.append(_decode_result(row))
+        return rows
+
+    def ack(self, task_ids: List):
+        pipe = self.client.pipeline()
+        for task_id in task_ids:
+            pipe.lrem(f"{self.prefix}:done", 0, task_id)
+            pipe.delete(f"{self.prefix}:task:{task_id}")
+        pipe.execute()
+
+    def stats(self) -> Dict[str, int]:
+        p = self.prefix
+        counts = {
+            "pending": self.client.zcard(f"{p}:pending"),
+            "leased": self.client.zcard(f"{p}:leased"),
+            "done": self.client.llen(f"{p}:done"),
+            "dead": self.client.zcard(f"{p}:dead"),
+        }
+        return {state: count for state, count in counts.items() if count}
+
+    def dead(self, limit: int = 50) -> List[Dict]:
+        return [self._task(task_id)
+                for task_id in self.client.zrevrange(f"{self.prefix}:dead", 0, limit - 1)]
+
+    def requeue_dead(self) -> int:
+        return int(self._requeue(args=[self.prefix, time.time()]))
+
+
+def open_queue(config: Optional[Dict]) -> TaskQueue:
+    """Queue from the ``tasks`` config section (SQLite unless ``backend: redis``)."""
+    config = config or {}
+    options = dict(lease=config.get("lease", 300),
+                   max_attempts=config.get("max_attempts", 5),
+                   retry_delay=config.get("retry_delay", 60))
+    backend = config.get("backend", "sqlite")
+    if backend == "redis":
+        return RedisTaskQueue(url=config.get("redis_url", "redis://localhost:6379/0"),
+                              prefix=config.get("redis_prefix", "partsfinder:tasks"),
+                              **options)
+    if backend != "sqlite":
+        raise ValueError(f"Unknown tasks.backend {backend!r} (use sqlite or redis)")
+    return SqliteTaskQueue(**options)
+
+
+class Worker:
+    """Lease tasks from a queue and run them until stopped.
+
+    Args:
+        queue: The task queue.
+        run_task: Runs one task and returns the items it found.
+        name: Worker name recorded on its leases (default host:pid).
+        batch: Tasks leased at a time.
+        idle_sleep: Seconds to wait when the queue is empty.
+    """
+
+    def __init__(self, queue: TaskQueue, run_task: Callable[[Task], List[Dict]],
+                 name: Optional[str] = None, batch: int = 1, idle_sleep: float = 5):
+        self.queue = queue
+        self.run_task = run_task
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.batch = batch
+        self.idle_sleep = idle_sleep
+        self._stop = threading.Event()
+
+    def _run(self, task: Task) -> str:
+        run = instrument.begin_run()
+        try:
+            with instrument.span(f"task: {task.source}"):
+                items = self.run_task(task)
+        except Exception as e:
+            instrument.end_run()
+            self.queue.fail(task, f"{type(e).__name__}: {e}")
+            outcome = "retry" if self.queue.retry_at(task.attempts) else "dead"
+            logger.warning(f"Task {task.source} {task.key!r} p{task.page} failed "
+                           f"(attempt {task.attempts}, {outcome}): {e}")
+            return outcome
+        instrument.end_run()
+        if not self.queue.complete(task, items, run.http_requests()):
+            logger.warning(f"Lease on task {task.source} {task.key!r} p{task.page} was lost; "
+                           f"result dropped")
+            return "lost"
+        logger.info(f"Task {task.source} {task.key!r} p{task.page}: {len(items)} items")
+        return "done"
+
+    def run_once(self) -> int:
+        """Lease and run one batch; returns the number of tasks run."""
+        tasks = self.queue.lease_tasks(self.name, self.batch)
+        for task in tasks:
+            TASKS_RUN.labels(task.source, self._run(task)).inc()
+        return len(tasks)
+
+    def run(self):
+        """Run tasks until ``stop`` is called (waiting ``idle_sleep`` when idle)."""
+        self._stop.clear()
+        logger.info(f"Worker {self.name} started")
+        while not self._stop.is_set():
+            try:
+                ran = self.run_once()
+            except Exception as e:
+                logger.error(f"Task queue error: {e}")
+                ran = 0
+            if not ran:
+                self._stop.wait(self.idle_sleep)
+        logger.info(f"Worker {self.name} stopped")
+
+    def stop(self):
+        """Stop after the current task."""
+        self._stop.set()
+
+    def install_signal_handlers(self):
+        """Stop on SIGTERM and SIGINT (only possible from the main thread)."""
+        def handler(signum, frame):
+            logger.info(f"Received {signal.Signals(signum).name}; stopping after the current task")
+            self.stop()
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, handler)
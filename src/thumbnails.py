@@ -0,0 +1,260 @@
+"""Disk-backed thumbnail cache for item images.
+
+Item images live on m3post ``attachment.php`` URLs and eBay's CDN.  Rather
+than hot-linking them from the dashboard, each image is fetched once,
+shrunk to a card-sized JPEG and stored under ``src/cache/thumbnails``.  The
+cache is capped in size and evicts the least recently served files first
+(file mtimes are bumped on every hit).
+
+Pillow is optional: without it the original bytes are cached unchanged.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(os.getenv("THUMBNAIL_CACHE_DIR", Path(__file__).parent / "cache" / "thumbnails"))
+MAX_CACHE_BYTES = int(os.getenv("THUMBNAIL_CACHE_MB", "200")) * 1024 * 1024
+THUMBNAIL_SIZE = (480, 360)
+MAX_SOURCE_BYTES = 20 * 1024 * 1024  # refuse absurdly large originals
+FAILURE_TTL = 3600  # seconds before a failed URL is retried
+MAX_FAILURES = 1000  # failed URLs remembered at once
+LOCK_STRIPES = 64  # per-URL download locks, shared by hash
+
+# Same browser-like headers as the forum scraper; m3post rejects bot agents.
+_FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "image/avif,image/webp,image/*,*/*;q=0.8",
+}
+
+_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - exercised only without Pillow
+    Image = None
+    logger.warning("Pillow not installed, thumbnails will be cached at full size")
+
+
+def make_thumbnail(data: bytes, size: Tuple[int, int] = THUMBNAIL_SIZE) -> Tuple[bytes, str]:
+    """Shrink image bytes to fit ``size``. Returns (bytes, mimetype)."""
+    img = Image.open(io.BytesIO(data))
+    img.draft("RGB", size)  # lets the JPEG decoder downscale while decoding
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    img.thumbnail(size)
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=82, optimize=True, progressive=True)
+    return out.getvalue(), "image/jpeg"
+
+
+class ThumbnailCache:
+    """Fetch-once, size-capped LRU cache of resized images on disk.
+
+    Args:
+        root: Cache directory.
+        max_bytes: Total size above which the oldest entries are evicted.
+        size: Bounding box for generated thumbnails.
+        prefetch_workers: Background threads used by ``prefetch``.
+    """
+
+    def __init__(self, root: Path = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES,
+                 size: Tuple[int, int] = THUMBNAIL_SIZE, prefetch_workers: int = 2):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.size = size
+        self.prefetch_workers = prefetch_workers
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._state_lock = threading.Lock()  # guards _failed, _total and _executor
+        self._failed: Dict[str, float] = {}
+        self._total: Optional[int] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def _dir(self, key: str) -> Path:
+        return self.root / key[:2]
+
+    def _find(self, key: str) -> Optional[Path]:
+        folder = self._dir(key)
+        for ext in _EXTENSIONS.values():
+            path = folder / (key + ext)
+            if path.exists():
+                return path
+        return None
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        return self._locks[int(key[:8], 16) % len(self._locks)]
+
+    def _failed_recently(self, key: str) -> bool:
+        with self._state_lock:
+            failed_at = self._failed.get(key)
+        return failed_at is not None and time.time() - failed_at < FAILURE_TTL
+
+    def _record_failure(self, key: str):
+        """Remember a failed URL, forgetting expired (then the oldest) ones past the cap."""
+        now = time.time()
+        with self._state_lock:
+            self._failed.pop(key, None)
+            self._failed[key] = now
+            if len(self._failed) > MAX_FAILURES:
+                self._failed = {k: t for k, t in self._failed.items()
+                                if now - t < FAILURE_TTL}
+                for stale in list(self._failed)[:len(self._failed) - MAX_FAILURES]:
+                    del self._failed[stale]
+
+    def get(self, url: str) -> Optional[Path]:
+        """Return the cached file for ``url`` without fetching, marking it used."""
+        path = self._find(self.key(url))
+        if path is not None:
+            try:
+                os.utime(path)
+            except OSError:
+                return None
+        return path
+
+    def fetch(self, url: str) -> Optional[Path]:
+        """Return the cached thumbnail for ``url``, downloading it on first use."""
+        key = self.key(url)
+        path = self.get(url)
+        if path is not None:
+            return path
+
+        if self._failed_recently(key):
+            return None
+
+        # Concurrent requests for the same image wait for a single download.
+        with self._lock_for(key):
+            path = self.get(url)
+            if path is not None:
+                return path
+            try:
+                path = self._download(url, key)
+            except Exception as e:
+                logger.debug(f"Thumbnail fetch failed for {url}: {e}")
+                self._record_failure(key)
+                return None
+        with self._state_lock:
+            self._failed.pop(key, None)
+        return path
+
+    def _download(self, url: str, key: str) -> Path:
+        headers = dict(_FETCH_HEADERS)
+        # Forums that block hot-linking still accept their own origin.
+        headers["Referer"] = "/".join(url.split("/")[:3]) + "/"
+
+        with requests.get(url, headers=headers, timeout=15, stream=True) as resp:
+            resp.raise_for_status()
+            chunks = []
+            received = 0
+            for chunk in resp.iter_content(64 * 1024):
+                received += len(chunk)
+                if received > MAX_SOURCE_BYTES:
+                    raise ValueError(f"image larger than {MAX_SOURCE_BYTES} bytes")
+                chunks.append(chunk)
+            data = b"".join(chunks)
+            mimetype = resp.headers.get("Content-Type", "").split(";")[0].strip()
+
+        if Image is not None:
+            data, mimetype = make_thumbnail(data, self.size)
+        elif mimetype not in _EXTENSIONS:
+            raise ValueError(f"unsupported image type {mimetype!r}")
+
+        folder = self._dir(key)
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / (key + _EXTENSIONS[mimetype])
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+        self._account(len(data))
+        return path
+
+    def _account(self, added: int):
+        """Track the cache size and evict once it passes the limit."""
+        with self._state_lock:
+            if self._total is None:
+                self._total = self._scan_size()
+            else:
+                self._total += added
+            full = self._total > self.max_bytes
+        if full:
+            self.evict()
+
+    def _files(self) -> Iterator[Path]:
+        """Cached files, skipping ``.tmp`` files that another fetch is still writing."""
+        for path in self.root.rglob("*"):
+            if path.suffix != ".tmp" and path.is_file():
+                yield path
+
+    def _scan_size(self) -> int:
+        return sum(p.stat().st_size for p in self._files())
+
+    def evict(self):
+        """Delete least recently used files until under 90% of the limit."""
+        with self._state_lock:
+            removed, total = self._evict()
+        if removed:
+            logger.info(f"Evicted {removed} thumbnails (cache now {total} bytes)")
+
+    def _evict(self) -> Tuple[int, int]:
+        entries = []
+        for path in self._files():
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._total = total
+        return removed, total
+
+    def prefetch(self, urls: Iterable[str]):
+        """Warm the cache in the background for freshly found items."""
+        with self._state_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.prefetch_workers, thread_name_prefix="thumb-prefetch"
+                )
+            executor = self._executor
+        for url in urls:
+            if url:
+                executor.submit(self.fetch, url)
+
+    def close(self):
+        """Stop the prefetch threads; queued prefetches are dropped (a later one restarts them)."""
+        with self._state_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -1,14 +1,22 @@
 """Flask web application for browsing found parts."""
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, abort, g, render_template, request, jsonify, send_file
 from urllib.parse import quote, unquote
 from src.db import (
-    init_db, get_items, get_recent_items, search_items, 
+    faceted_search, get_item, get_items, get_recent_items, search_items, 
     archive_item, get_stats, get_items_by_category, get_categories, 
-    get_category_stats
+    get_category_stats, get_runs
 )
+from src.assets import AssetManifest, IMMUTABLE_CACHE_CONTROL
+from src.events import NewItemFeed
+from src.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_REQUEST_SECONDS, REGISTRY
+from src.thumbnails import ThumbnailCache
+from datetime import datetime, timedelta, timezone
+import json
 import logging
 import os
+import queue
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -16,30 +24,47 @@ app = Flask(__name__)
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 
 # Header images (can be configured via environment or set here)
-HEADER_IMAGE_URL = os.getenv('HEADER_IMAGE_URL', '/static/header-bg.jpg')  # Local M3 image
+HEADER_IMAGE_URL = os.getenv('HEADER_IMAGE_URL', None)  # Defaults to the local M3 image
 HEADER_LOGO_URL = os.getenv('HEADER_LOGO_URL', None)   # Set to a URL or path
 
+# Content-hashed static assets, served with year-long immutable caching
+assets = AssetManifest(auto_reload=app.config['TEMPLATES_AUTO_RELOAD'])
+app.jinja_env.globals['asset_url'] = assets.url_for
+app.extensions['assets'] = assets
+
+# Local thumbnails instead of hot-linking forum/eBay images
+thumbnails = ThumbnailCache()
+
+# Shared live feed: one DB poll per tick regardless of how many clients listen
+SSE_POLL_INTERVAL = float(os.getenv('SSE_POLL_INTERVAL', '2'))
+SSE_KEEPALIVE = 15  # seconds between comment pings on idle streams
+feed = NewItemFeed(poll_interval=SSE_POLL_INTERVAL)
+
 
 def get_template_context(**kwargs):
     """Add header images to all template contexts."""
     context = {
-        'header_image_url': HEADER_IMAGE_URL,
+        'header_image_url': HEADER_IMAGE_URL or assets.url_for('header-bg.jpg'),
         'header_logo_url': HEADER_LOGO_URL,
     }
     context.update(kwargs)
     return context
 
-app = Flask(__name__)
-app.config['TEMPLATES_AUTO_RELOAD'] = True
-
 
 @app.before_request
-def before_first_request():
-    """Initialize database."""
-    try:
-        init_db()
-    except:
-        pass
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_latency(response):
+    """Observe request latency, labelled by route pattern (not raw path)."""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.labels(route, request.method, response.status_code).observe(
+            time.perf_counter() - started)
+    return response
 
 
 @app.route('/')
@@ -116,6 +141,114 @@ def api_items():
     })
 
 
+@app.route('/assets/<path:name>')
+def asset(name):
+    """Serve a fingerprinted static asset, gzipped when the client accepts it."""
+    found = assets.lookup(name)
+    if found is None:
+        abort(404)
+
+    if found.body is None:
+        resp = send_file(found.path, mimetype=found.mimetype, etag=found.digest,
+                         conditional=True, max_age=31536000)
+    elif found.gzipped is not None and request.accept_encodings['gzip']:
+        resp = Response(found.gzipped, mimetype=found.mimetype)
+        resp.headers['Content-Encoding'] = 'gzip'
+    else:
+        resp = Response(found.body, mimetype=found.mimetype)
+
+    resp.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    if found.gzipped is not None:
+        resp.headers['Vary'] = 'Accept-Encoding'
+    resp.set_etag(found.digest)
+    return resp.make_conditional(request)
+
+
+@app.route('/img/<int:item_id>')
+def item_image(item_id):
+    """Serve an item's image as a locally cached thumbnail."""
+    item = get_item(item_id)
+    if not item or not item.get('image'):
+        abort(404)
+
+    path = thumbnails.fetch(item['image'])
+    if path is None:
+        abort(404)
+
+    # An item's image URL never changes, so the thumbnail can be cached forever.
+    resp = send_file(path, conditional=True, etag=path.stem[:16], max_age=31536000)
+    resp.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return resp
+
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events stream of newly inserted items.
+
+    Each event's id is the item id, so a reconnecting browser resumes from
+    its ``Last-Event-ID`` header (or ``?last_id=`` for non-browser clients).
+    """
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        last_id = None
+
+    sub = feed.subscribe(last_event_id=last_id)
+
+    def generate():
+        try:
+            yield f"retry: {int(SSE_POLL_INTERVAL * 1000) + 1000}\n\n"
+            while True:
+                try:
+                    item = sub.queue.get(timeout=SSE_KEEPALIVE)
+                except queue.Empty:
+                    if sub.dropped:
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    break
+                yield f"id: {item['id']}\nevent: item\ndata: {json.dumps(item, default=str)}\n\n"
+        finally:
+            feed.unsubscribe(sub)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+@app.route('/api/search')
+def api_search():
+    """Faceted JSON search.
+
+    Query args (all optional, combinable): ``q``, ``source`` and ``category``
+    (repeatable), ``min_price``/``max_price``, ``since``/``until``
+    (YYYY-MM-DD) or ``days``, plus ``page``/``limit``.
+    """
+    page = max(request.args.get('page', 1, type=int), 1)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    since = request.args.get('since') or None
+    days = request.args.get('days', type=int)
+    if days is not None and not since:
+        since = (datetime.now(timezone.utc).date() - timedelta(days=days)).isoformat()
+
+    result = faceted_search(
+        query=request.args.get('q', '', type=str).strip(),
+        sources=request.args.getlist('source'),
+        categories=request.args.getlist('category'),
+        min_price=request.args.get('min_price', type=float),
+        max_price=request.args.get('max_price', type=float),
+        since=since,
+        until=request.args.get('until') or None,
+        limit=limit,
+        offset=(page - 1) * limit,
+    )
+    result.update({'page': page, 'limit': limit})
+    return jsonify(result)
+
+
 @app.route('/api/archive/<int:item_id>', methods=['POST'])
 def api_archive(item_id):
     """Archive an item via API."""
@@ -131,7 +264,14 @@ def api_archive(item_id):
 def stats():
     """Display statistics."""
     data = get_stats()
-    return render_template('stats.html', **get_template_context(stats=data))
+    runs = get_runs(limit=20)
+    return render_template('stats.html', **get_template_context(stats=data, runs=runs))
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of this process's metrics."""
+    return Response(REGISTRY.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
 
 
 @app.errorhandler(404)
@@ -0,0 +1,25 @@
+"""Shared fixtures."""
+
+import pytest
+
+from src import db
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point the database module at a fresh SQLite file."""
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "parts.db")
+    db.init_db()
+    return db.DB_PATH
+
+
+def make_item(n: int, **overrides) -> dict:
+    item = {
+        "source": "ebay",
+        "title": f"Test Part {n}",
+        "price": "$100",
+        "url": f"https://example.com/{n}",
+        "keyword": "test",
+    }
+    item.update(overrides)
+    return item
@@ -58,3 +58,166 @@ class TestEbayScraper:
         if results:
             assert all("source" in r for r in results)
             assert all("url" in r for r in results)
+
+
+class TestEbayDelta:
+    """Test watermark-bounded, paginated eBay searches (replayed)."""
+
+    @staticmethod
+    def _day(d):
+        return f"2026-10-{d:02d}T00:00:00.000Z"
+
+    @classmethod
+    def _entries(cls, days, delta=False, limit=20):
+        """Replay a newest-first listing of ``days`` (listings created on those days).
+
+        A plain search gets one page of ``limit``; a delta search gets every
+        ``offset`` page of ``ebay.DELTA_PAGE_SIZE``.
+        """
+        import json
+        from urllib.parse import urlencode
+        from src import fetch
+        from src.sources import ebay
+
+        search = f"{ebay.EBAY_BASE_URL}/buy/browse/v1/item_summary/search"
+        params = {"q": "wheels E9X M3", "sort": "newlyListed",
+                  "filter": "buyingOptions:{AUCTION|FIXED_PRICE}"}
+        if delta:
+            size = ebay.DELTA_PAGE_SIZE
+            pages = [(dict(params, limit=size, offset=o), days[o:o + size])
+                     for o in range(0, len(days) + 1, size)]
+        else:
+            pages = [(dict(params, limit=limit), days[:limit])]
+        entries = [{"method": "POST", "url": f"{ebay.EBAY_BASE_URL}/identity/oauth2/token",
+                    "headers": {"Content-Type": "application/json"},
+                    "body": b'{"access_token": "t"}'}]
+        for query, page in pages:
+            query = {key: query[key] for key in ("q", "limit", "sort", "filter", "offset")
+                     if key in query}
+            body = {"itemSummaries": [{"itemId": f"v1|{d}|0", "title": f"Wheels {d}",
+                                       "price": {"value": "100.00", "currency": "USD"},
+                                       "itemCreationDate": cls._day(d)} for d in page]}
+            entries.append({"method": "GET",
+                            "url": fetch._full_url("GET", f"{search}?{urlencode(query)}", None),
+                            "headers": {"Content-Type": "application/json"},
+                            "body": json.dumps(body).encode()})
+        return entries
+
+    def _search(self, days, marks, delta=True):
+        from src import fetch
+
+        with fetch.replaying(entries=self._entries(days, delta)) as replay:
+            items = search_ebay("wheels", watermarks=marks)
+        assert replay.misses == []
+        return sorted(int(item["listed_at"][8:10]) for item in items)
+
+    def test_first_search_sets_watermark(self):
+        marks = {}
+        assert self._search([2, 1], marks, delta=False) == [1, 2]
+        assert marks == {"wheels": self._day(2)}
+
+    def test_delta_is_drained_across_pages(self, monkeypatch):
+        from src.sources import ebay
+
+        monkeypatch.setattr(ebay, "DELTA_PAGE_SIZE", 2)
+        marks = {"wheels": self._day(2)}
+        # Inclusive: the listing sharing the watermark's timestamp is repeated.
+        assert self._search([5, 4, 3, 2, 1], marks) == [2, 3, 4, 5]
+        assert marks == {"wheels": self._day(5)}
+
+    def test_partial_delta_keeps_watermark(self, monkeypatch):
+        from src import fetch
+        from src.sources import ebay
+
+        monkeypatch.setattr(ebay, "DELTA_PAGE_SIZE", 1)
+        marks = {"wheels": self._day(2)}
+        entries = self._entries([5, 4, 3, 2], delta=True)
+        del entries[2]  # the second page fails
+        with fetch.replaying(entries=entries):
+            items = search_ebay("wheels", watermarks=marks)
+        assert len(items) == 1 and marks == {"wheels": self._day(2)}
+
+    def test_capped_delta_resumes_in_later_cycles(self, monkeypatch):
+        from src.sources import ebay
+
+        monkeypatch.setattr(ebay, "DELTA_PAGE_SIZE", 2)
+        monkeypatch.setattr(ebay, "MAX_DELTA_PAGES", 2)
+        marks = {"wheels": self._day(1)}
+        assert self._search([9, 8, 7, 6, 5, 4, 3, 2, 1], marks) == [6, 7, 8, 9]
+        # The watermark moves on; 5..1 are left for the next cycles.
+        assert marks == {"wheels": self._day(9), "wheels#resume": f"2 {self._day(1)}"}
+
+        # Two new listings push the old ones down. The new ones come first,
+        # then the rest of the budget goes to the backlog, re-reading one page.
+        monkeypatch.setattr(ebay, "MAX_DELTA_PAGES", 4)
+        listing = [11, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1]
+        assert self._search(listing, marks) == [4, 5, 6, 7, 9, 10, 11]
+        assert marks == {"wheels": self._day(11), "wheels#resume": f"6 {self._day(1)}"}
+
+        assert self._search(listing, marks) == [1, 2, 3, 4, 5, 11]
+        assert marks == {"wheels": self._day(11), "wheels#resume": ""}
+
+    def test_watermarks_round_trip(self, temp_db):
+        from src import db
+
+        assert db.get_watermarks("ebay") == {}
+        db.set_watermarks("ebay", {"wheels": "a", "seats": "b"})
+        db.set_watermarks("ebay", {"wheels": "c"})
+        assert db.get_watermarks("ebay") == {"wheels": "c", "seats": "b"}
+        assert db.get_watermarks("other") == {}
+
+
+class TestCycleInstrumentation:
+    """Test that a cycle records stage timings and HTTP counters in ``runs``."""
+
+    def test_run_recorded_and_shown(self, temp_db, tmp_path):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        from src import db, fetch, instrument
+        from src.agent import Agent
+        from tests.conftest import make_item
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = b"x" * 2048
+                self.send_response(404 if self.path == "/missing" else 200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+
+        def fake_sources():
+            with instrument.span("ebay: wheels"):
+                fetch.get(base + "/search")
+                fetch.get(base + "/missing")
+            return [make_item(1, keyword="wheels"), make_item(2, keyword="wheels")]
+
+        config = tmp_path / "config.yaml"
+        config.write_text("parts: []\nprefetch_thumbnails: false\n"
+                          "notifications:\n  stdout_enabled: false\n")
+        agent = Agent(config_path=str(config))
+        agent.search_all_sources = fake_sources
+        try:
+            agent.run_once()
+        finally:
+            agent.close(timeout=1)
+            server.shutdown()
+
+        run = db.get_runs()[0]
+        assert (run["results"], run["saved"]) == (2, 2)
+        assert run["http_requests"] == 2 and run["http_errors"] == 1
+        assert run["http_bytes"] == 4096
+        assert set(run["stages"]) >= {"ebay: wheels", "dedupe", "db_insert"}
+        assert run["yields"] == {"ebay / wheels": 2}
+        assert instrument.current_run() is None
+
+        from src.web import app
+        html = app.test_client().get("/stats").get_data(as_text=True)
+        assert "ebay: wheels" in html and "127.0.0.1:" in html
@@ -0,0 +1,43 @@
+"""Tests for the offline benchmark suite and its fixtures."""
+
+from src import bench, fetch
+from src.sources.ebay import search_ebay
+from src.sources.forum import (FORUMS, _fetch_m3post_listing_page, extract_thread_details,
+                               search_generic_forum)
+
+
+class TestFixtures:
+    """The checked-in fixtures parse the way live pages do."""
+
+    def test_sources_parse_fixtures(self):
+        with fetch.replaying(entries=bench.fixture_replay_entries()) as replayer:
+            threads = _fetch_m3post_listing_page(1, {})
+            details = extract_thread_details(bench.M3POST_THREAD_URL)
+            ebay = search_ebay(bench.BENCH_KEYWORD)
+            forum = search_generic_forum(FORUMS[0], bench.BENCH_KEYWORD)
+        assert replayer.misses == []
+        assert len(threads) == 45
+        assert all(t["url"].startswith("https://www.m3post.com/forums/showthread.php?t=")
+                   for t in threads)
+        assert details["price"] == "$1,500"
+        assert "attachment.php?attachmentid=880000" in details["image"]
+        assert len(ebay) == 50 and ebay[0]["price"].endswith(" USD")
+        assert len(forum) == 10
+
+
+class TestRunner:
+    """Test result shape and baseline comparison."""
+
+    def test_run_and_compare(self, temp_db):
+        results = bench.run(only="text.", min_time=0.001, repeat=2, log=lambda _: None)
+        assert set(results["benchmarks"]) == {"text.extract_price", "text.extract_prices_batch",
+                                              "text.categorize_item"}
+        assert results["accuracy"]["extract_price"]["accuracy"] == 1.0
+        assert results["meta"]["python"]
+        assert temp_db == bench.db.DB_PATH  # restored afterwards
+
+        slower = {"benchmarks": {name: dict(r, per_call_ms=r["per_call_ms"] / 2)
+                                 for name, r in results["benchmarks"].items()}}
+        rows = bench.compare(results, slower, threshold=0.2)
+        assert rows and all(row["regressed"] for row in rows)
+        assert not any(row["regressed"] for row in bench.compare(results, results))
@@ -0,0 +1,80 @@
+"""Tests for keyword categorisation."""
+
+import random
+
+from src import db
+from src.categorize import CATEGORIES, OTHER, Categorizer, categorize, categorize_many
+from tests.conftest import make_item
+
+
+class TestCategorize:
+    """Test word matching, priority and the batch API."""
+
+    def test_whole_words_only(self):
+        assert categorize("OEM interior trim piece") == "Exterior"  # "trim", not "rim"
+        assert categorize("19in rims") == "Wheels"
+        assert categorize("hose clip set") == OTHER  # no "lip"
+        assert categorize("Rogue Engineering subframe mounts") == OTHER  # no "engine"
+        assert categorize("automatic gearbox") == OTHER  # no "mat"
+
+    def test_plurals_and_separators(self):
+        assert categorize("KW coilovers") == "Suspension"
+        assert categorize("brake pads and discs") == "Suspension"
+        assert categorize("Carbon-Fiber trunk") == "Exterior"
+        assert categorize("carbon  fiber roof") == "Exterior"
+        assert categorize("floor mats") == "Interior"
+
+    def test_longest_keyword_then_priority(self):
+        assert categorize("alcantara steering wheel") == "Interior"
+        assert categorize("lightweight flywheel") == "Engine"
+        assert categorize("steering wheel and wheels") == "Wheels"
+        assert categorize("Akrapovic exhaust with carbon tips", "bumper") == "Exterior"
+        assert categorize("used seats", "wheels") == "Wheels"
+
+    def test_matches_reference(self):
+        """Agrees with a brute-force whole-word scan over random titles."""
+        vocab = [w for words in CATEGORIES.values() for w in words if " " not in w]
+        vocab += ["bmw", "m3", "oem", "fs", "trimmed", "clip", "rims", "e92", "price"]
+        rng = random.Random(3)
+
+        def reference(text):
+            words = text.split()
+            for category, keywords in CATEGORIES.items():
+                if any(w in (k, k + "s", k + "es") for w in words for k in keywords):
+                    return category
+            return OTHER
+
+        titles = [" ".join(rng.choice(vocab) for _ in range(rng.randint(0, 6)))
+                  for _ in range(2000)]
+        assert categorize_many((t, "") for t in titles) == [reference(t) for t in titles]
+
+    def test_custom_table(self):
+        c = Categorizer({"A": ["x y", "z"], "B": ["y"]}, default="none")
+        assert c.categorize("x y") == "A"
+        assert c.categorize("y x") == "B"
+        assert c.categorize("q") == "none"
+        assert c.categorize_many([("zs", None), (None, "y")]) == ["A", "B"]
+
+
+class TestRecategorize:
+    """Test relabelling stored items."""
+
+    def test_recategorize_items(self, temp_db):
+        db.add_items([
+            make_item(1, title="Lightweight flywheel", category="Wheels"),
+            make_item(2, title="KW coilovers", category="Suspension"),
+            make_item(3, title="Some part", source="forum:m3post", keyword="Wheels",
+                      category="Other"),
+        ])
+        pinned = {("forum:m3post", "Wheels"): "Wheels"}
+
+        assert db.recategorize_items(pinned=pinned, dry_run=True) == {
+            ("Wheels", "Engine"): 1, ("Other", "Wheels"): 1}
+        assert db.get_items_by_category("Engine") == []
+
+        assert db.recategorize_items(pinned=pinned, batch=1) == {
+            ("Wheels", "Engine"): 1, ("Other", "Wheels"): 1}
+        assert [i["title"] for i in db.get_items_by_category("Engine")] == ["Lightweight flywheel"]
+        assert db.faceted_search(limit=1)["facets"]["category"] == {
+            "Engine": 1, "Suspension": 1, "Wheels": 1}
+        assert db.recategorize_items(pinned=pinned) == {}
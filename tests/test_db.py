@@ -0,0 +1,102 @@
+"""Tests for database persistence and queries."""
+
+import sqlite3
+
+from src import db
+from tests.conftest import make_item
+
+
+class TestFacetedSearch:
+    """Test combined filters and facet counts."""
+
+    def _seed(self):
+        db.add_items([
+            make_item(1, source="ebay", title="Apex wheels", price="$900", category="Wheels"),
+            make_item(2, source="ebay", title="KW coilovers", price="1450.00 USD", category="Suspension"),
+            make_item(3, source="forum:m3post", title="BBS wheels", price="$2,400", category="Wheels"),
+            make_item(4, source="forum:m3post", title="Seats", price="Contact", category="Interior"),
+        ])
+
+    def test_parse_price_value(self):
+        assert db.parse_price_value("$1,500") == 1500
+        assert db.parse_price_value("1299.99 USD") == 1299.99
+        assert db.parse_price_value("Contact") is None
+
+    def test_combined_filters(self, temp_db):
+        self._seed()
+        result = db.faceted_search(query="wheels", sources=["ebay"], min_price=500, max_price=1000)
+        assert [i["url"] for i in result["items"]] == ["https://example.com/1"]
+        assert result["total"] == 1
+
+    def test_counter_and_scan_paths_agree(self, temp_db):
+        self._seed()
+        db.archive_item(db.get_items_after(0)[0]["id"])
+
+        from_counters = db.faceted_search(min_price=1000, max_price=2500)
+        # 2400.0 is not a bucket edge, forcing the GROUP BY scan path
+        from_scan = db.faceted_search(min_price=1000, max_price=2499.99)
+        assert from_counters["facets"] == from_scan["facets"]
+        assert from_counters["facets"]["source"] == {"ebay": 1, "forum:m3post": 1}
+        assert from_counters["facets"]["price"] == {"1000-2500": 2}
+
+        everything = db.faceted_search()
+        assert everything["total"] == 3
+        assert everything["facets"]["price"]["none"] == 1
+        assert everything["facets"]["age"] == {"1d": 3}
+
+    def test_age_facet_mixes_counters_and_partial_slices(self, temp_db):
+        db.add_items([
+            make_item(1, price="$75"),    # partial slice [50, 100), old
+            make_item(2, price="$150"),   # whole bucket [100, 250), old
+            make_item(3, price="$200"),   # whole bucket, recent
+        ])
+        conn = sqlite3.connect(db.DB_PATH)
+        conn.execute("UPDATE items SET found_date = datetime('now', '-60 days') "
+                      "WHERE url IN ('https://example.com/1', 'https://example.com/2')")
+        conn.commit()
+        conn.close()
+
+        result = db.faceted_search(min_price=50, max_price=250)
+        assert result["total"] == 3
+        assert result["facets"]["age"] == {"1d": 1, "older": 2}
+        assert sum(result["facets"]["age"].values()) == result["total"]
+
+    def test_counters_backfilled_on_migration(self, tmp_path, monkeypatch):
+        path = tmp_path / "old.db"
+        conn = sqlite3.connect(path)
+        conn.execute("""
+            CREATE TABLE items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, source TEXT NOT NULL,
+                title TEXT NOT NULL, price TEXT, url TEXT UNIQUE NOT NULL,
+                image TEXT, keyword TEXT, category TEXT DEFAULT 'Other',
+                found_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP, archived BOOLEAN DEFAULT 0
+            )
+        """)
+        conn.execute("INSERT INTO items (source, title, price, url) VALUES ('ebay', 't', '$300', 'u')")
+        conn.commit()
+        conn.close()
+
+        monkeypatch.setattr(db, "DB_PATH", path)
+        db.init_db()
+        assert db.faceted_search()["facets"]["price"] == {"250-500": 1}
+        assert db.get_items_after(0)[0]["price_value"] == 300
+
+
+class TestConnections:
+    """Test that concurrent readers and writers wait instead of failing."""
+
+    def test_writer_does_not_block_readers_or_fail_writers(self, temp_db):
+        import threading
+
+        db.add_items([make_item(1)])
+        holder = db.connect(check_same_thread=False)
+        assert holder.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        holder.execute("BEGIN IMMEDIATE")
+        holder.execute("UPDATE items SET archived = 1")
+
+        # WAL: a read during another thread's write sees the last commit.
+        assert db.get_stats()["total_items"] == 1
+        # busy_timeout: a second writer waits for the lock to be released.
+        threading.Timer(0.3, holder.commit).start()
+        assert db.add_items([make_item(2)]) == 1
+        holder.close()
@@ -0,0 +1,88 @@
+"""Tests for HTTP record/replay."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src import fetch
+from src.sources.forum import search_generic_forum
+
+SEARCH_PAGE = b"""<html><body><table>
+<tr class="alt1"><td><a href="showthread.php?t=1">BBS CH-R wheels $1,200</a></td></tr>
+<tr class="alt2"><td><a href="showthread.php?t=2">KW V3 coilovers asking 1500</a></td></tr>
+</table></body></html>"""
+
+
+@pytest.fixture
+def site():
+    """Local forum search page plus an OAuth-like token endpoint."""
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Set-Cookie", "session=secret")
+            self.end_headers()
+            self.wfile.write(SEARCH_PAGE)
+
+        def do_POST(self):
+            hits.append(self.path)
+            body = json.dumps({"access_token": "live-token", "expires_in": 7200}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", hits, server
+    server.shutdown()
+
+
+class TestRecordReplay:
+    """Test that recorded cycles replay identically without the network."""
+
+    def test_replay_matches_live(self, site, tmp_path):
+        base, hits, server = site
+        forum = {"name": "local", "base_url": base, "search_endpoint": "/search"}
+        archive = tmp_path / "cycle.jsonl.gz"
+
+        with fetch.recording(str(archive)) as recorder:
+            live = search_generic_forum(forum, "wheels")
+            fetch.post(base + "/token", headers={"Authorization": "Basic abc"}, data={})
+        assert recorder.count == 2
+        assert len(live) == 2
+        server.shutdown()
+        hits.clear()
+
+        with fetch.replaying(str(archive)) as replayer:
+            assert len(replayer) == 2
+            assert search_generic_forum(forum, "wheels") == live
+            token = fetch.post(base + "/token").json()
+            with pytest.raises(requests.ConnectionError):
+                fetch.get(base + "/search", params={"q": "seats"})
+        assert hits == []
+        assert token["access_token"] == "REDACTED"
+
+        import gzip
+        raw = gzip.open(archive, "rt").read()
+        assert "live-token" not in raw and "secret" not in raw and "Basic abc" not in raw
+
+    def test_polite_sleep_skipped_in_replay(self, tmp_path, monkeypatch):
+        archive = tmp_path / "empty.jsonl.gz"
+        with fetch.recording(str(archive)):
+            pass
+        slept = []
+        monkeypatch.setattr(fetch.time, "sleep", slept.append)
+        with fetch.replaying(str(archive)):
+            fetch.polite_sleep(0.5)
+        fetch.polite_sleep(0.3)
+        assert slept == [0.3]
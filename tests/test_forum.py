@@ -0,0 +1,58 @@
+"""Tests for forum thread page parsing."""
+
+import pytest
+
+from src import bench
+from src.sources import forum
+
+URL = "https://www.m3post.com/forums/showthread.php?t=1"
+
+PAGES = {
+    "attachment": """<html><body><img src="/images/logo.gif">
+        <div id="post_message_1">Selling my wheels, asking $1,200 shipped
+        <img src="/images/smilies/smile.gif"></div>
+        <fieldset><img src="attachment.php?attachmentid=5&thumb=1" width="120"></fieldset>
+        </body></html>""",
+    "lazy_attachment": """<div id="post_message_1">$900</div>
+        <img data-src="//cdn.m3post.com/attachment.php?attachmentid=7">""",
+    "post_image": """<div class="postcontent restore">Recaro seats 1500 obo
+        <img src="https://i.imgur.com/tiny.jpg" width="16px">
+        <img src="https://i.imgur.com/seats.jpg"></div>""",
+    "linked_thumbnail": """<div id="post_message_1">No price here
+        <a href="attachment.php?attachmentid=9"><img src="/forums/icons/thumb.png"></a></div>""",
+    "no_first_post": """<html><body><p>Exhaust for sale $700</p>
+        <img src="/images/buttons/reply.gif"><img src="pics/exhaust.jpg"></body></html>""",
+    "nothing": "<html><body><p>Thread not found</p></body></html>",
+}
+
+
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_fast_path_matches_soup_path(name):
+    assert (forum._parse_thread_details_fast(PAGES[name], URL)
+            == forum._parse_thread_details_soup(PAGES[name], URL))
+
+
+def test_recorded_thread_page():
+    html = bench.load_fixture("m3post_thread.html").decode()
+    details = forum._parse_thread_details_fast(html, bench.M3POST_THREAD_URL)
+    assert details == forum._parse_thread_details_soup(html, bench.M3POST_THREAD_URL)
+    assert details["price"] == "$1,500"
+
+
+def test_results():
+    assert forum.parse_thread_details(PAGES["attachment"], URL) == {
+        "price": "$1,200", "image": "https://www.m3post.com/attachment.php?attachmentid=5&thumb=1"}
+    assert forum.parse_thread_details(PAGES["lazy_attachment"], URL)["image"] == \
+        "https://cdn.m3post.com/attachment.php?attachmentid=7"
+    assert forum.parse_thread_details(PAGES["post_image"], URL)["image"] == \
+        "https://i.imgur.com/seats.jpg"
+    assert forum.parse_thread_details(PAGES["linked_thumbnail"], URL)["image"] == \
+        "https://www.m3post.com/attachment.php?attachmentid=9"
+    assert forum.parse_thread_details(PAGES["nothing"], URL) == {"price": None, "image": None}
+
+
+def test_falls_back_to_soup():
+    # lxml refuses str input that carries an XML encoding declaration
+    html = '<?xml version="1.0" encoding="utf-8"?>' + PAGES["attachment"]
+    assert forum.parse_thread_details(html, URL)["price"] == "$1,200"
+    assert forum.parse_thread_details("", URL) == {"price": None, "image": None}
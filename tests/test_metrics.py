@@ -0,0 +1,89 @@
+"""Tests for the metrics registry and its endpoints."""
+
+import time
+
+import pytest
+import requests
+
+from src import db
+from src.metrics import SQL_SECONDS, Registry, _Metric, serve_metrics
+from tests.conftest import make_item
+
+
+class TestRegistry:
+    """Test exposition format and recording."""
+
+    def test_render_format(self):
+        registry = Registry()
+        hits = registry.counter("hits_total", "Hits.", ["route"])
+        hits.labels('/a"b').inc()
+        hits.labels('/a"b').inc(2)
+        depth = registry.gauge("depth", "Queue depth.")
+        depth.set(3)
+        latency = registry.histogram("latency_seconds", "Latency.", ["host"], buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            latency.labels("x").observe(value)
+
+        text = registry.render()
+        assert '# TYPE hits_total counter' in text
+        assert 'hits_total{route="/a\\"b"} 3' in text
+        assert 'depth 3' in text
+        assert 'latency_seconds_bucket{host="x",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{host="x",le="1"} 2' in text
+        assert 'latency_seconds_bucket{host="x",le="+Inf"} 3' in text
+        assert 'latency_seconds_count{host="x"} 3' in text
+        assert 'latency_seconds_sum{host="x"} 5.55' in text
+
+    def test_gauge_callback(self):
+        registry = Registry()
+        registry.gauge("pending", "Pending rows.", ["notifier"], fn=lambda: {("sms",): 4})
+        assert 'pending{notifier="sms"} 4' in registry.render()
+
+    def test_metric_kind_missing_a_method_cannot_be_built(self):
+        class Partial(_Metric):
+            def _new_series(self):
+                return None
+
+        with pytest.raises(TypeError):
+            Partial("partial", "Partial.")
+
+    def test_single_insert_is_timed_once(self, temp_db):
+        series = SQL_SECONDS.labels("add_items")
+        before = sum(series.counts)
+        db.add_item(make_item(1))
+        assert sum(series.counts) - before == 1
+        assert ("add_item",) not in SQL_SECONDS._series
+
+    def test_recording_is_cheap(self):
+        series = Registry().histogram("h", "H.", ["k"]).labels("v")
+        start = time.perf_counter()
+        for _ in range(100000):
+            series.observe(0.01)
+        assert time.perf_counter() - start < 1.0
+
+
+class TestEndpoints:
+    """Test /metrics on the web app and the daemon listener."""
+
+    def test_web_metrics(self, temp_db):
+        from src.web import app
+
+        db.add_items([make_item(1)])
+        client = app.test_client()
+        assert client.get("/api/items").status_code == 200
+        text = client.get("/metrics").get_data(as_text=True)
+        assert 'route="/api/items",method="GET",status="200"' in text
+        assert 'partsfinder_sql_duration_seconds_count{function="add_items"}' in text
+
+    def test_daemon_listener(self):
+        registry = Registry()
+        registry.counter("items_total", "Items.", ["source"]).labels("ebay").inc(5)
+        server = serve_metrics(port=0, registry=registry)
+        try:
+            base = f"http://127.0.0.1:{server.server_port}"
+            resp = requests.get(base + "/metrics", timeout=5)
+            assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert 'items_total{source="ebay"} 5' in resp.text
+            assert requests.get(base + "/other", timeout=5).status_code == 404
+        finally:
+            server.shutdown()
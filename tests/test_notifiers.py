@@ -0,0 +1,192 @@
+"""Tests for notifiers: SMS digests against a local Twilio stand-in, and dispatch."""
+
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from src import db
+from src.notifiers.dispatch import (DeliveryDeferred, NotifierDispatcher, NotifierTimeout,
+                                   PartialDelivery)
+from src.notifiers.sms import SMSNotifier, SMS_MAX_CHARS
+from src.outbox import OutboxDispatcher
+from tests.conftest import make_item
+
+
+@pytest.fixture
+def twilio_api(monkeypatch):
+    """Minimal stand-in for Twilio's Messages endpoint."""
+    bodies = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            form = parse_qs(self.rfile.read(length).decode())
+            bodies.append(form["Body"][0])
+            payload = f'{{"sid": "SM{len(bodies):04d}", "status": "queued"}}'.encode()
+            self.send_response(201)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("TWILIO_ACCOUNT_SID", "AC00000000000000000000000000000000")
+    monkeypatch.setenv("TWILIO_AUTH_TOKEN", "token")
+    monkeypatch.setenv("TWILIO_FROM_PHONE", "+15550000000")
+    monkeypatch.setenv("ALERT_PHONE", "+15551111111")
+    monkeypatch.setenv("TWILIO_API_BASE", f"http://127.0.0.1:{server.server_port}")
+    yield bodies
+    server.shutdown()
+    server.server_close()
+
+
+def _items(n):
+    return [
+        {"source": "ebay", "title": f"BBS CH-R wheels set {i}", "price": "$1,800",
+         "url": f"https://www.ebay.com/itm/{100000 + i}"}
+        for i in range(n)
+    ]
+
+
+class TestSMSDigest:
+    """Test digest packing and the hourly send budget."""
+
+    def test_digest_coalesces_items(self, twilio_api):
+        notifier = SMSNotifier(digest=True)
+        notifier.send_items(_items(40))
+        assert 1 < len(twilio_api) < 10
+        assert all(len(body) <= SMS_MAX_CHARS for body in twilio_api)
+        assert sum(body.count("ebay.com/itm/") for body in twilio_api) == 40
+
+    def test_budget_rolls_up_overflow(self, twilio_api):
+        notifier = SMSNotifier(digest=True, hourly_budget=2, dashboard_url="http://dash/recent")
+        notifier.send_items(_items(100))
+        assert len(twilio_api) == 2
+        shown = sum(body.count("ebay.com/itm/") for body in twilio_api)
+        assert twilio_api[-1].endswith(f"+{100 - shown} more on dashboard http://dash/recent")
+        assert len(twilio_api[-1]) <= SMS_MAX_CHARS
+
+        # Budget spent: later items are deferred, not dropped into a rollup.
+        with pytest.raises(DeliveryDeferred) as deferred:
+            notifier.send_items(_items(3))
+        assert len(twilio_api) == 2
+        assert deferred.value.retry_at > time.time() + 3500
+
+    def test_failed_messages_report_what_went_out(self, twilio_api):
+        notifier = SMSNotifier(digest=False)
+        real_send = notifier._send
+        notifier._send = lambda body: "/100001" not in body and real_send(body)
+        with pytest.raises(PartialDelivery) as partial:
+            notifier.send_items(_items(3))
+        assert partial.value.delivered == [0, 2]
+        assert len(twilio_api) == 2
+
+        # Items rolled up into a message that failed were not delivered either.
+        notifier.hourly_budget = 3
+        notifier._send = lambda body: False
+        with pytest.raises(PartialDelivery) as partial:
+            notifier.send_items(_items(5))
+        assert partial.value.delivered == []
+
+
+class HangingNotifier:
+    """Blocks in send_items until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def send_items(self, items):
+        self.release.wait(10)
+
+
+class RecordingNotifier:
+    def __init__(self):
+        self.delivered = []
+
+    def send_items(self, items):
+        self.delivered.extend(items)
+
+
+class AsyncNotifier:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.delivered = []
+
+    async def send_items(self, items):
+        await asyncio.sleep(self.delay)
+        self.delivered.extend(items)
+
+
+class TestNotifierDispatcher:
+    """Test per-notifier timeouts, isolation, counters and async notifiers."""
+
+    def test_timeout_is_isolated(self, temp_db):
+        hung, fast = HangingNotifier(), RecordingNotifier()
+        outbox = OutboxDispatcher({"hung": hung, "fast": fast}, base_delay=60,
+                                  timeouts={"hung": 0.2})
+        db.add_items([make_item(1), make_item(2)], notifiers=["hung", "fast"])
+
+        started = time.monotonic()
+        outbox.drain_once()
+        deadline = time.time() + 5
+        while not outbox.idle() and time.time() < deadline:
+            time.sleep(0.01)
+        assert time.monotonic() - started < 2
+        assert len(fast.delivered) == 2
+        assert db.get_outbox_stats()["hung"] == {"pending": 2}
+
+        # The hung call still holds the notifier's only slot.
+        assert not outbox.dispatch.available("hung")
+        assert outbox.drain_once() == 0
+        stats = outbox.dispatch.snapshot()
+        assert stats["hung"]["timeouts"] == 1 and stats["hung"]["in_flight"] == 1
+        assert stats["fast"]["batches"] == 1 and stats["fast"]["items"] == 2
+
+        hung.release.set()
+        deadline = time.time() + 5
+        while not outbox.dispatch.available("hung") and time.time() < deadline:
+            time.sleep(0.01)
+        assert outbox.dispatch.available("hung")
+        outbox.stop(timeout=1)
+
+    def test_async_notifier(self):
+        slow, quick = AsyncNotifier(delay=5), AsyncNotifier()
+        dispatch = NotifierDispatcher({"slow": slow, "quick": quick},
+                                      timeouts={"slow": 0.1})
+        dispatch.send("quick", [{"title": "a"}])
+        assert quick.delivered == [{"title": "a"}]
+        with pytest.raises(NotifierTimeout):
+            dispatch.send("slow", [{"title": "b"}])
+        assert slow.delivered == []
+        # Async timeouts cancel the call, so the slot is freed right away.
+        deadline = time.time() + 2
+        while not dispatch.available("slow") and time.time() < deadline:
+            time.sleep(0.01)
+        assert dispatch.available("slow")
+        dispatch.shutdown()
+
+    def test_failures_counted(self):
+        class Broken:
+            def send_items(self, items):
+                raise RuntimeError("boom")
+
+        from src.metrics import REGISTRY
+
+        dispatch = NotifierDispatcher({"broken": Broken(), "ok": RecordingNotifier()})
+        with pytest.raises(RuntimeError):
+            dispatch.send("broken", [{}])
+        dispatch.send("ok", [{}, {}])
+        assert dispatch.snapshot()["broken"]["failures"] == 1
+        text = REGISTRY.render()
+        assert 'partsfinder_notifier_batches_total{notifier="broken",outcome="failed"}' in text
+        assert 'partsfinder_notifier_items_total{notifier="ok"}' in text
+        assert 'partsfinder_notifier_send_duration_seconds_count{notifier="ok"}' in text
+        dispatch.shutdown()
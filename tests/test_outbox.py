@@ -0,0 +1,136 @@
+"""Tests for the durable notification outbox."""
+
+import time
+
+from src import db
+from src.notifiers.dispatch import DeliveryDeferred, PartialDelivery
+from src.outbox import OutboxDispatcher
+from tests.conftest import make_item
+
+
+class FlakyNotifier:
+    """Fails the first ``failures`` calls, then records deliveries."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.delivered = []
+
+    def send_items(self, items):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("gateway timeout")
+        self.delivered.extend(item["url"] for item in items)
+
+
+def _wait_idle(dispatcher, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline and not dispatcher.idle():
+        time.sleep(0.01)
+
+
+class TestOutbox:
+    """Test outbox writes, delivery and retry."""
+
+    def test_outbox_rows_written_with_items(self, temp_db):
+        assert db.add_items([make_item(1), make_item(2)], notifiers=["sms", "stdout"]) == 2
+        # Duplicates are neither inserted nor re-notified.
+        assert db.add_items([make_item(1)], notifiers=["sms", "stdout"]) == 0
+        assert db.get_outbox_stats() == {"sms": {"pending": 2}, "stdout": {"pending": 2}}
+
+    def test_failures_isolated_and_retried(self, temp_db):
+        good, flaky = FlakyNotifier(), FlakyNotifier(failures=1)
+        dispatcher = OutboxDispatcher({"good": good, "flaky": flaky}, base_delay=0)
+        db.add_items([make_item(1), make_item(2)], notifiers=["good", "flaky"])
+
+        dispatcher.drain_once()
+        _wait_idle(dispatcher)
+        assert sorted(good.delivered) == ["https://example.com/1", "https://example.com/2"]
+        assert flaky.delivered == []
+        assert db.get_outbox_stats()["flaky"] == {"pending": 2}
+
+        dispatcher.drain_once()
+        _wait_idle(dispatcher)
+        assert len(flaky.delivered) == 2
+        assert db.get_outbox_stats() == {"good": {"delivered": 2}, "flaky": {"delivered": 2}}
+
+    def test_gives_up_after_max_attempts(self, temp_db):
+        dispatcher = OutboxDispatcher({"down": FlakyNotifier(failures=99)},
+                                      base_delay=0, max_attempts=2)
+        db.add_items([make_item(1)], notifiers=["down"])
+        for _ in range(3):
+            dispatcher.drain_once()
+            _wait_idle(dispatcher)
+        assert db.get_outbox_stats() == {"down": {"dead": 1}}
+
+    def test_partial_delivery_retries_only_the_rest(self, temp_db):
+        class HalfNotifier(FlakyNotifier):
+            def send_items(self, items):
+                self.delivered.extend(item["url"] for item in items[:1])
+                if len(items) > 1:
+                    raise PartialDelivery("1 of 2 SMS failed to send", [0])
+
+        notifier = HalfNotifier()
+        dispatcher = OutboxDispatcher({"sms": notifier}, base_delay=0)
+        db.add_items([make_item(1), make_item(2)], notifiers=["sms"])
+        for _ in range(2):
+            dispatcher.drain_once()
+            _wait_idle(dispatcher)
+        assert notifier.delivered == ["https://example.com/1", "https://example.com/2"]
+        assert db.get_outbox_stats() == {"sms": {"delivered": 2}}
+
+    def test_deferral_keeps_rows_pending_without_an_attempt(self, temp_db):
+        class Spent:
+            def send_items(self, items):
+                raise DeliveryDeferred("budget exhausted", retry_at=time.time() + 3600)
+
+        dispatcher = OutboxDispatcher({"sms": Spent()}, base_delay=0, max_attempts=1)
+        db.add_items([make_item(1)], notifiers=["sms"])
+        dispatcher.drain_once()
+        _wait_idle(dispatcher)
+        assert db.get_outbox_stats() == {"sms": {"pending": 1}}
+        assert db.claim_outbox("sms") == []  # not due for an hour
+        assert dispatcher.dispatch.snapshot()["sms"]["deferred"] == 1
+
+    def test_database_errors_are_logged(self, temp_db, monkeypatch, caplog):
+        import sqlite3
+
+        def locked(ids):
+            raise sqlite3.OperationalError("database is locked")
+
+        monkeypatch.setattr(db, "mark_outbox_delivered", locked)
+        dispatcher = OutboxDispatcher({"good": FlakyNotifier()})
+        db.add_items([make_item(1)], notifiers=["good"])
+        dispatcher.drain_once()
+        _wait_idle(dispatcher)
+        assert "Outbox update for good failed: database is locked" in caplog.text
+        assert db.get_outbox_stats() == {"good": {"sending": 1}}  # reclaimed after the lease
+
+    def test_expired_lease_is_reclaimed(self, temp_db):
+        db.add_items([make_item(1)], notifiers=["sms"])
+        assert len(db.claim_outbox("sms", lease=300)) == 1
+        assert db.claim_outbox("sms") == []  # still leased
+        # Simulate a crashed sender whose lease ran out.
+        import sqlite3
+        conn = sqlite3.connect(db.DB_PATH)
+        conn.execute("UPDATE outbox SET next_attempt_at = 0")
+        conn.commit()
+        conn.close()
+        assert len(db.claim_outbox("sms")) == 1
+
+
+class TestAgentCycle:
+    """Test that a cycle hands notifications to the outbox."""
+
+    def test_run_once_notifies_through_outbox(self, temp_db, tmp_path, capsys):
+        from src.agent import Agent
+
+        config = tmp_path / "config.yaml"
+        config.write_text("parts: []\nprefetch_thumbnails: false\n"
+                          "notifications:\n  stdout_enabled: true\n")
+        agent = Agent(config_path=str(config))
+        agent.search_all_sources = lambda: [make_item(1), make_item(2)]
+
+        agent.run_once()
+        agent.close(timeout=5)
+        assert db.get_outbox_stats() == {"stdout": {"delivered": 2}}
+        assert "https://example.com/2" in capsys.readouterr().out
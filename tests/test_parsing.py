@@ -0,0 +1,71 @@
+"""Tests for the page parsing pool."""
+
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+from src import bench, fetch
+from src.parsing import ParsePool, PendingParse, parse_page
+from src.sources import forum
+
+THREAD_HTML = bench.load_fixture("m3post_thread.html")
+
+
+def _replay_entries():
+    """The listing fixture, with every thread on it answered by the thread fixture."""
+    html = {"Content-Type": "text/html; charset=ISO-8859-1"}
+    threads = forum.parse_m3post_listing(bench.load_fixture("m3post_listing.html").decode("latin-1"),
+                                         bench.M3POST_LISTING_URL)
+    return [{"method": "GET", "url": bench.M3POST_LISTING_URL, "headers": html,
+             "body": bench.load_fixture("m3post_listing.html")}] + [
+        {"method": "GET", "url": t["url"], "headers": html, "body": THREAD_HTML} for t in threads]
+
+
+def _scrape(parser):
+    forum._m3post_listing_cache.clear()
+    with fetch.replaying(entries=_replay_entries()):
+        return forum.scrape_m3post_sections(pages=1, parser=parser)
+
+
+class TestParsePool:
+    """Test parsing in-process and in worker processes."""
+
+    def test_parse_page(self):
+        expected = forum.parse_thread_details(THREAD_HTML.decode("latin-1"), bench.M3POST_THREAD_URL)
+        assert parse_page("m3post_thread", THREAD_HTML, bench.M3POST_THREAD_URL, "ISO-8859-1") == expected
+        assert parse_page("m3post_thread", THREAD_HTML, bench.M3POST_THREAD_URL) == expected
+
+    def test_small_runs_stay_in_process(self):
+        pool = ParsePool(workers=2, min_pages=8)
+        assert not pool.use_processes(7) and pool.use_processes(8)
+        assert not ParsePool().use_processes(1000)
+        job = pool.submit("m3post_thread", THREAD_HTML, bench.M3POST_THREAD_URL, processes=False)
+        assert job.result()["price"] == "$1,500"
+        assert pool._executor is None  # no workers were started
+
+    def test_workers_match_in_process(self):
+        inline = _scrape(None)
+        with ParsePool(workers=2, min_pages=1) as pool:
+            pooled = _scrape(pool)
+            assert pool._executor is not None
+        assert pooled == inline
+        assert len(inline) > 10 and all(item["image"] for item in inline)
+
+    def test_listing_pages_go_through_the_pool(self):
+        pool = ParsePool()
+        kinds = []
+        submit = pool.submit
+        pool.submit = lambda kind, *args, **kwargs: kinds.append(kind) or submit(kind, *args, **kwargs)
+        assert len(_scrape(pool)) > 10
+        assert kinds[0] == "m3post_listing"
+        assert kinds.count("m3post_listing") == 1 and set(kinds[1:]) == {"m3post_thread"}
+
+    def test_dead_worker_falls_back(self):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        job = PendingParse(future, ("m3post_thread", THREAD_HTML, bench.M3POST_THREAD_URL, None))
+        assert job.result()["price"] == "$1,500"
+
+    def test_from_config(self):
+        pool = ParsePool.from_config({"workers": 3})
+        assert (pool.workers, pool.min_pages) == (3, 8)
+        assert ParsePool.from_config(None).workers == 0
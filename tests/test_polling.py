@@ -0,0 +1,98 @@
+"""Tests for adaptive polling."""
+
+import pytest
+
+from src import db
+from src.polling import PollScheduler
+
+UNITS = [("ebay", "hot"), ("ebay", "warm"), ("ebay", "dead"), ("forums", "kw")]
+
+
+def _spent(scheduler):
+    return sum(s.cost * 3600 / s.interval for s in scheduler.states.values())
+
+
+class TestPollScheduler:
+    """Test interval planning and learning from yields."""
+
+    def test_equal_units_keep_search_interval(self, temp_db):
+        scheduler = PollScheduler(search_interval=1800)
+        scheduler.sync(UNITS)
+        assert [s.interval for s in scheduler.states.values()] == [pytest.approx(1800)] * 4
+        assert scheduler.due(UNITS) == UNITS  # never polled
+
+    def test_budget_follows_yield_within_bounds(self, temp_db):
+        scheduler = PollScheduler(search_interval=1800, min_interval=600, max_interval=86400)
+        scheduler.sync(UNITS)
+        now = 1_000_000.0
+        for n in range(20):
+            now += 1800
+            for unit, new in zip(UNITS, (6, 1, 0, 1)):
+                scheduler.record(unit, new, requests=3 if unit[0] == "forums" else 1, now=now)
+        scheduler.replan()
+        states = {s.key: s for s in scheduler.states.values()}
+        assert states["hot"].interval < states["warm"].interval < states["dead"].interval
+        assert states["hot"].interval >= 600 and states["dead"].interval <= 86400
+        # a search costing 3 requests is polled less often than one costing 1
+        assert states["kw"].interval > states["warm"].interval
+        # same request volume as polling everything every search_interval
+        assert _spent(scheduler) == pytest.approx(scheduler.budget(), rel=1e-3)
+        assert scheduler.budget() == pytest.approx((1 + 1 + 1 + 3) * 2, rel=1e-3)
+
+    def test_due_and_persistence(self, temp_db):
+        scheduler = PollScheduler(requests_per_hour=4, min_interval=600, max_interval=7200)
+        scheduler.sync(UNITS)
+        for unit in UNITS:
+            scheduler.record(unit, 0, requests=1, now=0)
+        scheduler.replan()
+        assert scheduler.due(UNITS, now=599) == []
+        assert set(scheduler.due(UNITS, now=7200)) == set(UNITS)
+        scheduler.save()
+
+        reloaded = PollScheduler(requests_per_hour=4)
+        assert reloaded.due(UNITS[:2], now=599) == []
+        assert set(reloaded.states) == set(UNITS[:2])  # dropped keywords are forgotten
+        assert len(db.load_poll_state()) == 4
+
+    def test_explicit_budget(self, temp_db):
+        scheduler = PollScheduler(requests_per_hour=1, max_interval=36000)
+        scheduler.sync(UNITS)
+        assert [s.interval for s in scheduler.states.values()] == [pytest.approx(14400)] * 4
+        # too small even for max_interval: everything at max_interval
+        scheduler.requests_per_hour = 0.05
+        scheduler.replan()
+        assert {s.interval for s in scheduler.states.values()} == {36000}
+
+
+def test_adaptive_cycles(temp_db, tmp_path, monkeypatch):
+    from src import agent as agent_module
+    from tests.conftest import make_item
+
+    calls = []
+
+    def fake_forums(keyword, headers=None):
+        calls.append(keyword)
+        return [make_item(len(calls), keyword=keyword, url=f"https://f/{keyword}/{len(calls)}")]
+
+    monkeypatch.setattr(agent_module, "scrape_m3post_sections", lambda **kw: [])
+    monkeypatch.setattr(agent_module, "search_ebay", lambda *a, **kw: [])
+    monkeypatch.setattr(agent_module, "search_forums", fake_forums)
+    monkeypatch.setattr(agent_module, "search_facebook", lambda *a, **kw: [])
+    config = tmp_path / "config.yaml"
+    config.write_text("parts: [wheels, seats]\nprefetch_thumbnails: false\n"
+                      "notifications:\n  stdout_enabled: false\n"
+                      "polling:\n  adaptive: true\n  min_interval: 600\n")
+    agent = agent_module.Agent(config_path=str(config))
+    try:
+        agent.run_once(adaptive=True)
+        assert calls == ["wheels", "seats"]
+        agent.run_once(adaptive=True)  # nothing due yet: no requests, no run row
+        assert calls == ["wheels", "seats"] and len(db.get_runs()) == 1
+        agent.run_once()  # a manual cycle still searches everything
+        assert calls == ["wheels", "seats", "wheels", "seats"]
+    finally:
+        agent.close(timeout=1)
+    states = {(r["source"], r["key"]): r for r in db.load_poll_state()}
+    assert states[("forums", "wheels")]["new_items"] == 2
+    assert states[("forums", "wheels")]["polls"] == 2
+    assert states[("ebay", "(wheels, seats)")]["new_items"] == 0
@@ -0,0 +1,62 @@
+"""Tests for price extraction."""
+
+from src import bench, db
+from src.prices import best_price, best_prices, extract_prices, extract_prices_many
+from src.sources.forum import extract_price
+from tests.conftest import make_item
+
+
+class TestExtractPrices:
+    """Test candidates, classification and the best-price choice."""
+
+    def test_formats(self):
+        assert extract_price("[FS] BBS CH-R wheels $1,200.00") == "$1,200.00"
+        assert extract_price("FS: Gintani tune 5200 USD firm") == "$5200"
+        assert extract_price("asking 1500 obo") == "$1500"
+        assert extract_price("KW V3 coilovers 1450 obo") == "$1450"
+        assert extract_price("CSL trunk $1.5k firm") == "$1,500"
+        assert extract_price("£450 ono") == "£450"
+        assert extract_price("Supersprint X-pipe, 950 CAD") == "950 CAD"
+        assert extract_price("2008 E92 M3 parting out") is None
+        assert extract_price("") is None
+
+    def test_candidates_are_classified(self):
+        found = extract_prices("Retail $2,000, asking $1,450 + $40 shipping")
+        assert [(c.text, c.value, c.kind) for c in found] == [
+            ("$2,000", 2000.0, "was"), ("$1,450", 1450.0, "asking"), ("$40", 40.0, "shipping")]
+        assert found[1].currency == "USD" and found[1].confidence > found[0].confidence
+        assert extract_prices("OEM lights €300")[0].currency == "EUR"
+
+    def test_best_price_skips_shipping_and_reference_prices(self):
+        assert best_price("was $900 now $700").value == 700
+        assert best_price("Shipping is $35 to CONUS, $1,100 for the set").value == 1100
+        assert best_price("paid $1800 for them, let them go for $1100").value == 1100
+        assert best_price("MSRP $6,000") is None
+
+    def test_batch(self):
+        texts = ["$100", "nothing", "asking 250"]
+        assert [b.value if b else None for b in best_prices(texts)] == [100, None, 250]
+        assert [len(c) for c in extract_prices_many(texts)] == [1, 0, 1]
+
+    def test_labelled_corpus(self):
+        result = bench.price_accuracy()
+        assert result["cases"] >= 50
+        assert result["misses"] == []
+
+
+class TestBackfillPrices:
+    """Test filling in prices for stored items."""
+
+    def test_backfill(self, temp_db):
+        db.add_items([
+            make_item(1, title="Akrapovic exhaust 1,150 obo", price="Contact"),
+            make_item(2, title="Wheels, make an offer", price="Contact"),
+            make_item(3, title="Seats $900", price="$850"),
+        ])
+        assert db.backfill_prices(dry_run=True) == 1
+        assert db.backfill_prices(batch=1) == 1
+        items = {i["title"]: i for i in db.get_items(limit=10)}
+        assert items["Akrapovic exhaust 1,150 obo"]["price"] == "$1,150"
+        assert db.faceted_search(max_price=1200)["total"] == 2
+        assert items["Seats $900"]["price"] == "$850"  # already had a price
+        assert db.backfill_prices() == 0
@@ -0,0 +1,50 @@
+"""Tests for the cycle profiler behind ``main.py profile``."""
+
+import re
+import sqlite3
+import time
+
+from src import profiling
+
+
+def _workload():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (x TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(str(i),) for i in range(2000)])
+    pattern = re.compile(r"\$\s?(\d[\d,]*)")
+    blobs = [f"selling for ${i},000 shipped" * 3 for i in range(2000)]
+    found = [pattern.search(b) for b in blobs]
+    time.sleep(0.05)  # give the sampler something to see
+    return found
+
+
+class TestProfileCycle:
+    """Test the profilers' combined report."""
+
+    def test_report(self):
+        result = profiling.profile_cycle(_workload, top=5, sample_interval=0.002)
+        assert result.error is None
+        assert result.wall >= 0.05
+        assert len(result.allocations) == 5
+        assert result.peak_traced and result.peak_traced > 0
+        assert result.sampler.samples > 0
+        assert any("test_profiling:_workload" in line for line in result.sampler.collapsed())
+        assert all(re.match(r".+ \d+$", line) for line in result.sampler.collapsed())
+
+        breakdown = profiling.library_breakdown(result.stats)
+        assert breakdown["SQLite"] > 0
+        assert breakdown["regular expressions"] > 0
+
+        report = profiling.format_report(result, top=5)
+        assert "Top 5 functions by cumulative time" in report
+        assert "_workload" in report
+        assert "Peak RSS" in report
+
+    def test_error_is_kept(self):
+        def boom():
+            raise ValueError("bad cycle")
+
+        result = profiling.profile_cycle(boom, memory=False, sample_interval=None)
+        assert isinstance(result.error, ValueError)
+        assert result.sampler is None and result.allocations == []
+        assert "bad cycle" in profiling.format_report(result)
@@ -0,0 +1,89 @@
+"""Tests for the eBay query planner."""
+
+from src import query_plan
+from src.query_plan import group_keywords, marginal_yield, matching_keywords, plan_queries, tag_results
+
+KEYWORDS = ["xpipe", "x pipe", "x-pipe", "muffler", "KW", "M3", "wheel", "brake"]
+
+
+class TestPlanning:
+    """Test keyword merging and query packing."""
+
+    def test_equivalent_keywords_merge(self):
+        groups = group_keywords(KEYWORDS)
+        assert groups[0].keywords == ["xpipe", "x pipe", "x-pipe"]
+        assert groups[0].spellings == ["xpipe", "x pipe"]
+        assert len(groups) == 6
+
+    def test_queries(self):
+        queries = plan_queries(KEYWORDS, terms_per_query=3)
+        assert [q.text for q in queries] == ["(xpipe, x pipe, muffler, kw)", "m3", "(wheel, brake)"]
+        assert queries[0].keywords == ["xpipe", "x pipe", "x-pipe", "muffler", "KW"]
+        # one query per group, equivalent keywords still merged
+        assert [q.text for q in plan_queries(KEYWORDS, terms_per_query=1)] == [
+            "(xpipe, x pipe)", "muffler", "kw", "m3", "wheel", "brake"]
+
+    def test_query_length_budget(self):
+        keywords = [f"keyword{n:02d}" for n in range(20)]
+        queries = plan_queries(keywords, terms_per_query=20)
+        assert len(queries) > 1
+        assert all(len(f"{q.text} {query_plan.QUERY_SUFFIX}") <= query_plan.MAX_QUERY_CHARS
+                   for q in queries)
+        assert [k for q in queries for k in q.keywords] == keywords
+
+
+class TestTagging:
+    """Test local keyword matching and marginal yield."""
+
+    def test_matching(self):
+        groups = group_keywords(KEYWORDS)
+        assert matching_keywords("Remus X-Pipe", groups) == ["xpipe", "x pipe", "x-pipe"]
+        assert matching_keywords("Akrapovic xpipes and mufflers", groups) == [
+            "xpipe", "x pipe", "x-pipe", "muffler"]
+        assert matching_keywords("KW V3 coilovers", groups) == ["KW"]
+        assert matching_keywords("Kwik brakes", groups) == ["brake"]
+
+    def test_tag_results(self):
+        groups = group_keywords(KEYWORDS)
+        query = plan_queries(KEYWORDS, terms_per_query=3)[2]  # (wheel, brake)
+        items = tag_results(query, [{"title": "M3 brake kit and wheels"},
+                                    {"title": "M3 muffler"}, {"title": "Floor mats"}], groups)
+        assert [i["keyword"] for i in items] == ["wheel", "muffler", "wheel"]
+        assert items[0]["keywords"] == ["M3", "wheel", "brake"]
+
+    def test_marginal_yield(self):
+        groups = group_keywords(KEYWORDS)
+        titles = ["E92 M3 x-pipe", "E92 M3 xpipe and muffler", "M3 wheels", "M3 floor mats"]
+        report = marginal_yield([{"title": t} for t in titles], groups)
+        assert report["xpipe"] == {"matched": 2, "unique": 1}
+        assert report["muffler"] == {"matched": 1, "unique": 0}
+        assert report["wheel"] == {"matched": 1, "unique": 1}
+        # the catch-all is credited only with what nothing else matched
+        assert report["M3"] == {"matched": 4, "unique": 1}
+        assert report["brake"] == {"matched": 0, "unique": 0}
+
+
+def test_agent_runs_planned_queries(temp_db, tmp_path, monkeypatch):
+    from src import agent as agent_module
+
+    calls = []
+
+    def fake_search(text, headers=None, max_results=20, watermarks=None):
+        calls.append((text, max_results))
+        return [{"source": "ebay", "title": "x-pipe and KW coilovers", "url": "https://e/1",
+                 "keyword": text},
+                {"source": "ebay", "title": f"{text} part", "url": f"https://e/{text}",
+                 "keyword": text}]
+
+    monkeypatch.setattr(agent_module, "search_ebay", fake_search)
+    config = tmp_path / "config.yaml"
+    config.write_text("parts: [xpipe, x-pipe, KW, wheel]\nprefetch_thumbnails: false\n"
+                      "ebay:\n  terms_per_query: 2\n")
+    agent = agent_module.Agent(config_path=str(config), offline=True)
+    items = agent.search_ebay_planned(agent.config["parts"])
+    agent.close(timeout=1)
+    assert calls == [("(xpipe, x pipe, kw)", 40), ("wheel", 20)]
+    by_url = {i["url"]: i for i in items}
+    assert len(items) == 3  # the shared listing is kept once
+    assert by_url["https://e/1"]["keyword"] == "xpipe"
+    assert by_url["https://e/1"]["keywords"] == ["xpipe", "x-pipe", "KW"]
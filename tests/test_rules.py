@@ -0,0 +1,102 @@
+"""Tests for the compiled watch-rule index."""
+
+import random
+
+from src import db
+from src.rules import RuleIndex, WatchRule
+from tests.conftest import make_item
+
+
+def _rule(name, **fields):
+    return WatchRule(name, notifiers=fields.pop("notifiers", ["sms"]), **fields)
+
+
+class TestRuleIndex:
+    """Test rule matching and notifier routing."""
+
+    def test_conditions_combine(self):
+        index = RuleIndex([
+            _rule("coilovers", keywords=["coilovers", "fortune auto"], max_price=1500),
+            _rule("m3post wheels", sources=["forum:m3post"], categories=["Wheels"]),
+            _rule("csl", regex=r"\bcsl\b"),
+        ])
+
+        def names(item, price):
+            return [r.name for r in index.match(item, price)]
+
+        assert names({"title": "KW V3 Coilovers"}, 1200) == ["coilovers"]
+        assert names({"title": "KW V3 Coilovers"}, 2000) == []
+        assert names({"title": "KW V3 Coilovers"}, None) == []
+        assert names({"title": "Fortune Auto 500 kit"}, 1500) == ["coilovers"]
+        assert names({"title": "Auto fortune"}, 100) == []
+        assert names({"title": "CSL wheels", "source": "forum:m3post",
+                      "category": "Wheels"}, None) == ["m3post wheels", "csl"]
+        assert names({"title": "CSLX trunk", "source": "forum:m3post"}, None) == []
+
+    def test_index_agrees_with_brute_force(self):
+        rng = random.Random(7)
+        words = ["coilovers", "wheels", "csl", "trunk", "exhaust", "seats", "brakes"]
+        sources = ["ebay", "forum:m3post", "forum:e90post"]
+        categories = ["Wheels", "Suspension", "Interior", None]
+        rules = []
+        for n in range(300):
+            fields = {}
+            if rng.random() < 0.3:
+                fields["sources"] = rng.sample(sources, rng.randint(1, 2))
+            if rng.random() < 0.3:
+                fields["categories"] = [c for c in rng.sample(categories, 2) if c]
+            if rng.random() < 0.5:
+                fields["keywords"] = rng.sample(words, rng.randint(1, 2))
+            if rng.random() < 0.5:
+                fields["min_price"] = rng.choice([0, 100, 250, 500])
+            if rng.random() < 0.5:
+                fields["max_price"] = rng.choice([250, 500, 1000, 99.5])
+            if rng.random() < 0.1:
+                fields["regex"] = rng.choice([r"\bv3\b", r"\d{3}mm"])
+            rules.append(_rule(f"r{n}", **fields))
+        index = RuleIndex(rules)
+
+        for _ in range(500):
+            item = {
+                "title": " ".join(rng.sample(words + ["v3", "300mm"], 3)),
+                "source": rng.choice(sources),
+                "category": rng.choice(categories),
+            }
+            price = rng.choice([None, 0, 50, 99.5, 100, 250, 400, 500, 999, 1000, 5000])
+            expected = [r.name for r in rules if r.matches(item, price)]
+            assert [r.name for r in index.match(item, price)] == expected
+
+    def test_route_falls_back_to_defaults(self):
+        index = RuleIndex([
+            _rule("a", keywords=["wheels"], notifiers=["sms", "stdout"]),
+            _rule("b", keywords=["wheels"], notifiers=["sms"]),
+        ], default_notifiers=["stdout"])
+        assert index.route({"title": "Wheels"}) == ["sms", "stdout"]
+        assert index.route({"title": "Seats"}) == ["stdout"]
+        assert RuleIndex([], ["sms"]).route({"title": "Seats"}) == ["sms"]
+
+
+class TestRuleRouting:
+    """Test that saved items get outbox rows only for their routed notifiers."""
+
+    def test_agent_routes_items(self, temp_db, tmp_path):
+        from src.agent import Agent
+
+        config = tmp_path / "config.yaml"
+        config.write_text(
+            "parts: []\nprefetch_thumbnails: false\n"
+            "notifications:\n  stdout_enabled: true\n"
+            "watch_rules:\n"
+            "  - name: cheap wheels\n"
+            "    keywords: [wheels]\n"
+            "    max_price: 500\n"
+            "    notifiers: [stdout]\n"
+            "default_notifiers: []\n"
+        )
+        agent = Agent(config_path=str(config))
+        items = [make_item(1, title="BBS wheels", price="$450"),
+                 make_item(2, title="BBS wheels", price="$4,500")]
+        assert db.add_items(items, notifiers=agent.route) == 2
+        assert items[0]["category"] == "Wheels"
+        assert db.get_outbox_stats() == {"stdout": {"pending": 1}}
+        agent.close(timeout=1)
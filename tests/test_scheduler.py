@@ -0,0 +1,111 @@
+"""Tests for the daemon scheduler."""
+
+import random
+import threading
+
+import pytest
+
+from src.metrics import SCHEDULE_MISSED
+from src.scheduler import Scheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestScheduler:
+    """Test per-job intervals, jitter, missed deadlines and stopping."""
+
+    def test_jobs_keep_their_own_intervals(self):
+        clock, calls = FakeClock(), []
+        scheduler = Scheduler(clock=clock)
+        scheduler.add("fast", lambda: calls.append("fast"), 10)
+        scheduler.add("slow", lambda: calls.append("slow"), 30)
+        for _ in range(6):
+            wait = scheduler.run_pending()
+            clock.now += wait
+        assert calls == ["fast", "slow", "fast", "fast", "fast", "slow", "fast", "fast"]
+        assert scheduler.run_pending() == pytest.approx(10)
+
+    def test_jitter_stays_within_bounds_on_the_grid(self):
+        clock = FakeClock()
+        scheduler = Scheduler(clock=clock, rng=random.Random(7))
+        job = scheduler.add("ebay", lambda: None, 100, jitter=20)
+        starts = []
+        for _ in range(50):
+            clock.now = job.next_run
+            starts.append(clock.now - 1000)
+            scheduler.run_pending()
+        for k, start in enumerate(starts):
+            assert k * 100 <= start <= k * 100 + 20
+        assert job.missed == 0
+
+    def test_slow_run_records_missed_deadlines(self):
+        clock = FakeClock()
+        scheduler = Scheduler(clock=clock)
+        before = SCHEDULE_MISSED.labels("slow").value
+        durations = [250, 0]
+
+        def search():
+            clock.now += durations.pop(0)
+
+        job = scheduler.add("slow", search, 100)
+        scheduler.run_pending()
+        # The first run took until t=250. The t=100 slot runs once late, the
+        # t=200 run is skipped, and the job continues at t=300.
+        assert job.runs == 2 and job.missed == 1
+        assert job.next_run == pytest.approx(1300)
+        assert SCHEDULE_MISSED.labels("slow").value - before == 1
+
+    def test_running_job_is_not_started_twice(self):
+        started, release = threading.Event(), threading.Event()
+        scheduler = Scheduler()
+
+        def search():
+            started.set()
+            release.wait(5)
+
+        scheduler.add("m3post", search, 3600, delay=3600)
+        worker = threading.Thread(target=scheduler.trigger, args=("m3post",))
+        worker.start()
+        assert started.wait(5)
+        assert scheduler.trigger("m3post") is False
+        release.set()
+        worker.join(5)
+        assert scheduler.jobs["m3post"].runs == 1
+
+    def test_slot_due_while_running_counts_as_missed(self):
+        clock = FakeClock()
+        scheduler = Scheduler(clock=clock)
+        before = SCHEDULE_MISSED.labels("busy").value
+        job = scheduler.add("busy", lambda: None, 100)
+        job.running = True  # started by ``trigger`` on another thread
+        assert scheduler.run_pending() == pytest.approx(100)
+        assert job.runs == 0 and job.missed == 1
+        assert SCHEDULE_MISSED.labels("busy").value - before == 1
+
+    def test_failing_job_keeps_its_schedule(self):
+        clock = FakeClock()
+        scheduler = Scheduler(clock=clock)
+
+        def broken():
+            raise RuntimeError("boom")
+
+        job = scheduler.add("forums", broken, 60)
+        assert scheduler.run_pending() == pytest.approx(60)
+        assert job.errors == 1 and job.runs == 1
+
+    def test_stop_wakes_the_loop(self):
+        scheduler = Scheduler()
+        ran = threading.Event()
+        scheduler.add("ebay", ran.set, 3600)
+        thread = threading.Thread(target=scheduler.run)
+        thread.start()
+        assert ran.wait(5)  # first run is immediate, then it sleeps an hour
+        scheduler.stop()
+        thread.join(5)
+        assert not thread.is_alive()
@@ -0,0 +1,69 @@
+"""Tests for the synthetic database generator and the dashboard load test."""
+
+import sqlite3
+
+from src import db, loadtest, synthetic
+from tests.conftest import make_item
+
+
+class TestSeedDatabase:
+    """Test the bulk seeder against what the normal insert path maintains."""
+
+    def test_rows_are_realistic(self):
+        rows = [dict(zip(synthetic.COLUMNS, row)) for row in synthetic.generate_rows(3000, seed=1)]
+        assert len({r["url"] for r in rows}) == 3000
+        assert {r["source"] for r in rows} == {s for s, _ in synthetic.SOURCES}
+        prices = {r["price"] for r in rows}
+        assert "Contact" in prices and None in prices
+        assert any(p and p.endswith(" USD") for p in prices)
+        assert any(p and p.startswith("$") and "," in p for p in prices)
+        for r in rows:
+            assert r["category"] == db.categorize_item(r["title"], r["keyword"])
+            assert r["price_value"] == db.parse_price_value(r["price"])
+        share = sum(r["archived"] for r in rows) / len(rows)
+        assert 0.2 < share < 0.4
+
+    def test_seed_keeps_indexes_and_counters_consistent(self, temp_db):
+        db.add_items([make_item(1)])
+        assert synthetic.seed_database(temp_db, 2500, batch=1000) == 2500
+
+        conn = sqlite3.connect(temp_db)
+        total, active = conn.execute("SELECT COUNT(*), SUM(archived = 0) FROM items").fetchone()
+        assert total == 2501
+        assert conn.execute("SELECT SUM(n) FROM facet_counts").fetchone()[0] == active
+        triggers = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='trigger'").fetchone()[0]
+        conn.close()
+        assert triggers >= 7
+        assert db.DB_PATH == temp_db
+        assert len(db.search_items("coilovers", limit=5000)) == sum(
+            1 for i in db.get_items(limit=5000) if "coilovers" in i["title"].lower())
+
+        # The triggers are back: a normal insert still updates the counters.
+        assert db.add_items([make_item(2)]) == 1
+        conn = sqlite3.connect(temp_db)
+        assert conn.execute("SELECT SUM(n) FROM facet_counts").fetchone()[0] == active + 1
+        conn.close()
+
+
+class TestLoadTest:
+    """Test the load-test harness end to end against an in-process server."""
+
+    def test_run(self, temp_db):
+        synthetic.seed_database(temp_db, 500)
+        targets = loadtest.build_targets(db.get_categories(), n=50)
+        assert {label for label, _ in targets} == {label for label, _ in loadtest.ROUTE_MIX}
+        server, url = loadtest.serve_in_process()
+        try:
+            result = loadtest.run(url, targets, concurrency=2, duration=0.5)
+        finally:
+            server.shutdown()
+        assert result["total"]["requests"] > 0
+        assert result["total"]["errors"] == 0
+        assert result["total"]["p50_ms"] <= result["total"]["p99_ms"] <= result["total"]["max_ms"]
+        assert "total" in loadtest.format_report(result)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert loadtest.percentile(values, 50) == 50
+        assert loadtest.percentile(values, 99) == 99
+        assert loadtest.percentile([], 90) == 0.0
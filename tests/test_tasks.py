@@ -0,0 +1,139 @@
+"""Tests for the crawl task queue and workers."""
+
+import pytest
+
+from src import db
+from src.tasks import RedisTaskQueue, SqliteTaskQueue, TaskQueue, Worker
+from tests.conftest import make_item
+
+TASKS = [("ebay", "(xpipe, muffler)", 1), ("forums", "wheels", 1),
+         ("forum:m3post", "182", 2)]
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_queue(request, tmp_path, monkeypatch):
+    """Build a queue on each backend (Redis via fakeredis, if installed)."""
+    if request.param == "sqlite":
+        monkeypatch.setattr(db, "DB_PATH", tmp_path / "parts.db")
+        return SqliteTaskQueue
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis needs it to run the Lua scripts
+    server = fakeredis.FakeServer()
+
+    def make(**kwargs):
+        client = fakeredis.FakeRedis(server=server, decode_responses=True)
+        return RedisTaskQueue(client=client, **kwargs)
+    return make
+
+
+class TestTaskQueue:
+    """Test leasing, visibility timeouts, retries and the dead-letter queue."""
+
+    def test_enqueue_skips_active_duplicates(self, make_queue):
+        queue = make_queue()
+        assert queue.enqueue(TASKS) == 3
+        assert queue.enqueue(TASKS + [("forums", "seats", 1)]) == 1
+        assert queue.stats() == {"pending": 4}
+
+    def test_lease_hides_task_until_it_expires(self, make_queue):
+        queue = make_queue(lease=300, retry_delay=0)
+        queue.enqueue(TASKS[:1])
+        [task] = queue.lease_tasks("a")
+        assert task.attempts == 1
+        assert queue.lease_tasks("b") == []
+
+        queue.lease = 0  # b's lease expires at once
+        assert queue.fail(task, "stuck")  # a gives up; retry right away
+        [again] = queue.lease_tasks("b")
+        [stolen] = queue.lease_tasks("c")  # b's lease ran out: c takes over
+        assert again.id == stolen.id and stolen.attempts == 3
+        assert not queue.complete(again, [make_item(1)])  # stale lease
+        assert queue.complete(stolen, [make_item(2)], requests=4)
+
+        [result] = queue.results()
+        assert [item["url"] for item in result["items"]] == ["https://example.com/2"]
+        assert result["requests"] == 4 and result["worker"] == "c"
+        queue.ack([result["id"]])
+        assert queue.results() == []
+        assert queue.enqueue(TASKS[:1]) == 1  # finished tasks can be queued again
+
+    def test_failures_retry_then_dead_letter(self, make_queue):
+        queue = make_queue(max_attempts=2, retry_delay=0)
+        queue.enqueue(TASKS[:1])
+        for _ in range(2):
+            [task] = queue.lease_tasks("w")
+            assert queue.fail(task, "HTTP 429")
+        assert queue.lease_tasks("w") == []
+        [dead] = queue.dead()
+        assert dead["attempts"] == 2 and dead["last_error"] == "HTTP 429"
+
+        assert queue.requeue_dead() == 1
+        assert queue.stats() == {"pending": 1}
+        assert queue.lease_tasks("w")[0].attempts == 1
+
+    def test_expired_lease_on_last_attempt_is_dead_lettered(self, make_queue):
+        queue = make_queue(lease=0, max_attempts=1)
+        queue.enqueue(TASKS[:1])
+        assert len(queue.lease_tasks("crashed")) == 1
+        assert queue.lease_tasks("w") == []
+        assert queue.dead()[0]["last_error"] == "lease expired"
+        assert queue.stats() == {"dead": 1}
+
+    def test_backend_missing_a_method_cannot_be_built(self):
+        class Partial(TaskQueue):
+            def enqueue(self, tasks):
+                return 0
+
+        with pytest.raises(TypeError):
+            Partial()
+
+
+class TestWorker:
+    """Test the worker loop and idempotent ingestion on the coordinator."""
+
+    def test_worker_runs_tasks_and_coordinator_ingests_once(self, make_queue, temp_db, tmp_path):
+        from src.agent import Agent
+
+        queue = make_queue(retry_delay=3600)
+        queue.enqueue(TASKS[:2])
+
+        def run_task(task):
+            if task.source == "forums":
+                raise ConnectionError("blocked")
+            return [make_item(1), make_item(2)]
+
+        worker = Worker(queue, run_task, name="w1")
+        assert worker.run_once() == 1 and worker.run_once() == 1
+        assert queue.stats() == {"done": 1, "pending": 1}
+
+        config = tmp_path / "config.yaml"
+        config.write_text("parts: []\nprefetch_thumbnails: false\n"
+                          "notifications:\n  stdout_enabled: false\n")
+        agent = Agent(config_path=str(config), queue=queue)
+
+        # Crash after saving but before acknowledging: the result is
+        # ingested again, and saves nothing twice.
+        def crash(task_ids):
+            raise RuntimeError("crash")
+
+        real_ack, queue.ack = queue.ack, crash
+        with pytest.raises(RuntimeError):
+            agent.ingest_tasks()
+        queue.ack = real_ack
+        assert agent.ingest_tasks() == 1
+        assert agent.ingest_tasks() == 0
+        assert db.get_stats()["total_items"] == 2
+        assert [run["saved"] for run in db.get_runs()] == [0, 2]
+        agent.close(timeout=1)
+
+    def test_m3post_crawl_splits_into_page_tasks(self, tmp_path):
+        from src.agent import M3POST_UNIT, Agent
+
+        config = tmp_path / "config.yaml"
+        config.write_text("parts: [wheels]\n")
+        agent = Agent(config_path=str(config), offline=True)
+        keys = agent.task_keys(agent.poll_units())
+        assert ("forum:m3post", "182", 3) in keys and ("forum:m3post", "277", 1) in keys
+        assert ("ebay", "wheels", 1) in keys and ("forums", "wheels", 1) in keys
+        assert len(keys) == 2 * 3 + 2
+        assert M3POST_UNIT not in [key[:2] for key in keys]
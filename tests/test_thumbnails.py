@@ -0,0 +1,156 @@
+"""Tests for the image proxy and thumbnail cache."""
+
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from src import db
+from src.thumbnails import ThumbnailCache
+from tests.conftest import make_item
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 40)).save(out, format="JPEG")
+    return out.getvalue()
+
+
+@pytest.fixture
+def image_server():
+    """Local stand-in for the forum/eBay image hosts."""
+    hits = []
+    body = _jpeg(2000, 1500)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append((self.path, self.headers.get("Referer")))
+            if self.path.startswith("/missing"):
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", hits
+    server.shutdown()
+    server.server_close()
+
+
+class TestThumbnailCache:
+    """Test fetch-once caching, resizing and eviction."""
+
+    def test_fetches_once_and_resizes(self, tmp_path, image_server):
+        base, hits = image_server
+        cache = ThumbnailCache(root=tmp_path, size=(320, 240))
+        url = f"{base}/forums/attachment.php?attachmentid=1"
+
+        first = cache.fetch(url)
+        second = cache.fetch(url)
+        assert first == second
+        assert len(hits) == 1
+        assert hits[0][1] == f"{base}/"
+        with Image.open(first) as img:
+            assert img.width <= 320 and img.height <= 240
+
+    def test_failed_fetch_is_not_retried_immediately(self, tmp_path, image_server):
+        base, hits = image_server
+        cache = ThumbnailCache(root=tmp_path)
+        assert cache.fetch(f"{base}/missing.jpg") is None
+        assert cache.fetch(f"{base}/missing.jpg") is None
+        assert len(hits) == 1
+
+    def test_concurrent_fetches_download_once(self, tmp_path, image_server):
+        base, hits = image_server
+        cache = ThumbnailCache(root=tmp_path)
+        url = f"{base}/1.jpg"
+        start = threading.Barrier(4)
+
+        def fetch():
+            start.wait()
+            cache.fetch(url)
+
+        threads = [threading.Thread(target=fetch) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        assert len(hits) == 1
+        key = cache.key(url)
+        assert cache._lock_for(key) is cache._lock_for(key)  # kept, not rebuilt per call
+
+    def test_failure_memory_is_capped(self, tmp_path, monkeypatch):
+        from src import thumbnails
+
+        monkeypatch.setattr(thumbnails, "MAX_FAILURES", 3)
+        cache = ThumbnailCache(root=tmp_path)
+        for n in range(5):
+            cache._record_failure(f"key{n}")
+        assert list(cache._failed) == ["key2", "key3", "key4"]
+
+    def test_close_stops_prefetching(self, tmp_path, image_server):
+        base, hits = image_server
+        cache = ThumbnailCache(root=tmp_path)
+        cache.prefetch([f"{base}/1.jpg"])
+        executor = cache._executor
+        cache.close()
+        assert cache._executor is None and executor._shutdown
+
+    def test_evicts_least_recently_used(self, tmp_path, image_server):
+        import os
+        base, _ = image_server
+        cache = ThumbnailCache(root=tmp_path, size=(320, 240))
+        paths = [cache.fetch(f"{base}/{i}.jpg") for i in range(3)]
+        for age, path in zip((300, 200, 100), paths):
+            os.utime(path, (path.stat().st_atime, path.stat().st_mtime - age))
+        cache.get(f"{base}/0.jpg")  # touch: now most recently used
+
+        cache.max_bytes = sum(p.stat().st_size for p in paths) - 1
+        cache.evict()
+        assert paths[0].exists()
+        assert not paths[1].exists()
+
+    def test_eviction_skips_files_being_written(self, tmp_path, image_server):
+        import os
+        base, _ = image_server
+        cache = ThumbnailCache(root=tmp_path, size=(320, 240))
+        path = cache.fetch(f"{base}/0.jpg")
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_bytes(b"x" * 10_000)
+        os.utime(tmp, (0, 0))  # older than every cached file
+
+        cache.max_bytes = 2 * path.stat().st_size  # over only if the .tmp counted
+        cache.evict()
+        assert tmp.exists() and path.exists()
+
+
+class TestImageRoute:
+    """Test the /img proxy endpoint."""
+
+    def test_serves_cached_thumbnail(self, temp_db, tmp_path, image_server, monkeypatch):
+        from src import web
+
+        base, hits = image_server
+        monkeypatch.setattr(web, "thumbnails", ThumbnailCache(root=tmp_path / "thumbs"))
+        db.add_items([make_item(1, image=f"{base}/big.jpg"), make_item(2)])
+        with_image, without_image = db.get_items_after(0)
+
+        client = web.app.test_client()
+        resp = client.get(f"/img/{with_image['id']}")
+        assert resp.status_code == 200
+        assert resp.mimetype == "image/jpeg"
+        assert "immutable" in resp.headers["Cache-Control"]
+        client.get(f"/img/{with_image['id']}")
+        assert len(hits) == 1
+
+        assert client.get(f"/img/{without_image['id']}").status_code == 404
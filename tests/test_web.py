@@ -0,0 +1,192 @@
+"""Tests for the web dashboard and live feed."""
+
+import sqlite3
+
+import pytest
+
+from src import db
+from src.events import NEW_ITEMS, EventBus, NewItemFeed
+from tests.conftest import make_item
+
+
+class TestNewItemFeed:
+    """Test SSE fan-out and resume."""
+
+    def test_one_poll_fans_out_to_all_subscribers(self, temp_db, monkeypatch):
+        feed = NewItemFeed(poll_interval=3600)
+        subs = [feed.subscribe() for _ in range(5)]
+
+        calls = []
+        real = db.get_items_after
+        monkeypatch.setattr(db, "get_items_after", lambda *a, **k: calls.append(a) or real(*a, **k))
+
+        db.add_items([make_item(1), make_item(2)])
+        assert feed.poll_once() == 2
+        assert len(calls) == 1
+        for sub in subs:
+            assert [sub.queue.get_nowait()["url"] for _ in range(2)] == [
+                "https://example.com/1", "https://example.com/2"
+            ]
+        feed.stop()
+
+    def test_resume_from_last_event_id(self, temp_db):
+        db.add_items([make_item(i) for i in range(1, 4)])
+        feed = NewItemFeed(poll_interval=3600)
+        first_id = db.get_items_after(0)[0]["id"]
+
+        sub = feed.subscribe(last_event_id=first_id)
+        ids = [sub.queue.get_nowait()["id"] for _ in range(2)]
+        assert ids == [first_id + 1, first_id + 2]
+        assert sub.queue.empty()
+        feed.stop()
+
+    def test_resume_beyond_backlog_pages_to_the_live_position(self, temp_db):
+        db.add_items([make_item(i) for i in range(1, 8)])
+        feed = NewItemFeed(poll_interval=3600, backlog=2)
+        first_id = db.get_items_after(0)[0]["id"]
+
+        sub = feed.subscribe(last_event_id=first_id)
+        ids = [sub.queue.get_nowait()["id"] for _ in range(6)]
+        assert ids == list(range(first_id + 1, first_id + 7))
+        assert sub.queue.empty() and not sub.dropped
+
+        db.add_items([make_item(8)])
+        feed.poll_once()
+        assert sub.queue.get_nowait()["id"] == first_id + 7
+        feed.stop()
+
+    def test_bus_pushes_new_items_without_polling(self, temp_db):
+        bus = EventBus()
+        feed = NewItemFeed(poll_interval=0.01)
+        feed.attach(bus)
+        sub = feed.subscribe()
+        assert feed._thread is None  # no polling thread
+
+        items = [make_item(1), make_item(2)]
+        db.add_items(items)
+        bus.publish(NEW_ITEMS, items)
+        assert [sub.queue.get_nowait()["url"] for _ in range(2)] == [
+            "https://example.com/1", "https://example.com/2"
+        ]
+        feed.stop()
+        assert bus.publish(NEW_ITEMS, items) == 0
+
+    def test_failing_handler_does_not_stop_others(self):
+        bus, seen = EventBus(), []
+
+        def broken(payload):
+            raise RuntimeError("boom")
+
+        bus.subscribe("topic", broken)
+        bus.subscribe("topic", seen.append)
+        assert bus.publish("topic", 1) == 1
+        assert seen == [1]
+
+
+class TestRoutes:
+    """Test Flask routes."""
+
+    def test_stream_replays_after_last_event_id(self, temp_db):
+        from src.web import app
+
+        db.add_items([make_item(1), make_item(2)])
+        first_id = db.get_items_after(0)[0]["id"]
+
+        client = app.test_client()
+        resp = client.get("/api/stream", headers={"Last-Event-ID": str(first_id)}, buffered=False)
+        assert resp.mimetype == "text/event-stream"
+        chunks = iter(resp.response)
+        assert next(chunks).startswith(b"retry:")
+        event = next(chunks).decode()
+        assert event.startswith(f"id: {first_id + 1}\n")
+        assert "https://example.com/2" in event
+        resp.close()
+
+
+class TestProductionServing:
+    """Test production app preparation."""
+
+    def test_prepare_app_disables_reload_and_precompiles(self, temp_db):
+        from src.server import prepare_app
+        from src.web import app
+
+        prepare_app(app)
+        assert app.jinja_env.auto_reload is False
+        assert len(app.jinja_env.cache) >= len(app.jinja_env.list_templates())
+
+    def test_prepare_app_surfaces_schema_errors(self, temp_db, monkeypatch):
+        from src.server import prepare_app
+        from src.web import app
+
+        def broken():
+            raise sqlite3.OperationalError("malformed schema")
+
+        monkeypatch.setattr(db, "init_db", broken)
+        with pytest.raises(sqlite3.OperationalError):
+            prepare_app(app)
+
+    def test_requests_do_not_run_schema_setup(self, temp_db, monkeypatch):
+        from src.web import app
+
+        calls = []
+        monkeypatch.setattr(db, "init_db", lambda: calls.append(1))
+        assert app.test_client().get("/").status_code == 200
+        assert calls == []
+
+
+class TestAssets:
+    """Test fingerprinted static assets."""
+
+    def test_pages_link_fingerprinted_css(self, temp_db):
+        from src.web import app
+
+        client = app.test_client()
+        html = client.get("/").get_data(as_text=True)
+        assert "<link rel=\"stylesheet\" href=\"/assets/css/style." in html
+        assert ".items-grid {" not in html
+
+    def test_asset_served_gzipped_and_immutable(self, temp_db):
+        import gzip
+        from src.web import app, assets
+
+        url = assets.url_for("css/style.css")
+        client = app.test_client()
+        resp = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+        assert resp.status_code == 200
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert "immutable" in resp.headers["Cache-Control"]
+        assert b".items-grid" in gzip.decompress(resp.get_data())
+
+        again = client.get(url, headers={"If-None-Match": resp.headers["ETag"]})
+        assert again.status_code == 304
+
+    def test_gzip_refused_with_zero_quality(self, temp_db):
+        from src.web import app, assets
+
+        url = assets.url_for("css/style.css")
+        resp = app.test_client().get(url, headers={"Accept-Encoding": "gzip;q=0, br"})
+        assert resp.status_code == 200
+        assert "Content-Encoding" not in resp.headers
+        assert b".items-grid" in resp.get_data()
+
+    def test_unknown_fingerprint_is_404(self, temp_db):
+        from src.web import app
+
+        assert app.test_client().get("/assets/css/style.deadbeef.css").status_code == 404
+
+
+class TestSearchApi:
+    """Test the faceted /api/search endpoint."""
+
+    def test_filters_and_facets(self, temp_db):
+        from src.web import app
+
+        db.add_items([
+            make_item(1, title="Wheels", price="$800", category="Wheels"),
+            make_item(2, title="Exhaust", price="$1,200", category="Engine", source="forum:m3post"),
+        ])
+        resp = app.test_client().get("/api/search?category=Wheels&category=Engine&max_price=1000&days=7")
+        data = resp.get_json()
+        assert [i["title"] for i in data["items"]] == ["Wheels"]
+        assert data["facets"]["category"] == {"Wheels": 1}
+        assert data["total"] == 1